@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Forest Baseline Assessment
+-------------------------
+Local replacement for the statistics of the Earth Engine script
+ForestBaselineAssessment_Hansen_GLCLU_CanadaDef.js. Reads the exported Hansen
+and GLAD rasters and computes every area figure (Hansen forest 2000, GLAD
+forest under the Canadian definition, loss, gain, GLAD forest types and annual
+loss) in a single block-streamed pass weighted by the true pixel area, then
+writes the CSVs in the same schemas as the Earth Engine table exports, plus an
+Area_Statistics table of the figures the script only prints.
+"""
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.features import geometry_mask
+from rasterio.windows import bounds as window_bounds
+from rasterio.windows import transform as window_transform
+from rasterio.windows import Window
+from pyproj import Geod
+from shapely.geometry import box
+from pixel_area import PixelArea, weighted_total
+from raster_io import read_padded
+from gee_tables import GEE_EMPTY_GEO
+
+# Class values of the GLAD GLCLU2020 Forest_type layer
+GLAD_FOREST_TYPE_NAMES = {1: 'Stable Forest', 2: 'Forest Loss', 3: 'Forest Gain', 4: 'Disturbed Forest'}
+
+# Input layers, in order of preference for the reference grid and footprint
+LAYERS = ('datamask', 'treecover2000', 'hansen_forest_2000', 'glad_height_2000', 'glad_forest_type',
+          'lossyear', 'gain', 'glad_loss', 'glad_gain')
+
+# Default file names of the exported rasters in the data directory
+DEFAULT_LAYER_FILES = {
+    'hansen_forest_2000': 'Hansen_Forest_Cover_2000.tif',
+    'lossyear': 'Hansen_Forest_Loss_2001_2023.tif',
+    'glad_forest_type': 'GLAD_Forest_Types_2000_2020.tif'
+}
+
+# Codes of glad_height_codes, the GLAD forest mask before the minimum-area filter
+GLAD_HEIGHT_MASKED, GLAD_HEIGHT_NON_FOREST, GLAD_HEIGHT_FOREST = 0, 1, 2
+
+
+def _box_sum(data, radius):
+    """Sum over a (2 * radius + 1) square window for every pixel of a halo-padded array."""
+    size = 2 * radius + 1
+    integral = np.pad(data.astype(np.int32), ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    return integral[size:, size:] - integral[:-size, size:] - integral[size:, :-size] + integral[:-size, :-size]
+
+
+def glad_height_codes(heights, valid, height_threshold):
+    """Code GLAD heights as masked / non-forest / forest before the minimum-area filter."""
+    codes = np.where(heights >= height_threshold, GLAD_HEIGHT_FOREST, GLAD_HEIGHT_NON_FOREST).astype(np.int8)
+    codes[~valid] = GLAD_HEIGHT_MASKED
+    return codes
+
+
+def glad_minimum_area(codes, window, radius):
+    """
+    GLAD forest under the Canadian definition from halo-padded height codes.
+
+    The mean of the forest mask over the valid pixels of the (2 * radius + 1) square
+    kernel must exceed 0.5, evaluated only where the centre pixel is valid.
+
+    Args:
+        codes (numpy.ndarray): Output of glad_height_codes read with a halo of radius pixels
+        window (rasterio.windows.Window): Window without the halo
+        radius (int): Kernel radius in pixels
+
+    Returns:
+        numpy.ndarray: Boolean forest mask of the window
+    """
+    forest_count = _box_sum(codes == GLAD_HEIGHT_FOREST, radius)
+    valid_count = _box_sum(codes != GLAD_HEIGHT_MASKED, radius)
+    centre = codes[radius:radius + window.height, radius:radius + window.width] != GLAD_HEIGHT_MASKED
+    return centre & (2 * forest_count > valid_count)
+
+
+class BaselineAssessment:
+    """A class for computing the forest baseline statistics from exported Hansen and GLAD rasters."""
+
+    def __init__(self, data_dir, output_dir):
+        """
+        Initialize the BaselineAssessment with directory paths.
+
+        Args:
+            data_dir (str): Path to the directory containing the exported rasters
+            output_dir (str): Path to the directory for saving the statistics CSVs
+        """
+        self.data_dir = data_dir
+        self.output_dir = output_dir
+        self.logger = logging.getLogger(__name__)
+
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+
+    def default_layers(self):
+        """
+        Find the exported rasters with their default file names in the data directory.
+
+        Returns:
+            dict: Layer name to path for the files that exist
+        """
+        layers = {}
+        for name, filename in DEFAULT_LAYER_FILES.items():
+            path = os.path.join(self.data_dir, filename)
+            if os.path.exists(path):
+                layers[name] = path
+        return layers
+
+    def compute_statistics(self, layers, aoi=None, treecover_threshold=25, height_threshold=5,
+                           neighborhood_radius=5, base_year=2000, num_years=23):
+        """
+        Compute all baseline area statistics in one pass over the rasters.
+
+        Args:
+            layers (dict): Paths of the rasters on a common grid, keyed by layer name:
+                'datamask' (Hansen, 1 = land), 'treecover2000' (percent) or 'hansen_forest_2000'
+                (exported 0/1 mask), 'lossyear', 'gain', 'glad_forest_type' (1-4),
+                'glad_height_2000' (m), 'glad_loss' and 'glad_gain'. Statistics of missing
+                layers are reported as NaN.
+            aoi (geopandas.GeoDataFrame, optional): Area of interest. Without it the footprint
+                is the valid data of the first available layer in LAYERS order.
+            treecover_threshold (float): Minimum Hansen tree cover in percent
+            height_threshold (float): Minimum GLAD forest height in meters
+            neighborhood_radius (int): Radius in pixels of the square minimum-area kernel
+                (5 = 11 x 11 pixels, the 1 ha filter of the Earth Engine script)
+            base_year (int): Year corresponding to lossyear value 0
+            num_years (int): Number of loss years
+
+        Returns:
+            dict: Areas in hectares and the annual loss array
+        """
+        try:
+            unknown = set(layers) - set(LAYERS)
+            if unknown:
+                raise ValueError(f"Unknown layers: {sorted(unknown)}")
+            for path in layers.values():
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"File not found: {path}")
+
+            sources = {name: rasterio.open(path) for name, path in layers.items()}
+            try:
+                return self._reduce(sources, aoi, treecover_threshold, height_threshold,
+                                    neighborhood_radius, base_year, num_years)
+            finally:
+                for src in sources.values():
+                    src.close()
+        except Exception as e:
+            self.logger.error(f"Error computing baseline statistics: {str(e)}")
+            raise
+
+    def _reduce(self, sources, aoi, treecover_threshold, height_threshold, radius, base_year, num_years):
+        """Stream all layers block by block and accumulate the weighted areas."""
+        reference_name = next(name for name in LAYERS if name in sources)
+        reference = sources[reference_name]
+        for name, src in sources.items():
+            if src.shape != reference.shape or src.transform != reference.transform:
+                raise ValueError(f"Layer {name} is not on the reference grid")
+        width, height = reference.width, reference.height
+        pixel_area = PixelArea.from_dataset(reference)
+
+        aoi_geometries = None
+        if aoi is not None:
+            if aoi.crs is not None and reference.crs is not None and aoi.crs != reference.crs:
+                aoi = aoi.to_crs(reference.crs)
+            aoi_geometries = list(aoi.geometry)
+            aoi_bounds = box(*aoi.total_bounds)
+
+        def read(name, window):
+            """Read a layer and its validity for a window."""
+            src = sources[name]
+            data = src.read(1, window=window)
+            valid = data != src.nodata if src.nodata is not None else np.ones(data.shape, dtype=bool)
+            return data, valid
+
+        def footprint(window):
+            """Pixels inside the AOI (or with data in the reference layer)."""
+            shape = (int(window.height), int(window.width))
+            if aoi_geometries is None:
+                return read(reference_name, window)[1]
+            if not aoi_bounds.intersects(box(*window_bounds(window, reference.transform))):
+                return np.zeros(shape, dtype=bool)
+            return geometry_mask(aoi_geometries, out_shape=shape, invert=True,
+                                 transform=window_transform(window, reference.transform))
+
+        def land(window, inside):
+            """Hansen land mask within the footprint."""
+            if 'datamask' not in sources:
+                return inside
+            datamask, valid = read('datamask', window)
+            return inside & valid & (datamask == 1)
+
+        def glad_codes(window):
+            """GLAD height mask before the minimum-area filter (masked / non-forest / forest)."""
+            heights, valid = read('glad_height_2000', window)
+            valid &= land(window, footprint(window))
+            return glad_height_codes(heights, valid, height_threshold)
+
+        sums = {key: 0.0 for key in ('footprint', 'hansen_forest_2000', 'hansen_loss', 'hansen_gain',
+                                     'glad_forest', 'glad_loss', 'glad_gain')}
+        annual_loss = np.zeros(num_years + 1, dtype=np.float64)
+        glad_types = np.zeros(max(GLAD_FOREST_TYPE_NAMES) + 1, dtype=np.float64)
+
+        for _, window in reference.block_windows(1):
+            window = Window(int(window.col_off), int(window.row_off), int(window.width), int(window.height))
+            inside = footprint(window)
+            if not inside.any():
+                continue
+            # Per-row areas on geographic grids: masks reduce to row-vector products
+            weights = pixel_area.weights(window) / 10000
+            area = pixel_area.block(window)
+            on_land = land(window, inside)
+            sums['footprint'] += weighted_total(inside, weights)
+
+            if 'treecover2000' in sources:
+                treecover, valid = read('treecover2000', window)
+                sums['hansen_forest_2000'] += weighted_total(on_land & valid & (treecover >= treecover_threshold),
+                                                             weights)
+            elif 'hansen_forest_2000' in sources:
+                forest, valid = read('hansen_forest_2000', window)
+                sums['hansen_forest_2000'] += weighted_total(on_land & valid & (forest > 0), weights)
+
+            if 'lossyear' in sources:
+                lossyear, valid = read('lossyear', window)
+                valid &= inside & (lossyear > 0) & (lossyear <= num_years)
+                annual_loss += np.bincount(lossyear[valid].astype(np.intp), weights=area[valid],
+                                           minlength=num_years + 1) / 10000
+
+            for name in ('gain', 'glad_loss', 'glad_gain'):
+                if name in sources:
+                    values, valid = read(name, window)
+                    key = 'hansen_gain' if name == 'gain' else name
+                    sums[key] += weighted_total(np.where(valid & inside, values, 0), weights)
+
+            if 'glad_forest_type' in sources:
+                types, valid = read('glad_forest_type', window)
+                valid &= on_land & (types >= 1) & (types <= len(glad_types) - 1)
+                glad_types += np.bincount(types[valid].astype(np.intp), weights=area[valid],
+                                          minlength=len(glad_types)) / 10000
+
+            if 'glad_height_2000' in sources:
+                glad_forest = glad_minimum_area(read_padded(glad_codes, window, width, height, radius,
+                                                            fill=GLAD_HEIGHT_MASKED), window, radius)
+                sums['glad_forest'] += weighted_total(glad_forest, weights)
+
+        if aoi is not None:
+            total_area = self._geodesic_area(aoi) / 10000
+        else:
+            total_area = sums['footprint']
+
+        missing = {
+            'hansen_forest_2000': 'treecover2000' not in sources and 'hansen_forest_2000' not in sources,
+            'hansen_loss': 'lossyear' not in sources,
+            'hansen_gain': 'gain' not in sources,
+            'glad_forest': 'glad_height_2000' not in sources,
+            'glad_loss': 'glad_loss' not in sources,
+            'glad_gain': 'glad_gain' not in sources
+        }
+        statistics = {f'{key}_ha': np.nan if missing[key] else float(sums[key]) for key in missing}
+        statistics['hansen_loss_ha'] = np.nan if missing['hansen_loss'] else float(annual_loss[1:].sum())
+        statistics['total_area_ha'] = float(total_area)
+        statistics['annual_loss_ha'] = annual_loss[1:] if 'lossyear' in sources else None
+        for value, name in GLAD_FOREST_TYPE_NAMES.items():
+            statistics[name] = float(glad_types[value]) if 'glad_forest_type' in sources else np.nan
+        statistics['base_year'] = base_year
+        self.logger.info(f"Computed baseline statistics over {total_area:.0f} ha")
+        return statistics
+
+    def _geodesic_area(self, aoi):
+        """Geodesic area of the AOI geometries in square meters (like ee.Geometry.area())."""
+        geometry = aoi.to_crs('EPSG:4326').geometry.union_all()
+        return abs(Geod(ellps='WGS84').geometry_area_perimeter(geometry)[0])
+
+    def build_tables(self, statistics):
+        """
+        Arrange the statistics in the schemas of the Earth Engine table exports.
+
+        Areas are rounded to whole hectares and percentages formatted to one decimal.
+        Area_Statistics holds the area and change figures the Earth Engine script only
+        prints to the console (GLAD and Hansen forest, loss and gain), in the same layout.
+        As in the table exports of the Earth Engine script, percentages divide the
+        unrounded area by the unrounded total area; only the summary the script prints
+        to the console divides the rounded values.
+
+        Args:
+            statistics (dict): Output of compute_statistics
+
+        Returns:
+            dict: Export name to pandas.DataFrame
+        """
+        total = statistics['total_area_ha']
+
+        def percent(value):
+            return f"{value / total * 100:.1f}" if total and np.isfinite(value) else ''
+
+        tables = {}
+        glad_types = [(name, statistics[name]) for name in GLAD_FOREST_TYPE_NAMES.values()]
+        tables['GLAD_Forest_Type_Statistics'] = pd.DataFrame({
+            'system:index': np.arange(len(glad_types)),
+            'area_ha': [np.round(area) for _, area in glad_types],
+            'forest_type': [name for name, _ in glad_types],
+            'percent_total': [percent(area) for _, area in glad_types],
+            '.geo': GEE_EMPTY_GEO
+        })
+
+        hansen_forest = statistics['hansen_forest_2000_ha']
+        tables['Overall_Forest_Statistics'] = pd.DataFrame({
+            'system:index': [0, 1],
+            'metric': ['Total Area', 'Hansen Forest Cover 2000'],
+            'percent': [100, percent(hansen_forest)],
+            'value_ha': [np.round(total), np.round(hansen_forest)],
+            '.geo': GEE_EMPTY_GEO
+        })
+
+        area_metrics = [
+            ('Total Area', total),
+            ('GLAD Forest Area (Canadian Definition)', statistics['glad_forest_ha']),
+            ('Hansen Forest Area (Canadian Definition)', hansen_forest),
+            ('GLAD Forest Loss', statistics['glad_loss_ha']),
+            ('GLAD Forest Gain', statistics['glad_gain_ha']),
+            ('Hansen Total Forest Loss', statistics['hansen_loss_ha']),
+            ('Hansen Forest Gain', statistics['hansen_gain_ha'])
+        ]
+        tables['Area_Statistics'] = pd.DataFrame({
+            'system:index': np.arange(len(area_metrics)),
+            'metric': [name for name, _ in area_metrics],
+            'value_ha': [np.round(area) for _, area in area_metrics],
+            '.geo': GEE_EMPTY_GEO
+        })
+
+        tables['Combined_Forest_Statistics'] = pd.DataFrame([{
+            'system:index': 0,
+            'category': 'Summary Statistics',
+            'glad_disturbed_forest_ha': np.round(statistics['Disturbed Forest']),
+            'glad_forest_gain_ha': np.round(statistics['Forest Gain']),
+            'glad_forest_loss_ha': np.round(statistics['Forest Loss']),
+            'glad_stable_forest_ha': np.round(statistics['Stable Forest']),
+            'glad_stable_forest_percent': percent(statistics['Stable Forest']),
+            'hansen_forest_2000_ha': np.round(hansen_forest),
+            'hansen_forest_2000_percent': percent(hansen_forest),
+            'total_area_ha': np.round(total),
+            '.geo': GEE_EMPTY_GEO
+        }])
+
+        annual_loss = statistics['annual_loss_ha']
+        if annual_loss is not None:
+            base_year = statistics['base_year']
+            num_years = len(annual_loss)
+            tables[f'Annual_Forest_Loss_{base_year + 1}_{base_year + num_years}'] = pd.DataFrame({
+                'system:index': np.arange(num_years),
+                'area': np.round(annual_loss),
+                'year': (base_year + np.arange(1, num_years + 1)).astype(float),
+                '.geo': GEE_EMPTY_GEO
+            })
+        return tables
+
+    def save_tables(self, tables):
+        """
+        Save the statistics tables as CSVs named like the Earth Engine exports.
+
+        Args:
+            tables (dict): Output of build_tables
+
+        Returns:
+            list: Paths of the written CSVs
+        """
+        try:
+            paths = []
+            for name, table in tables.items():
+                path = os.path.join(self.output_dir, f"{name}.csv")
+                table.to_csv(path, index=False)
+                paths.append(path)
+            self.logger.info(f"Baseline statistics saved to {self.output_dir}")
+            return paths
+        except Exception as e:
+            self.logger.error(f"Error saving baseline statistics: {str(e)}")
+            raise
+
+
+def main():
+    """Main execution function."""
+    assessment = BaselineAssessment("../data/processed", "../results")
+    layers = assessment.default_layers()
+    if layers:
+        statistics = assessment.compute_statistics(layers)
+        assessment.save_tables(assessment.build_tables(statistics))
+
+
+if __name__ == "__main__":
+    main()
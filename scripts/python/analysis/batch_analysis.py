@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Batch AOI Analysis
+-----------------
+Deforestation, carbon and road impact statistics for many areas of interest
+(protected areas, management units) that share the same Hansen and GLAD
+granules. Each granule is split into block-aligned windows; a window is read
+and decompressed once and its layers are reduced for every AOI that overlaps
+it, so neighbouring AOIs never decode the same tiles twice. Windows are
+scheduled across a process pool and the per-AOI accumulators are summed into
+combined CSVs keyed by AOI.
+"""
+
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import rasterio
+import shapely
+from affine import Affine
+from rasterio.features import geometry_mask, rasterize
+from rasterio.windows import Window
+from rasterio.windows import bounds as window_bounds
+from rasterio.windows import transform as window_transform
+from shapely.geometry import box
+from shapely.strtree import STRtree
+from carbon_mapping import build_carbon_lut, lookup_carbon_density
+from pixel_area import PixelArea, weighted_total
+from profiling import get_profile, profile_methods
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Layers read by the batch run (a subset of the baseline layers plus the carbon classes)
+BATCH_LAYERS = ('datamask', 'treecover2000', 'hansen_forest_2000', 'lossyear', 'forest_classes')
+
+# Area-weighted sums accumulated per AOI, in hectares or tonnes of carbon
+SUM_FIELDS = ('area_ha', 'forest_2000_ha', 'carbon_tC', 'carbon_loss_tC', 'road_zone_ha', 'road_zone_forest_ha')
+_FIELD = {name: index for index, name in enumerate(SUM_FIELDS)}
+
+# Per-process state of the pool workers, set once by _init_worker
+_WORKER = {}
+
+
+def batch_windows(src, tile_size=2048):
+    """
+    Split a raster into windows aligned with its internal blocks.
+
+    Windows are whole multiples of the block shape, so every compressed block is
+    decoded by exactly one window. Striped rasters get full-width windows of about
+    tile_size squared pixels.
+
+    Args:
+        src (rasterio.DatasetReader): Open raster
+        tile_size (int): Target window edge length in pixels
+
+    Returns:
+        list: rasterio.windows.Window objects in row-major order
+    """
+    block_height, block_width = src.block_shapes[0]
+    if block_width >= src.width:
+        width = src.width
+        height = max(block_height, tile_size * tile_size // src.width // block_height * block_height)
+    else:
+        width = max(block_width, tile_size // block_width * block_width)
+        height = max(block_height, tile_size // block_height * block_height)
+    return [Window(col_off, row_off, min(width, src.width - col_off), min(height, src.height - row_off))
+            for row_off in range(0, src.height, height)
+            for col_off in range(0, src.width, width)]
+
+
+def _aoi_slices(bounds, transform, shape):
+    """Row and column slices of a window block covered by the bounds of an AOI."""
+    col_start, row_start = ~transform * (bounds[0], bounds[3])
+    col_stop, row_stop = ~transform * (bounds[2], bounds[1])
+    rows = slice(max(int(np.floor(row_start)), 0), min(int(np.ceil(row_stop)), shape[0]))
+    cols = slice(max(int(np.floor(col_start)), 0), min(int(np.ceil(col_stop)), shape[1]))
+    return rows, cols
+
+
+def _init_worker(granules, aois, roads, options):
+    """
+    Store the inputs shared by every task of a worker process.
+
+    Args:
+        granules (list): Layer name to path dicts, one per granule
+        aois (dict): Granule CRS (WKT) to AOI geometries in that CRS
+        roads (dict): Granule CRS (WKT) to road impact zone geometries in that CRS
+        options (dict): Thresholds, carbon lookup table and loss years
+    """
+    _WORKER.clear()
+    _WORKER.update(granules=granules, aois=aois, roads=roads, options=options,
+                   aoi_trees={crs: STRtree(geometries) for crs, geometries in aois.items()},
+                   road_trees={crs: STRtree(geometries) for crs, geometries in roads.items() if len(geometries)})
+
+
+def _reduce_windows(granule_index, windows):
+    """
+    Reduce a run of windows of one granule for every AOI overlapping them.
+
+    Args:
+        granule_index (int): Index of the granule in the batch
+        windows (list): Windows of the granule
+
+    Returns:
+        tuple: (sums, annual_loss) arrays of shape (n_aois, len(SUM_FIELDS)) and
+            (n_aois, num_years + 1)
+    """
+    layers = _WORKER['granules'][granule_index]
+    options = _WORKER['options']
+    num_years = options['num_years']
+    sources = {name: rasterio.open(path) for name, path in layers.items()}
+    try:
+        reference = sources[next(name for name in BATCH_LAYERS if name in sources)]
+        crs_key = reference.crs.to_wkt()
+        geometries = _WORKER['aois'][crs_key]
+        aoi_tree = _WORKER['aoi_trees'][crs_key]
+        road_geometries = _WORKER['roads'].get(crs_key)
+        road_tree = _WORKER['road_trees'].get(crs_key)
+        pixel_area = PixelArea.from_dataset(reference)
+        sums = np.zeros((len(geometries), len(SUM_FIELDS)), dtype=np.float64)
+        annual_loss = np.zeros((len(geometries), num_years + 1), dtype=np.float64)
+
+        def read(name, window):
+            """Read a layer and its validity for a window."""
+            src = sources[name]
+            data = src.read(1, window=window)
+            valid = data != src.nodata if src.nodata is not None else np.ones(data.shape, dtype=bool)
+            return data, valid
+
+        for window in windows:
+            window_box = box(*window_bounds(window, reference.transform))
+            candidates = aoi_tree.query(window_box, predicate='intersects')
+            if not len(candidates):
+                continue
+            shape = (int(window.height), int(window.width))
+            transform = window_transform(window, reference.transform)
+
+            # Every layer is read once per window and shared by all the AOIs below
+            land = read('datamask', window)[0] == 1 if 'datamask' in sources else np.ones(shape, dtype=bool)
+            forest = None
+            if 'treecover2000' in sources:
+                treecover, valid = read('treecover2000', window)
+                forest = land & valid & (treecover >= options['treecover_threshold'])
+            elif 'hansen_forest_2000' in sources:
+                values, valid = read('hansen_forest_2000', window)
+                forest = land & valid & (values > 0)
+            lossyear = loss = None
+            if 'lossyear' in sources:
+                lossyear, valid = read('lossyear', window)
+                loss = valid & (lossyear > 0) & (lossyear <= num_years)
+            density = None
+            if 'forest_classes' in sources and options['carbon_lut'] is not None:
+                classes, valid = read('forest_classes', window)
+                density = np.where(valid & land, lookup_carbon_density(classes, options['carbon_lut']), 0)
+            road_zone = None
+            if road_tree is not None:
+                nearby = road_tree.query(window_box, predicate='intersects')
+                road_zone = np.zeros(shape, dtype=bool)
+                if len(nearby):
+                    road_zone = rasterize(((geometry, 1) for geometry in road_geometries[nearby]),
+                                          out_shape=shape, transform=transform, dtype='uint8').astype(bool)
+            weights = pixel_area.weights(window) / 10000
+            area = pixel_area.block(window) / 10000
+
+            for index in candidates:
+                rows, cols = _aoi_slices(geometries[index].bounds, transform, shape)
+                if rows.start >= rows.stop or cols.start >= cols.stop:
+                    continue
+                sub_transform = transform * Affine.translation(cols.start, rows.start)
+                inside = geometry_mask([geometries[index]], out_shape=(rows.stop - rows.start, cols.stop - cols.start),
+                                       transform=sub_transform, invert=True)
+                if not inside.any():
+                    continue
+                w = weights[rows] if weights.ndim == 1 else weights[rows, cols]
+                row = sums[index]
+                row[_FIELD['area_ha']] += weighted_total(inside, w)
+                if forest is not None:
+                    row[_FIELD['forest_2000_ha']] += weighted_total(inside & forest[rows, cols], w)
+                if loss is not None:
+                    lost = inside & loss[rows, cols]
+                    annual_loss[index] += np.bincount(lossyear[rows, cols][lost].astype(np.intp),
+                                                      weights=area[rows, cols][lost], minlength=num_years + 1)
+                if density is not None:
+                    carbon = np.where(inside, density[rows, cols], 0)
+                    row[_FIELD['carbon_tC']] += weighted_total(carbon, w)
+                    if loss is not None:
+                        row[_FIELD['carbon_loss_tC']] += weighted_total(np.where(lost, carbon, 0), w)
+                if road_zone is not None:
+                    impacted = inside & road_zone[rows, cols]
+                    row[_FIELD['road_zone_ha']] += weighted_total(impacted, w)
+                    if forest is not None:
+                        row[_FIELD['road_zone_forest_ha']] += weighted_total(impacted & forest[rows, cols], w)
+        return sums, annual_loss
+    finally:
+        for src in sources.values():
+            src.close()
+
+
+def _chunks(items, count):
+    """Split a list into at most count contiguous chunks."""
+    size = max(1, -(-len(items) // count))
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+@profile_methods
+class BatchAnalyzer:
+    """A class for running the AOI statistics over many areas of interest in one pass per granule."""
+
+    def __init__(self, data_dir, output_dir):
+        """
+        Initialize the BatchAnalyzer with directory paths.
+
+        Args:
+            data_dir (str): Path to the directory containing the granules and AOI files
+            output_dir (str): Path to the directory for saving the combined CSVs
+        """
+        self.data_dir = data_dir
+        self.output_dir = output_dir
+        self.logger = logging.getLogger(__name__)
+
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+
+    def load_aois(self, aoi_path, aoi_field=None):
+        """
+        Load the AOI polygons from a vector file.
+
+        Args:
+            aoi_path (str): Path to a GeoParquet, GeoPackage, shapefile or GeoJSON file
+            aoi_field (str, optional): Column identifying each AOI (defaults to the row index)
+
+        Returns:
+            geopandas.GeoDataFrame: AOIs with an 'aoi' column of unique identifiers
+        """
+        try:
+            from vector_io import read_vector
+            aois = read_vector(aoi_path)
+            aois = aois[aois.geometry.notna() & ~aois.geometry.is_empty].reset_index(drop=True)
+            aois['aoi'] = aois[aoi_field].astype(str) if aoi_field else aois.index.astype(str)
+            if aois['aoi'].duplicated().any():
+                raise ValueError(f"AOI identifiers in {aoi_field or 'the index'} are not unique")
+            self.logger.info(f"Loaded {len(aois)} AOIs from {aoi_path}")
+            return aois
+        except Exception as e:
+            self.logger.error(f"Error loading AOIs: {str(e)}")
+            raise
+
+    def _road_lengths(self, roads, aois, metric_crs):
+        """Road length in km inside each AOI, measured in a metric projection."""
+        aoi_geometries = aois.geometry.to_crs(metric_crs).values
+        road_geometries = roads.geometry.to_crs(metric_crs).values
+        tree = STRtree(road_geometries)
+        lengths = np.zeros(len(aois))
+        for index, geometry in enumerate(aoi_geometries):
+            nearby = tree.query(geometry, predicate='intersects')
+            if len(nearby):
+                lengths[index] = shapely.length(shapely.intersection(road_geometries[nearby], geometry)).sum() / 1000
+        return lengths
+
+    def analyze(self, aois, granules, roads=None, buffer_distance=1000, class_densities=None,
+                treecover_threshold=25, base_year=2000, num_years=23, tile_size=2048, max_workers=None):
+        """
+        Compute the statistics of every AOI across a set of granules.
+
+        Granules must not overlap one another; AOIs spanning several granules are
+        accumulated across all of them.
+
+        Args:
+            aois (geopandas.GeoDataFrame): Output of load_aois
+            granules (list): One dict per granule mapping layer names in BATCH_LAYERS to
+                rasters on a common grid: 'datamask', 'treecover2000' or 'hansen_forest_2000',
+                'lossyear' and 'forest_classes' (e.g. GLAD forest types, for carbon)
+            roads (geopandas.GeoDataFrame, optional): Road lines for the road impact zone
+            buffer_distance (float): Road impact zone distance in meters
+            class_densities (dict, optional): Class code to carbon density (tC/ha) of forest_classes
+            treecover_threshold (float): Minimum Hansen tree cover in percent
+            base_year (int): Year corresponding to lossyear value 0
+            num_years (int): Number of loss years
+            tile_size (int): Target window edge length in pixels
+            max_workers (int, optional): Number of worker processes (None = one per core)
+
+        Returns:
+            dict: 'summary' (one row per AOI) and 'annual_loss' (one row per AOI and year) DataFrames
+        """
+        try:
+            for layers in granules:
+                unknown = set(layers) - set(BATCH_LAYERS)
+                if unknown:
+                    raise ValueError(f"Unknown layers: {sorted(unknown)}")
+                for path in layers.values():
+                    if not os.path.exists(path):
+                        raise FileNotFoundError(f"File not found: {path}")
+            max_workers = max_workers or os.cpu_count() or 1
+
+            # Plan the windows of each granule that overlap any AOI, and project the
+            # AOIs and road impact zones once per granule CRS
+            impact_zones = None
+            if roads is not None and len(roads):
+                # Buffer in meters: the AOI CRS if it is projected, else the local UTM zone
+                metric_crs = aois.crs if aois.crs.is_projected else aois.estimate_utm_crs()
+                impact_zones = roads.to_crs(metric_crs).geometry.buffer(buffer_distance)
+            aoi_geometries, road_geometries, tasks = {}, {}, []
+            for granule_index, layers in enumerate(granules):
+                reference_name = next(name for name in BATCH_LAYERS if name in layers)
+                with rasterio.open(layers[reference_name]) as reference:
+                    for name, path in layers.items():
+                        with rasterio.open(path) as src:
+                            if src.shape != reference.shape or src.transform != reference.transform:
+                                raise ValueError(f"Layer {name} of granule {granule_index} is not on the "
+                                                 f"reference grid")
+                    crs_key = reference.crs.to_wkt()
+                    if crs_key not in aoi_geometries:
+                        aoi_geometries[crs_key] = aois.geometry.to_crs(reference.crs).values
+                        road_geometries[crs_key] = (impact_zones.to_crs(reference.crs).values
+                                                    if impact_zones is not None else np.array([], dtype=object))
+                    tree = STRtree(aoi_geometries[crs_key])
+                    windows = [window for window in batch_windows(reference, tile_size)
+                               if len(tree.query(box(*window_bounds(window, reference.transform)),
+                                                 predicate='intersects'))]
+                tasks += [(granule_index, chunk) for chunk in _chunks(windows, max_workers * 4)]
+
+            options = {'treecover_threshold': treecover_threshold, 'num_years': num_years,
+                       'carbon_lut': build_carbon_lut(class_densities) if class_densities else None}
+            sums = np.zeros((len(aois), len(SUM_FIELDS)), dtype=np.float64)
+            annual_loss = np.zeros((len(aois), num_years + 1), dtype=np.float64)
+            initargs = (granules, aoi_geometries, road_geometries, options)
+            if max_workers == 1 or len(tasks) <= 1:
+                _init_worker(*initargs)
+                results = (_reduce_windows(*task) for task in tasks)
+                for task_sums, task_loss in results:
+                    sums += task_sums
+                    annual_loss += task_loss
+            else:
+                with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                         initargs=initargs) as executor:
+                    futures = [executor.submit(_reduce_windows, *task) for task in tasks]
+                    for future in as_completed(futures):
+                        task_sums, task_loss = future.result()
+                        sums += task_sums
+                        annual_loss += task_loss
+
+            summary = pd.DataFrame(sums, columns=SUM_FIELDS)
+            summary.insert(0, 'aoi', aois['aoi'].values)
+            has_layer = {name: any(name in layers for layers in granules) for name in BATCH_LAYERS}
+            if not (has_layer['treecover2000'] or has_layer['hansen_forest_2000']):
+                summary[['forest_2000_ha', 'road_zone_forest_ha']] = np.nan
+            if not (has_layer['forest_classes'] and class_densities):
+                summary[['carbon_tC', 'carbon_loss_tC']] = np.nan
+            summary['loss_ha'] = annual_loss[:, 1:].sum(axis=1) if has_layer['lossyear'] else np.nan
+            if not has_layer['lossyear']:
+                summary['carbon_loss_tC'] = np.nan
+            with np.errstate(invalid='ignore', divide='ignore'):
+                summary['loss_rate_pct_per_year'] = summary['loss_ha'] / summary['forest_2000_ha'] / num_years * 100
+            if impact_zones is not None:
+                summary['road_km'] = self._road_lengths(roads, aois, metric_crs)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    summary['road_density_km_per_km2'] = summary['road_km'] / (summary['area_ha'] / 100)
+            else:
+                summary[['road_zone_ha', 'road_zone_forest_ha']] = np.nan
+
+            uncovered = summary.loc[summary['area_ha'] == 0, 'aoi'].tolist()
+            if uncovered:
+                self.logger.warning(f"{len(uncovered)} AOIs are not covered by any granule: {uncovered[:10]}")
+
+            years = base_year + np.arange(1, num_years + 1)
+            annual = pd.DataFrame({
+                'aoi': np.repeat(aois['aoi'].values, num_years),
+                'year': np.tile(years, len(aois)),
+                'area': annual_loss[:, 1:].ravel()
+            })
+            self.logger.info(f"Analyzed {len(aois)} AOIs over {len(granules)} granules in {len(tasks)} tasks")
+            return {'summary': summary, 'annual_loss': annual if has_layer['lossyear'] else annual.iloc[0:0]}
+        except Exception as e:
+            self.logger.error(f"Error running batch analysis: {str(e)}")
+            raise
+
+    def save_results(self, results, output_prefix='batch'):
+        """
+        Save the combined CSVs keyed by AOI, with the stage profile of the run
+        ({output_prefix}_profile.json and .csv) alongside.
+
+        Args:
+            results (dict): Output of analyze
+            output_prefix (str): Prefix for output filenames
+
+        Returns:
+            dict: Table name to CSV path
+        """
+        try:
+            paths = {}
+            for name, table in results.items():
+                paths[name] = os.path.join(self.output_dir, f"{output_prefix}_{name}.csv")
+                table.to_csv(paths[name], index=False)
+            get_profile().save(os.path.join(self.output_dir, f"{output_prefix}_profile"))
+            self.logger.info(f"Batch results saved to {self.output_dir}")
+            return paths
+        except Exception as e:
+            self.logger.error(f"Error saving batch results: {str(e)}")
+            raise
@@ -9,28 +9,123 @@ satellite imagery and ground-truth data.
 import os
 import numpy as np
 import pandas as pd
-import geopandas as gpd
 import rasterio
-from rasterio.mask import mask
-from shapely.geometry import box
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from rasterio.windows import Window
+from raster_io import RasterWriter, write_raster, block_reduce, overview_factor, read_overview
+from raster_stats import StreamingStats
+from pixel_area import PixelArea
+from profiling import profile_methods
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# GLAD Forest_type class codes
+GLAD_FOREST_TYPES = {1: 'Stable Forest', 2: 'Forest Loss', 3: 'Forest Gain', 4: 'Disturbed Forest'}
+
+# Nodata value for carbon stock rasters
+CARBON_NODATA = -9999.0
+
+
+def build_carbon_lut(class_densities, num_height_bins=1):
+    """
+    Build a dense carbon density lookup table indexed by class code and height bin.
+
+    Args:
+        class_densities (dict): Mapping of class code to carbon density (tC/ha). With height
+            bins, each value is a sequence with one density per bin.
+        num_height_bins (int): Number of height bins (1 when no height raster is used)
+
+    Returns:
+        numpy.ndarray: float32 table of shape (max_code + 2, num_height_bins). Unlisted codes
+            map to 0 and the last row catches codes beyond the table.
+    """
+    max_code = max(class_densities)
+    lut = np.zeros((max_code + 2, num_height_bins), dtype=np.float32)
+    for code, density in class_densities.items():
+        if code < 0:
+            raise ValueError(f"Class codes must be non-negative, got {code}")
+        lut[code] = density
+    return lut
+
+
+def lookup_carbon_density(classes, lut, heights=None, height_bins=None):
+    """
+    Map class codes (and optionally heights) to carbon density with a single gather.
+
+    Args:
+        classes (numpy.ndarray): Class code raster block
+        lut (numpy.ndarray): Table from build_carbon_lut
+        heights (numpy.ndarray, optional): Height raster block (m)
+        height_bins (sequence, optional): Ascending height bin edges (m)
+
+    Returns:
+        numpy.ndarray: float32 carbon density (tC/ha)
+    """
+    index = np.clip(classes, 0, lut.shape[0] - 1).astype(np.intp)
+    if heights is not None:
+        index *= lut.shape[1]
+        index += np.digitize(heights, height_bins)
+    return np.take(lut.ravel(), index)
+
+
+def _carbon_stats_for_windows(carbon_raster_path, windows, histogram_range):
+    """
+    Accumulate carbon statistics over a group of raster windows.
+
+    Args:
+        carbon_raster_path (str): Path to the carbon stock raster
+        windows (list): (col_off, row_off, width, height) tuples to read
+        histogram_range (tuple, optional): Histogram range for approximate percentiles
+
+    Returns:
+        StreamingStats: Partial statistics for the windows
+    """
+    stats = StreamingStats(histogram_range=histogram_range)
+    with rasterio.open(carbon_raster_path) as src:
+        pixel_area = PixelArea.from_dataset(src)
+        for window in windows:
+            window = Window(*window)
+            stats.update(src.read(1, window=window), nodata=src.nodata,
+                         weights=pixel_area.weights(window) / 10000)
+    return stats
+
+
+def _carbon_summary(stats, percentiles=()):
+    """Convert accumulated statistics to the carbon distribution summary."""
+    summary = {
+        'total_carbon': stats.sum,
+        'mean_carbon': stats.sum / stats.count if stats.count else np.nan,
+        'std_carbon': stats.std,
+        'min_carbon': stats.min if stats.count else np.nan,
+        'max_carbon': stats.max if stats.count else np.nan,
+        'pixel_count': stats.count
+    }
+    if stats.weight:
+        # tC/ha densities weighted by the true pixel area in hectares
+        summary['area_ha'] = stats.weight
+        summary['total_carbon_tc'] = stats.weighted_sum
+    for q in percentiles:
+        summary[f'p{q:g}_carbon'] = stats.percentile(q)
+    return summary
+
+@profile_methods
 class CarbonMapper:
     """A class for analyzing and mapping carbon stocks in forest ecosystems."""
     
-    def __init__(self, data_dir, output_dir):
+    def __init__(self, data_dir, output_dir, cache=None):
         """
         Initialize the CarbonMapper with directory paths.
         
         Args:
             data_dir (str): Path to the directory containing input data
             output_dir (str): Path to the directory for saving outputs
+            cache (RasterCache, optional): Cache serving decoded rasters as memory maps
         """
         self.data_dir = data_dir
         self.output_dir = output_dir
+        self.cache = cache
         self.logger = logging.getLogger(__name__)
         
         # Create output directory if it doesn't exist
@@ -48,75 +143,244 @@ class CarbonMapper:
         """
         try:
             with rasterio.open(forest_raster_path) as src:
-                forest_data = src.read(1)
                 meta = src.meta.copy()
+                if self.cache is not None:
+                    forest_data = self.cache.read(forest_raster_path)
+                else:
+                    forest_data = src.read(1)
             self.logger.info(f"Successfully loaded forest cover data from {forest_raster_path}")
             return forest_data, meta
         except Exception as e:
             self.logger.error(f"Error loading forest cover data: {str(e)}")
             raise
     
-    def calculate_carbon_stocks(self, forest_data, carbon_density_factor=100):
+    def calculate_carbon_stocks(self, forest_data, carbon_density_factor=100, class_densities=None):
         """
         Calculate carbon stocks based on forest cover and carbon density factor.
         
         Args:
             forest_data (numpy.ndarray): Forest cover raster data
             carbon_density_factor (float): Carbon density factor (tC/ha)
+            class_densities (dict, optional): Mapping of class code to carbon density (tC/ha).
+                When given, forest_data is treated as a class raster (e.g. GLAD_FOREST_TYPES)
+                and carbon_density_factor is ignored.
             
         Returns:
             numpy.ndarray: Carbon stock estimates
         """
         try:
-            # Convert forest cover to carbon stocks
-            carbon_stocks = forest_data * carbon_density_factor
+            if class_densities is not None:
+                carbon_stocks = lookup_carbon_density(forest_data, build_carbon_lut(class_densities))
+            else:
+                # Convert forest cover to carbon stocks
+                carbon_stocks = forest_data * carbon_density_factor
             self.logger.info("Carbon stocks calculated successfully")
             return carbon_stocks
         except Exception as e:
             self.logger.error(f"Error calculating carbon stocks: {str(e)}")
             raise
     
-    def save_carbon_map(self, carbon_stocks, meta, output_path):
+    def calculate_carbon_stocks_lut(self, class_raster_path, class_densities, output_path,
+                                    height_raster_path=None, height_bins=None):
         """
-        Save carbon stock map to file.
+        Calculate carbon stocks block by block from a class raster and a density lookup table.
+        
+        Every block costs one gather into a dense float32 table. With a height raster, each
+        class maps to one density per height bin (binned allometry).
+        
+        Args:
+            class_raster_path (str): Path to the class raster (e.g. GLAD forest types)
+            class_densities (dict): Mapping of class code to tC/ha, or to a sequence of tC/ha
+                per height bin when height_bins is given
+            output_path (str): Path to save the carbon stock raster
+            height_raster_path (str, optional): Path to a forest height raster (m) on the same grid
+            height_bins (sequence, optional): Ascending inner height bin edges (m); len(height_bins) + 1 bins
+            
+        Returns:
+            str: Path of the saved carbon stock raster
+        """
+        try:
+            if (height_raster_path is None) != (height_bins is None):
+                raise ValueError("height_raster_path and height_bins must be given together")
+            
+            num_height_bins = len(height_bins) + 1 if height_bins is not None else 1
+            lut = build_carbon_lut(class_densities, num_height_bins)
+            
+            height_src = rasterio.open(height_raster_path) if height_raster_path else None
+            try:
+                with rasterio.open(class_raster_path) as src:
+                    if height_src is not None and height_src.shape != src.shape:
+                        raise ValueError("Class and height raster dimensions do not match")
+                    meta = src.meta.copy()
+                    meta.update(dtype='float32', nodata=CARBON_NODATA)
+                    
+                    with RasterWriter(output_path, meta, resampling='average') as writer:
+                        for _, window in src.block_windows(1):
+                            classes = src.read(1, window=window)
+                            heights = height_src.read(1, window=window) if height_src is not None else None
+                            carbon = lookup_carbon_density(classes, lut, heights, height_bins)
+                            if src.nodata is not None:
+                                carbon[classes == src.nodata] = CARBON_NODATA
+                            writer.write(carbon, window=window)
+            finally:
+                if height_src is not None:
+                    height_src.close()
+            
+            self.logger.info(f"Carbon stocks calculated from lookup table and saved to {output_path}")
+            return output_path
+        except Exception as e:
+            self.logger.error(f"Error calculating carbon stocks from lookup table: {str(e)}")
+            raise
+    
+    def save_carbon_map(self, carbon_stocks, meta, output_path, compress='deflate'):
+        """
+        Save carbon stock map to a tiled, compressed Cloud-Optimized GeoTIFF.
         
         Args:
             carbon_stocks (numpy.ndarray): Carbon stock estimates
             meta (dict): Raster metadata
             output_path (str): Path to save the output raster
+            compress (str): Compression codec ('deflate', 'lzw' or 'zstd')
         """
         try:
             meta.update({"dtype": "float32"})
-            with rasterio.open(output_path, 'w', **meta) as dst:
-                dst.write(carbon_stocks.astype(np.float32), 1)
+            write_raster(output_path, carbon_stocks, meta, compress=compress, resampling='average')
             self.logger.info(f"Carbon stock map saved to {output_path}")
         except Exception as e:
             self.logger.error(f"Error saving carbon stock map: {str(e)}")
             raise
     
-    def analyze_carbon_distribution(self, carbon_stocks):
+    def analyze_carbon_distribution(self, carbon_stocks, nodata=None, mask=None, meta=None):
         """
-        Analyze the distribution of carbon stocks.
+        Analyze the distribution of carbon stocks in a single pass.
         
         Args:
             carbon_stocks (numpy.ndarray): Carbon stock estimates
+            nodata (float, optional): Nodata value to exclude (NaNs are always excluded)
+            mask (numpy.ndarray, optional): Boolean array, True inside the AOI
+            meta (dict, optional): Raster metadata; when given, the summary also reports the
+                area (ha) and total carbon (tC) weighted by the true pixel area
             
         Returns:
             dict: Statistical summary of carbon stocks
         """
         try:
-            stats = {
-                'total_carbon': np.sum(carbon_stocks),
-                'mean_carbon': np.mean(carbon_stocks),
-                'std_carbon': np.std(carbon_stocks),
-                'min_carbon': np.min(carbon_stocks),
-                'max_carbon': np.max(carbon_stocks)
-            }
+            weights = None
+            if meta is not None:
+                pixel_area = PixelArea(meta['transform'], meta['crs'], meta['width'], meta['height'])
+                weights = pixel_area.weights(Window(0, 0, meta['width'], meta['height'])) / 10000
+            stats = StreamingStats().update(carbon_stocks, nodata=nodata, mask=mask, weights=weights)
             self.logger.info("Carbon distribution analysis completed")
-            return stats
+            return _carbon_summary(stats)
         except Exception as e:
             self.logger.error(f"Error analyzing carbon distribution: {str(e)}")
             raise
+    
+    def analyze_carbon_raster(self, carbon_raster_path, percentiles=(), histogram_range=(0, 1000),
+                              max_workers=1):
+        """
+        Analyze the distribution of a carbon stock raster in one streamed pass.
+        
+        Blocks are split across worker processes and the partial statistics are merged
+        exactly, so the result does not depend on the number of workers (up to
+        floating-point rounding). Nodata pixels are excluded.
+        
+        Args:
+            carbon_raster_path (str): Path to the carbon stock raster
+            percentiles (sequence): Approximate percentiles to report, e.g. (5, 50, 95)
+            histogram_range (tuple): (min, max) tC/ha range of the percentile histogram
+            max_workers (int): Number of worker processes
+            
+        Returns:
+            dict: Statistical summary of carbon stocks
+        """
+        try:
+            if not os.path.exists(carbon_raster_path):
+                raise FileNotFoundError(f"File not found: {carbon_raster_path}")
+            
+            with rasterio.open(carbon_raster_path) as src:
+                windows = [(w.col_off, w.row_off, w.width, w.height) for _, w in src.block_windows(1)]
+            if not percentiles:
+                histogram_range = None
+            
+            if max_workers > 1:
+                groups = [windows[i::max_workers] for i in range(max_workers)]
+                stats = StreamingStats(histogram_range=histogram_range)
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    for partial in executor.map(_carbon_stats_for_windows, [carbon_raster_path] * len(groups),
+                                                groups, [histogram_range] * len(groups)):
+                        stats.merge(partial)
+            else:
+                stats = _carbon_stats_for_windows(carbon_raster_path, windows, histogram_range)
+            
+            self.logger.info("Carbon raster distribution analysis completed")
+            return _carbon_summary(stats, percentiles)
+        except Exception as e:
+            self.logger.error(f"Error analyzing carbon raster distribution: {str(e)}")
+            raise
+    
+    def analyze_carbon_by_zone(self, carbon_raster_path, zones, zone_field=None):
+        """
+        Break carbon stocks down by zone (management areas, lowland/upland units, road buffers).
+        
+        Args:
+            carbon_raster_path (str): Path to the carbon stock raster (tC/ha)
+            zones (geopandas.GeoDataFrame): Zone polygons
+            zone_field (str, optional): Column identifying each zone
+            
+        Returns:
+            pandas.DataFrame: Per-zone pixel count, sum, mean density, area and total carbon (tC)
+        """
+        try:
+            from zonal_stats import ZonalStatistics
+            engine = ZonalStatistics(zones, carbon_raster_path, os.path.join(self.output_dir, 'zone_cache'),
+                                     zone_field=zone_field)
+            zone_stats = engine.compute(carbon_raster_path, prefix='carbon_')
+            zone_stats = zone_stats.rename(columns={'carbon_area_weighted_sum': 'total_carbon_tc'})
+            self.logger.info("Carbon zonal analysis completed")
+            return zone_stats
+        except Exception as e:
+            self.logger.error(f"Error analyzing carbon by zone: {str(e)}")
+            raise
+    
+    def plot_carbon_map(self, carbon_stocks, output_filename, figsize=(10, 6), dpi=300):
+        """
+        Plot and save a carbon stock map.
+        
+        The map is decimated to about the output image size before plotting (block means,
+        served from the internal overviews for rasters), so time and memory depend on the
+        image size rather than the raster size.
+        
+        Args:
+            carbon_stocks (numpy.ndarray or str): Carbon stock estimates (tC/ha), or the path
+                of a carbon stock raster
+            output_filename (str): Path to save the image
+            figsize (tuple): Figure size in inches
+            dpi (int): Output resolution
+        """
+        try:
+            max_width, max_height = int(figsize[0] * dpi), int(figsize[1] * dpi)
+            extent = None
+            if isinstance(carbon_stocks, str):
+                carbon_stocks, extent = read_overview(carbon_stocks, max_width, max_height, resampling='average')
+            else:
+                factor = overview_factor(carbon_stocks.shape[1], carbon_stocks.shape[0], max_width, max_height)
+                carbon_stocks = block_reduce(carbon_stocks, factor, reducer='mean')
+            
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot()
+            image = ax.imshow(carbon_stocks, cmap='YlGn', interpolation='nearest', extent=extent)
+            fig.colorbar(image, ax=ax, label='Carbon Stock (tC/ha)')
+            ax.set_title('Carbon Stocks')
+            fig.tight_layout()
+            fig.savefig(output_filename, dpi=dpi)
+            self.logger.info(f"Carbon stock map saved to {output_filename}")
+        except Exception as e:
+            self.logger.error(f"Error plotting carbon stock map: {str(e)}")
+            raise
 
 def main():
     """Main execution function."""
@@ -8,31 +8,136 @@ Analyzes historical deforestation patterns using Hansen Global Forest Change dat
 import os
 import numpy as np
 import pandas as pd
-import geopandas as gpd
 import rasterio
-from rasterio.mask import mask
-import earthengine as ee
 import logging
-import matplotlib.pyplot as plt
-from datetime import datetime
-from scipy.ndimage import gaussian_filter
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from rasterio.windows import Window
+from raster_io import RasterWriter, MASK_OPTIONS, block_reduce, overview_factor, read_overview
+from gee_tables import GEE_EMPTY_GEO
+from pixel_area import PixelArea
+from profiling import get_profile, profile_methods
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Number of set bits for every byte value, used when np.bitwise_count is unavailable
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class PackedMask:
+    """
+    A binary raster mask stored as packed bits (one bit per pixel).
+
+    Rows are packed independently so strips of rows can be unpacked on their own,
+    and pixel counts are computed with a popcount over the packed bytes.
+    """
+
+    def __init__(self, packed, shape):
+        """
+        Initialize the PackedMask from already packed bits.
+
+        Args:
+            packed (numpy.ndarray): uint8 array packed along the last axis with np.packbits
+            shape (tuple): (rows, cols) of the unpacked mask
+        """
+        self.packed = packed
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_array(cls, mask):
+        """
+        Pack a 2-D boolean or 0/1 array.
+
+        Args:
+            mask (numpy.ndarray): Binary mask
+
+        Returns:
+            PackedMask: Packed representation of the mask
+        """
+        mask = np.asarray(mask)
+        return cls(np.packbits(mask.astype(bool, copy=False), axis=1), mask.shape)
+
+    @property
+    def nbytes(self):
+        """int: Memory used by the packed bits."""
+        return self.packed.nbytes
+
+    def count(self):
+        """
+        Count the set pixels with a popcount over the packed bytes.
+
+        Returns:
+            int: Number of pixels equal to 1
+        """
+        if hasattr(np, "bitwise_count"):
+            return int(np.bitwise_count(self.packed).sum(dtype=np.int64))
+        return int(_POPCOUNT_TABLE[self.packed].sum(dtype=np.int64))
+
+    def unpack(self, row_start=0, row_stop=None):
+        """
+        Unpack a strip of rows to a boolean array.
+
+        Args:
+            row_start (int): First row to unpack
+            row_stop (int, optional): Row after the last one to unpack (defaults to all rows)
+
+        Returns:
+            numpy.ndarray: Boolean mask of the requested rows
+        """
+        rows = np.unpackbits(self.packed[row_start:row_stop], axis=1, count=self.shape[1])
+        return rows.view(bool)
+
+    def __array__(self, dtype=None, copy=None):
+        mask = self.unpack()
+        return mask if dtype is None else mask.astype(dtype)
+
+
+def _smooth_hotspots(deforestation_data, sigma, threshold):
+    """Smooth a deforestation map in float32 and threshold it into hotspots."""
+    from scipy.ndimage import gaussian_filter
+    smoothed = gaussian_filter(deforestation_data.astype(np.float32), sigma=sigma)
+    return smoothed > threshold
+
+
+def _hotspot_tile(path, halo_window, interior, sigma, threshold):
+    """
+    Compute hotspots for one tile read with its surrounding halo.
+
+    Args:
+        path (str): Path to the deforestation raster
+        halo_window (tuple): (col_off, row_off, width, height) of the tile plus halo
+        interior (tuple): (row_start, row_stop, col_start, col_stop) of the tile within the halo window
+        sigma (float): Gaussian smoothing sigma in pixels
+        threshold (float): Threshold for hotspot identification
+
+    Returns:
+        numpy.ndarray: Hotspot mask for the tile interior
+    """
+    with rasterio.open(path) as src:
+        data = src.read(1, window=Window(*halo_window))
+    hotspots = _smooth_hotspots(data, sigma, threshold)
+    row_start, row_stop, col_start, col_stop = interior
+    return hotspots[row_start:row_stop, col_start:col_stop]
+
+
+@profile_methods
 class DeforestationAnalyzer:
     """A class for analyzing deforestation patterns and rates."""
 
-    def __init__(self, data_dir, output_dir):
+    def __init__(self, data_dir, output_dir, cache=None):
         """
         Initialize the DeforestationAnalyzer with directory paths.
 
         Args:
             data_dir (str): Path to the directory containing input data
             output_dir (str): Path to the directory for saving outputs
+            cache (RasterCache, optional): Cache serving decoded rasters as memory maps
         """
         self.data_dir = data_dir
         self.output_dir = output_dir
+        self.cache = cache
         self.logger = logging.getLogger(__name__)
 
         # Create output directory if it doesn't exist
@@ -55,8 +160,8 @@ class DeforestationAnalyzer:
                     raise FileNotFoundError(f"File not found: {path}")
                 
                 with rasterio.open(path) as src:
-                    data = src.read(1)
                     meta = src.meta.copy()
+                    data = self.cache.read(path) if self.cache is not None else src.read(1)
                 
                 forest_data[date] = {'data': data, 'meta': meta}
             self.logger.info(f"Loaded forest cover data for {len(forest_cover_paths)} time periods")
@@ -65,7 +170,7 @@ class DeforestationAnalyzer:
             self.logger.error(f"Error loading forest cover timeseries: {str(e)}")
             raise
 
-    def calculate_deforestation_rate(self, start_data, end_data, years_between):
+    def calculate_deforestation_rate(self, start_data, end_data, years_between, packed=False, meta=None):
         """
         Calculate deforestation rate between two time periods.
 
@@ -73,16 +178,26 @@ class DeforestationAnalyzer:
             start_data (numpy.ndarray): Forest cover at start period
             end_data (numpy.ndarray): Forest cover at end period
             years_between (float): Number of years between periods
+            packed (bool): Return the deforestation map as a PackedMask instead of a boolean array
+            meta (dict, optional): Raster metadata; when given, areas are reported in hectares
+                using the true pixel area, otherwise as pixel counts
 
         Returns:
-            tuple: Annual deforestation rate and total area deforested
+            tuple: Annual deforestation rate, total area deforested and the deforestation mask
         """
         try:
             if start_data.shape != end_data.shape:
                 raise ValueError("Start and end raster dimensions do not match")
 
-            deforested = np.where((start_data == 1) & (end_data == 0), 1, 0)
-            total_deforested = np.sum(deforested)
+            deforested = (start_data == 1) & (end_data == 0)
+            if meta is not None:
+                pixel_area = PixelArea(meta['transform'], meta['crs'], meta['width'], meta['height'])
+                full_window = Window(0, 0, meta['width'], meta['height'])
+                total_deforested = pixel_area.weighted_sum(deforested, full_window) / 10000
+            else:
+                total_deforested = int(np.count_nonzero(deforested))
+            if packed:
+                deforested = PackedMask.from_array(deforested)
 
             annual_rate = total_deforested / years_between if years_between > 0 else 0
 
@@ -92,40 +207,256 @@ class DeforestationAnalyzer:
             self.logger.error(f"Error calculating deforestation rate: {str(e)}")
             raise
 
-    def identify_hotspots(self, deforestation_data, threshold=0.1):
+    def calculate_deforestation_rate_windowed(self, start_path, end_path, years_between,
+                                              output_filename=None):
+        """
+        Calculate deforestation rate by streaming both rasters block by block.
+
+        Walks the internal block windows of the start raster so that peak memory
+        depends on the block size rather than the scene size. Areas are in hectares
+        from the true pixel area and match calculate_deforestation_rate with meta.
+
+        Args:
+            start_path (str): Path to the forest cover raster at start period
+            end_path (str): Path to the forest cover raster at end period
+            years_between (float): Number of years between periods
+            output_filename (str, optional): Path to write the deforestation map
+                window by window
+
+        Returns:
+            tuple: Annual deforestation rate (ha/yr) and total area deforested (ha)
+        """
+        try:
+            for path in (start_path, end_path):
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"File not found: {path}")
+
+            total_deforested = 0.0
+            with rasterio.open(start_path) as start_src, rasterio.open(end_path) as end_src:
+                if start_src.shape != end_src.shape:
+                    raise ValueError("Start and end raster dimensions do not match")
+                pixel_area = PixelArea.from_dataset(start_src)
+
+                if output_filename:
+                    writer_context = RasterWriter(output_filename, start_src.meta, dtype=rasterio.uint8,
+                                                  **MASK_OPTIONS)
+                else:
+                    writer_context = nullcontext()
+
+                with writer_context as writer:
+                    for _, window in start_src.block_windows(1):
+                        start_block = start_src.read(1, window=window)
+                        end_block = end_src.read(1, window=window)
+                        deforested = (start_block == 1) & (end_block == 0)
+                        total_deforested += pixel_area.weighted_sum(deforested, window) / 10000
+                        if writer is not None:
+                            writer.write(deforested, window=window)
+
+            annual_rate = total_deforested / years_between if years_between > 0 else 0
+
+            if output_filename:
+                self.logger.info(f"Saved raster to {output_filename}")
+            self.logger.info(f"Calculated windowed deforestation rate over {years_between} years")
+            return annual_rate, total_deforested
+        except Exception as e:
+            self.logger.error(f"Error calculating windowed deforestation rate: {str(e)}")
+            raise
+
+    def calculate_annual_loss(self, lossyear_path, area_path=None, base_year=2000, num_years=23):
+        """
+        Calculate forest loss area for every year in a single pass over a Hansen lossyear raster.
+
+        Each block is reduced with one weighted bincount, so the cost is linear in the
+        number of pixels regardless of how many loss years are reported.
+
+        Args:
+            lossyear_path (str): Path to the Hansen lossyear raster (0 = no loss, n = base_year + n)
+            area_path (str, optional): Path to a per-pixel area raster in hectares on the same grid.
+                If omitted, the true pixel area is computed from the raster grid.
+            base_year (int): Year corresponding to lossyear value 0
+            num_years (int): Number of loss years to report
+
+        Returns:
+            pandas.DataFrame: Annual loss in the Earth Engine export schema (system:index, area, year, .geo)
+        """
+        try:
+            for path in (lossyear_path, area_path):
+                if path and not os.path.exists(path):
+                    raise FileNotFoundError(f"File not found: {path}")
+
+            loss_area = np.zeros(num_years + 1, dtype=np.float64)
+            area_src = rasterio.open(area_path) if area_path else None
+            try:
+                with rasterio.open(lossyear_path) as src:
+                    if area_src is not None and area_src.shape != src.shape:
+                        raise ValueError("Loss year and area raster dimensions do not match")
+                    pixel_area = PixelArea.from_dataset(src)
+
+                    for _, window in src.block_windows(1):
+                        lossyear = src.read(1, window=window)
+                        valid = (lossyear > 0) & (lossyear <= num_years)
+                        if src.nodata is not None:
+                            valid &= lossyear != src.nodata
+                        if area_src is not None:
+                            weights = area_src.read(1, window=window)[valid]
+                        else:
+                            weights = pixel_area.block(window)[valid] / 10000
+                        loss_area += np.bincount(lossyear[valid].astype(np.intp), weights=weights,
+                                                 minlength=num_years + 1)
+            finally:
+                if area_src is not None:
+                    area_src.close()
+
+            annual_loss = pd.DataFrame({
+                'system:index': np.arange(num_years),
+                'area': np.round(loss_area[1:]),
+                'year': (base_year + np.arange(1, num_years + 1)).astype(float),
+                '.geo': GEE_EMPTY_GEO
+            })
+            self.logger.info(f"Calculated annual forest loss for {num_years} years")
+            return annual_loss
+        except Exception as e:
+            self.logger.error(f"Error calculating annual forest loss: {str(e)}")
+            raise
+
+    def save_annual_loss(self, annual_loss, output_filename):
+        """
+        Save annual forest loss in the same CSV layout as the Earth Engine export.
+
+        Args:
+            annual_loss (pandas.DataFrame): Output of calculate_annual_loss
+            output_filename (str): Path to save the CSV
+        """
+        try:
+            annual_loss.to_csv(output_filename, index=False)
+            self.logger.info(f"Annual forest loss saved to {output_filename}")
+        except Exception as e:
+            self.logger.error(f"Error saving annual forest loss: {str(e)}")
+            raise
+
+    def identify_hotspots(self, deforestation_data, threshold=0.1, sigma=2, packed=False):
         """
         Identify deforestation hotspots.
 
         Args:
-            deforestation_data (numpy.ndarray): Deforestation binary map
+            deforestation_data (numpy.ndarray or PackedMask): Deforestation binary map
             threshold (float): Threshold for hotspot identification
+            sigma (float): Gaussian smoothing sigma in pixels
+            packed (bool): Return the hotspots as a PackedMask instead of a boolean array
 
         Returns:
-            numpy.ndarray: Hotspot areas
+            numpy.ndarray or PackedMask: Hotspot areas
         """
         try:
-            smoothed = gaussian_filter(deforestation_data.astype(float), sigma=2)
-            hotspots = smoothed > threshold
+            if isinstance(deforestation_data, PackedMask):
+                deforestation_data = deforestation_data.unpack()
+            hotspots = _smooth_hotspots(deforestation_data, sigma, threshold)
+            if packed:
+                hotspots = PackedMask.from_array(hotspots)
             self.logger.info("Identified deforestation hotspots")
             return hotspots
         except Exception as e:
             self.logger.error(f"Error identifying hotspots: {str(e)}")
             raise
 
-    def save_raster(self, data, meta, output_filename):
+    def identify_hotspots_tiled(self, deforestation_path, output_filename, threshold=0.1, sigma=2,
+                                tile_size=1024, max_workers=None):
+        """
+        Identify deforestation hotspots tile by tile across a process pool.
+
+        Each tile is read with a halo of 4 sigma (the Gaussian kernel radius), so the
+        stitched result is identical to identify_hotspots. Finished tiles are streamed
+        to the output raster as they complete, keeping only a few tiles in memory.
+
+        Args:
+            deforestation_path (str): Path to the deforestation binary raster
+            output_filename (str): Path to save the hotspot raster
+            threshold (float): Threshold for hotspot identification
+            sigma (float): Gaussian smoothing sigma in pixels
+            tile_size (int): Tile edge length in pixels, excluding the halo
+            max_workers (int, optional): Number of worker processes (defaults to CPU count)
+
+        Returns:
+            int: Number of hotspot pixels
+        """
+        try:
+            if not os.path.exists(deforestation_path):
+                raise FileNotFoundError(f"File not found: {deforestation_path}")
+
+            # Same radius scipy uses for the default truncate=4.0
+            halo = int(4.0 * sigma + 0.5)
+            max_workers = max_workers or os.cpu_count() or 1
+
+            with rasterio.open(deforestation_path) as src:
+                meta = src.meta.copy()
+                height, width = src.height, src.width
+
+            def tiles():
+                for row_off in range(0, height, tile_size):
+                    for col_off in range(0, width, tile_size):
+                        tile_height = min(tile_size, height - row_off)
+                        tile_width = min(tile_size, width - col_off)
+                        halo_row = max(row_off - halo, 0)
+                        halo_col = max(col_off - halo, 0)
+                        halo_window = (halo_col, halo_row,
+                                       min(col_off + tile_width + halo, width) - halo_col,
+                                       min(row_off + tile_height + halo, height) - halo_row)
+                        interior = (row_off - halo_row, row_off - halo_row + tile_height,
+                                    col_off - halo_col, col_off - halo_col + tile_width)
+                        yield Window(col_off, row_off, tile_width, tile_height), halo_window, interior
+
+            total_hotspots = 0
+            with RasterWriter(output_filename, meta, dtype=rasterio.uint8, **MASK_OPTIONS) as writer, \
+                    ProcessPoolExecutor(max_workers=max_workers) as executor:
+                pending = deque()
+
+                def write_next():
+                    done_window, future = pending.popleft()
+                    hotspots = future.result()
+                    writer.write(hotspots, window=done_window)
+                    return int(np.count_nonzero(hotspots))
+
+                for window, halo_window, interior in tiles():
+                    pending.append((window, executor.submit(
+                        _hotspot_tile, deforestation_path, halo_window, interior, sigma, threshold)))
+                    # Bound the number of tiles held in memory
+                    if len(pending) >= 2 * max_workers:
+                        total_hotspots += write_next()
+                while pending:
+                    total_hotspots += write_next()
+
+            self.logger.info(f"Identified deforestation hotspots in tiles, saved to {output_filename}")
+            return total_hotspots
+        except Exception as e:
+            self.logger.error(f"Error identifying hotspots in tiles: {str(e)}")
+            raise
+
+    def save_raster(self, data, meta, output_filename, strip_rows=256, mask=False, compress='deflate'):
         """
-        Save a numpy array as a raster file.
+        Save a numpy array or packed mask as a tiled, compressed Cloud-Optimized GeoTIFF.
 
         Args:
-            data (numpy.ndarray): Raster data to save
+            data (numpy.ndarray or PackedMask): Raster data to save
             meta (dict): Raster metadata
             output_filename (str): Path to save the raster
+            strip_rows (int): Rows unpacked per write when data is a PackedMask
+            mask (bool): Store the data as a 1-bit 0/1 mask (deforestation maps, hotspots)
+            compress (str): Compression codec ('deflate', 'lzw' or 'zstd')
         """
         try:
             meta.update(dtype=rasterio.uint8, count=1)
-
-            with rasterio.open(output_filename, "w", **meta) as dest:
-                dest.write(data.astype(rasterio.uint8), 1)
+            if mask and not isinstance(data, PackedMask) and data.size and data.max() > 1:
+                raise ValueError(f"Mask data must be 0/1, found values up to {data.max()}")
+            options = MASK_OPTIONS if mask else {}
+
+            with RasterWriter(output_filename, meta, compress=compress, **options) as writer:
+                if isinstance(data, PackedMask):
+                    for row_start in range(0, data.shape[0], strip_rows):
+                        strip = data.unpack(row_start, row_start + strip_rows)
+                        window = Window(0, row_start, data.shape[1], strip.shape[0])
+                        writer.write(strip, window=window)
+                else:
+                    writer.write(data)
 
             self.logger.info(f"Saved raster to {output_filename}")
         except Exception as e:
@@ -134,7 +465,8 @@ class DeforestationAnalyzer:
 
     def save_results(self, results, output_prefix):
         """
-        Save analysis results to files.
+        Save analysis results to files, with the stage profile of the run
+        ({output_prefix}_profile.json and .csv) alongside.
 
         Args:
             results (dict): Analysis results
@@ -144,26 +476,71 @@ class DeforestationAnalyzer:
             results_df = pd.DataFrame([results])
             output_path = os.path.join(self.output_dir, f"{output_prefix}_results.csv")
             results_df.to_csv(output_path, index=False)
+            get_profile().save(os.path.join(self.output_dir, f"{output_prefix}_profile"))
             self.logger.info(f"Results saved to {output_path}")
         except Exception as e:
             self.logger.error(f"Error saving results: {str(e)}")
             raise
 
-    def plot_hotspots(self, hotspots, output_filename):
+    def analyze_loss_by_zone(self, deforestation_path, zones, zone_field=None):
+        """
+        Break deforested area down by zone (management areas, lowland/upland units, road buffers).
+
+        Args:
+            deforestation_path (str): Path to the deforestation binary raster
+            zones (geopandas.GeoDataFrame): Zone polygons
+            zone_field (str, optional): Column identifying each zone
+
+        Returns:
+            pandas.DataFrame: Per-zone zone area, deforested area and share of the zone deforested
+        """
+        try:
+            from zonal_stats import ZonalStatistics
+            engine = ZonalStatistics(zones, deforestation_path, os.path.join(self.output_dir, 'zone_cache'),
+                                     zone_field=zone_field)
+            zone_stats = engine.compute(deforestation_path)
+            zone_stats = zone_stats.rename(columns={
+                'area_ha': 'zone_area_ha',
+                'area_weighted_sum': 'deforested_area_ha'
+            }).drop(columns=['count', 'sum', 'mean'])
+            zone_stats['deforested_fraction'] = zone_stats['deforested_area_ha'] / zone_stats['zone_area_ha']
+            self.logger.info("Deforestation zonal analysis completed")
+            return zone_stats
+        except Exception as e:
+            self.logger.error(f"Error analyzing deforestation by zone: {str(e)}")
+            raise
+
+    def plot_hotspots(self, hotspots, output_filename, figsize=(10, 6), dpi=300):
         """
         Plot and save a map of deforestation hotspots.
 
+        The map is decimated to about the output image size before plotting, keeping the
+        maximum of each block so isolated hotspots stay visible.
+
         Args:
-            hotspots (numpy.ndarray): Hotspot binary map
+            hotspots (numpy.ndarray, PackedMask or str): Hotspot binary map, or the path of a
+                hotspot raster (streamed in strips, see read_overview)
             output_filename (str): Path to save the image
+            figsize (tuple): Figure size in inches
+            dpi (int): Output resolution
         """
         try:
-            plt.figure(figsize=(10, 6))
-            plt.imshow(hotspots, cmap='Reds', interpolation='nearest')
-            plt.colorbar(label="Hotspot Intensity")
-            plt.title("Deforestation Hotspots")
-            plt.savefig(output_filename, dpi=300)
-            plt.close()
+            max_width, max_height = int(figsize[0] * dpi), int(figsize[1] * dpi)
+            extent = None
+            if isinstance(hotspots, str):
+                hotspots, extent = read_overview(hotspots, max_width, max_height, resampling='max')
+            else:
+                factor = overview_factor(hotspots.shape[1], hotspots.shape[0], max_width, max_height)
+                hotspots = block_reduce(hotspots, factor, reducer='max')
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot()
+            image = ax.imshow(hotspots, cmap='Reds', interpolation='nearest', extent=extent)
+            fig.colorbar(image, ax=ax, label="Hotspot Intensity")
+            ax.set_title("Deforestation Hotspots")
+            fig.savefig(output_filename, dpi=dpi)
             self.logger.info(f"Hotspot map saved to {output_filename}")
         except Exception as e:
             self.logger.error(f"Error plotting hotspots: {str(e)}")
@@ -190,7 +567,7 @@ def main():
         years_between = 2020 - 2000
 
         annual_rate, total_deforested, deforestation_map = analyzer.calculate_deforestation_rate(
-            start_data, end_data, years_between
+            start_data, end_data, years_between, meta=forest_data["2000"]["meta"]
         )
 
         # Identify hotspots
@@ -198,16 +575,16 @@ def main():
 
         # Save deforestation map as raster
         raster_output_path = "results/deforestation_map.tif"
-        analyzer.save_raster(deforestation_map, forest_data["2000"]["meta"], raster_output_path)
+        analyzer.save_raster(deforestation_map, forest_data["2000"]["meta"], raster_output_path, mask=True)
 
         # Save hotspots as raster
         hotspot_output_path = "results/hotspots.tif"
-        analyzer.save_raster(hotspots.astype(np.uint8), forest_data["2000"]["meta"], hotspot_output_path)
+        analyzer.save_raster(hotspots, forest_data["2000"]["meta"], hotspot_output_path, mask=True)
 
         # Save analysis results
         results = {
-            "Annual Deforestation Rate": annual_rate,
-            "Total Deforested Area": total_deforested
+            "Annual Deforestation Rate (ha/yr)": annual_rate,
+            "Total Deforested Area (ha)": total_deforested
         }
         analyzer.save_results(results, "deforestation_analysis")
 
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Forest Definition Agreement
+--------------------------
+Cross-tabulation of the Hansen (tree cover >= 25%) and GLAD (height >= 5 m,
+1 ha minimum area) forest definitions together with the Hansen loss year and
+the GLAD forest types and loss. The classes of every layer are encoded as one
+integer per pixel (mixed radix, like np.ravel_multi_index) and reduced with a
+single area-weighted bincount per block, so the full multi-way table costs one
+streamed pass over the baseline rasters. Agreement and confusion matrices are
+marginals of that table, and disagreement rasters are written in the same pass.
+"""
+
+import os
+import logging
+from contextlib import ExitStack
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.features import geometry_mask
+from rasterio.windows import bounds as window_bounds
+from rasterio.windows import transform as window_transform
+from rasterio.windows import Window
+from shapely.geometry import box
+from baseline_assessment import (GLAD_FOREST_TYPE_NAMES, GLAD_HEIGHT_MASKED, LAYERS, glad_height_codes,
+                                 glad_minimum_area)
+from pixel_area import PixelArea
+from raster_io import RasterWriter, read_padded
+from profiling import profile_methods
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Class values of the two-way disagreement rasters (0 = outside the footprint or masked)
+DISAGREEMENT_CLASSES = {1: 'Both', 2: 'Neither', 3: 'Hansen only', 4: 'GLAD only'}
+
+# Disagreement class indexed by [hansen, glad] (0 = no, 1 = yes)
+_DISAGREEMENT_LUT = np.array([[2, 4], [3, 1]], dtype=np.uint8)
+
+FOREST_LABELS = ['Non-forest', 'Forest']
+LOSS_LABELS = ['No loss', 'Loss']
+
+
+class CrossTabulation:
+    """Area cross-tabulation of several categorical layers, one integer code per pixel."""
+
+    def __init__(self, dimensions):
+        """
+        Initialize an empty table.
+
+        Args:
+            dimensions (dict): Layer name to list of class labels; class values are the
+                positions in the list (0 .. n - 1)
+        """
+        self.names = list(dimensions)
+        self.labels = {name: list(labels) for name, labels in dimensions.items()}
+        self.shape = tuple(len(labels) for labels in self.labels.values())
+        self.size = int(np.prod(self.shape))
+        if self.size > np.iinfo(np.int32).max:
+            raise ValueError("Too many class combinations for an int32 code")
+        self.areas = np.zeros(self.shape, dtype=np.float64)
+
+    def encode(self, classes):
+        """
+        Encode the classes of a block as one integer per pixel.
+
+        Args:
+            classes (dict): Layer name to integer (or boolean) class block, all of the same shape
+
+        Returns:
+            numpy.ndarray: int32 codes in [0, size)
+        """
+        codes = None
+        for name, size in zip(self.names, self.shape):
+            values = classes[name]
+            if codes is None:
+                codes = values.astype(np.int32)
+            else:
+                codes *= size
+                codes += values
+        return codes
+
+    def update(self, classes, valid, area):
+        """
+        Add a block to the table with one weighted bincount.
+
+        Args:
+            classes (dict): Layer name to class block
+            valid (numpy.ndarray): Boolean mask of the pixels to count
+            area (numpy.ndarray): Pixel areas of the block (any unit; hectares by convention)
+        """
+        codes = self.encode(classes)[valid]
+        self.areas += np.bincount(codes, weights=area[valid], minlength=self.size).reshape(self.shape)
+
+    def merge(self, other):
+        """Add the areas of another table with the same dimensions."""
+        if other.shape != self.shape:
+            raise ValueError("Cross-tabulations have different dimensions")
+        self.areas += other.areas
+
+    def collapse(self, name, labels, mapping):
+        """
+        Merge the classes of one dimension.
+
+        Args:
+            name (str): Dimension to collapse
+            labels (list): Labels of the merged classes
+            mapping (sequence): New class of each old class
+
+        Returns:
+            CrossTabulation: New table with the dimension collapsed
+        """
+        axis = self.names.index(name)
+        collapsed = CrossTabulation({**self.labels, name: labels})
+        areas = np.moveaxis(collapsed.areas, axis, 0)
+        np.add.at(areas, np.asarray(mapping), np.moveaxis(self.areas, axis, 0))
+        return collapsed
+
+    def matrix(self, row, column):
+        """
+        Two-way area table of two dimensions, summed over all the others.
+
+        Args:
+            row (str): Dimension of the rows
+            column (str): Dimension of the columns
+
+        Returns:
+            pandas.DataFrame: Areas with class labels as index and columns
+        """
+        rows, columns = self.names.index(row), self.names.index(column)
+        other = tuple(axis for axis in range(len(self.names)) if axis not in (rows, columns))
+        areas = self.areas.sum(axis=other)
+        if rows > columns:
+            areas = areas.T
+        return pd.DataFrame(areas, index=pd.Index(self.labels[row], name=row),
+                            columns=pd.Index(self.labels[column], name=column))
+
+    def long_table(self):
+        """
+        One row per class combination with a non-zero area.
+
+        Returns:
+            pandas.DataFrame: One label column per dimension and area_ha
+        """
+        index = np.nonzero(self.areas.ravel())[0]
+        positions = np.unravel_index(index, self.shape)
+        table = pd.DataFrame({name: np.asarray(self.labels[name], dtype=object)[position]
+                              for name, position in zip(self.names, positions)})
+        table['area_ha'] = self.areas.ravel()[index]
+        return table
+
+
+def agreement_metrics(matrix):
+    """
+    Agreement statistics of a square confusion matrix of areas.
+
+    Args:
+        matrix (pandas.DataFrame): Areas with the same classes on both axes
+
+    Returns:
+        dict: Total area, overall agreement (percent), Cohen's kappa and, for two classes,
+            the areas of the four agreement classes
+    """
+    areas = matrix.to_numpy()
+    total = areas.sum()
+    metrics = {'total_ha': total}
+    if total > 0:
+        observed = np.trace(areas) / total
+        expected = (areas.sum(axis=1) @ areas.sum(axis=0)) / total ** 2
+        metrics['agreement_percent'] = observed * 100
+        metrics['kappa'] = (observed - expected) / (1 - expected) if expected < 1 else np.nan
+    else:
+        metrics['agreement_percent'] = metrics['kappa'] = np.nan
+    if areas.shape == (2, 2):
+        metrics.update(both_ha=areas[1, 1], neither_ha=areas[0, 0], hansen_only_ha=areas[1, 0],
+                       glad_only_ha=areas[0, 1])
+    return metrics
+
+
+@profile_methods
+class ForestAgreement:
+    """A class for comparing the Hansen and GLAD forest definitions pixel by pixel."""
+
+    def __init__(self, data_dir, output_dir):
+        """
+        Initialize the ForestAgreement with directory paths.
+
+        Args:
+            data_dir (str): Path to the directory containing the exported rasters
+            output_dir (str): Path to the directory for saving the tables and rasters
+        """
+        self.data_dir = data_dir
+        self.output_dir = output_dir
+        self.logger = logging.getLogger(__name__)
+
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+
+    def compute_crosstab(self, layers, aoi=None, treecover_threshold=25, height_threshold=5,
+                         neighborhood_radius=5, base_year=2000, num_years=23, disagreement_prefix=None):
+        """
+        Cross-tabulate the forest, loss and forest type classes in one pass over the rasters.
+
+        Pixels outside the AOI (or the valid data of the reference layer), off Hansen land
+        or masked in any of the layers are not counted.
+
+        Args:
+            layers (dict): Paths of the baseline rasters on a common grid, keyed by layer name
+                (see BaselineAssessment.compute_statistics); 'treecover2000' or
+                'hansen_forest_2000', 'glad_height_2000', 'lossyear', 'glad_forest_type' and
+                'glad_loss' become dimensions of the table when present
+            aoi (geopandas.GeoDataFrame, optional): Area of interest
+            treecover_threshold (float): Minimum Hansen tree cover in percent
+            height_threshold (float): Minimum GLAD forest height in meters
+            neighborhood_radius (int): Radius in pixels of the GLAD minimum-area kernel
+            base_year (int): Year corresponding to lossyear value 0
+            num_years (int): Number of loss years
+            disagreement_prefix (str, optional): Write the forest (and loss) disagreement
+                rasters as {prefix}_forest.tif and {prefix}_loss.tif in the output directory,
+                with the classes of DISAGREEMENT_CLASSES
+
+        Returns:
+            CrossTabulation: Areas in hectares
+        """
+        try:
+            unknown = set(layers) - set(LAYERS)
+            if unknown:
+                raise ValueError(f"Unknown layers: {sorted(unknown)}")
+            for path in layers.values():
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"File not found: {path}")
+
+            sources = {name: rasterio.open(path) for name, path in layers.items()}
+            try:
+                crosstab = self._reduce(sources, aoi, treecover_threshold, height_threshold,
+                                        neighborhood_radius, base_year, num_years, disagreement_prefix)
+            finally:
+                for src in sources.values():
+                    src.close()
+            self.logger.info(f"Cross-tabulated {' x '.join(crosstab.names)} over {crosstab.areas.sum():.0f} ha")
+            return crosstab
+        except Exception as e:
+            self.logger.error(f"Error computing the forest agreement: {str(e)}")
+            raise
+
+    def _dimensions(self, sources, base_year, num_years):
+        """Dimensions of the table for the available layers."""
+        dimensions = {}
+        if 'treecover2000' in sources or 'hansen_forest_2000' in sources:
+            dimensions['hansen_forest'] = FOREST_LABELS
+        if 'glad_height_2000' in sources:
+            dimensions['glad_forest'] = FOREST_LABELS
+        if 'lossyear' in sources:
+            dimensions['hansen_lossyear'] = ['No loss'] + [str(base_year + year) for year in range(1, num_years + 1)]
+        if 'glad_forest_type' in sources:
+            dimensions['glad_forest_type'] = ['Other'] + list(GLAD_FOREST_TYPE_NAMES.values())
+        if 'glad_loss' in sources:
+            dimensions['glad_loss'] = LOSS_LABELS
+        if not dimensions:
+            raise ValueError("No layers to cross-tabulate")
+        return dimensions
+
+    def _reduce(self, sources, aoi, treecover_threshold, height_threshold, radius, base_year, num_years,
+                disagreement_prefix):
+        """Stream all layers block by block and accumulate the encoded class pairs."""
+        reference_name = next(name for name in LAYERS if name in sources)
+        reference = sources[reference_name]
+        for name, src in sources.items():
+            if src.shape != reference.shape or src.transform != reference.transform:
+                raise ValueError(f"Layer {name} is not on the reference grid")
+        width, height = reference.width, reference.height
+        pixel_area = PixelArea.from_dataset(reference)
+        crosstab = CrossTabulation(self._dimensions(sources, base_year, num_years))
+        num_types = len(GLAD_FOREST_TYPE_NAMES)
+
+        aoi_geometries = None
+        if aoi is not None:
+            if aoi.crs is not None and reference.crs is not None and aoi.crs != reference.crs:
+                aoi = aoi.to_crs(reference.crs)
+            aoi_geometries = list(aoi.geometry)
+            aoi_bounds = box(*aoi.total_bounds)
+
+        def read(name, window):
+            """Read a layer and its validity for a window."""
+            src = sources[name]
+            data = src.read(1, window=window)
+            valid = data != src.nodata if src.nodata is not None else np.ones(data.shape, dtype=bool)
+            return data, valid
+
+        def footprint(window):
+            """Pixels inside the AOI (or with data in the reference layer) and on Hansen land."""
+            shape = (int(window.height), int(window.width))
+            if aoi_geometries is None:
+                inside = read(reference_name, window)[1]
+            elif not aoi_bounds.intersects(box(*window_bounds(window, reference.transform))):
+                return np.zeros(shape, dtype=bool)
+            else:
+                inside = geometry_mask(aoi_geometries, out_shape=shape, invert=True,
+                                       transform=window_transform(window, reference.transform))
+            if 'datamask' in sources:
+                datamask, valid = read('datamask', window)
+                inside &= valid & (datamask == 1)
+            return inside
+
+        def glad_codes(window):
+            """GLAD height codes before the minimum-area filter."""
+            heights, valid = read('glad_height_2000', window)
+            return glad_height_codes(heights, valid & footprint(window), height_threshold)
+
+        writers, stack = {}, ExitStack()
+        if disagreement_prefix:
+            meta = reference.meta.copy()
+            meta.update(count=1, dtype='uint8', nodata=0)
+            if 'hansen_forest' in crosstab.names and 'glad_forest' in crosstab.names:
+                writers['forest'] = stack.enter_context(RasterWriter(
+                    os.path.join(self.output_dir, f"{disagreement_prefix}_forest.tif"), meta, resampling='mode'))
+            if 'hansen_lossyear' in crosstab.names and ('glad_loss' in crosstab.names
+                                                        or 'glad_forest_type' in crosstab.names):
+                writers['loss'] = stack.enter_context(RasterWriter(
+                    os.path.join(self.output_dir, f"{disagreement_prefix}_loss.tif"), meta, resampling='mode'))
+        with stack:
+            for _, window in reference.block_windows(1):
+                window = Window(int(window.col_off), int(window.row_off), int(window.width), int(window.height))
+                valid = footprint(window)
+                if not valid.any():
+                    continue
+                classes = {}
+                if 'treecover2000' in sources:
+                    treecover, layer_valid = read('treecover2000', window)
+                    classes['hansen_forest'] = treecover >= treecover_threshold
+                    valid &= layer_valid
+                elif 'hansen_forest_2000' in sources:
+                    forest, layer_valid = read('hansen_forest_2000', window)
+                    classes['hansen_forest'] = forest > 0
+                    valid &= layer_valid
+                if 'glad_height_2000' in sources:
+                    codes = read_padded(glad_codes, window, width, height, radius, fill=GLAD_HEIGHT_MASKED)
+                    classes['glad_forest'] = glad_minimum_area(codes, window, radius)
+                    valid &= codes[radius:radius + window.height, radius:radius + window.width] != GLAD_HEIGHT_MASKED
+                if 'lossyear' in sources:
+                    lossyear, layer_valid = read('lossyear', window)
+                    classes['hansen_lossyear'] = lossyear
+                    valid &= layer_valid & (lossyear <= num_years)
+                if 'glad_forest_type' in sources:
+                    types, layer_valid = read('glad_forest_type', window)
+                    classes['glad_forest_type'] = np.where((types >= 1) & (types <= num_types), types, 0)
+                    valid &= layer_valid
+                if 'glad_loss' in sources:
+                    glad_loss, layer_valid = read('glad_loss', window)
+                    classes['glad_loss'] = glad_loss > 0
+                    valid &= layer_valid
+
+                crosstab.update(classes, valid, pixel_area.block(window) / 10000)
+
+                if 'forest' in writers:
+                    disagreement = _DISAGREEMENT_LUT[classes['hansen_forest'].view(np.uint8),
+                                                     classes['glad_forest'].view(np.uint8)]
+                    writers['forest'].write(np.where(valid, disagreement, 0), window=window)
+                if 'loss' in writers:
+                    glad_loss = classes.get('glad_loss')
+                    if glad_loss is None:
+                        glad_loss = classes['glad_forest_type'] == 2
+                    disagreement = _DISAGREEMENT_LUT[(classes['hansen_lossyear'] > 0).view(np.uint8),
+                                                     glad_loss.view(np.uint8)]
+                    writers['loss'].write(np.where(valid, disagreement, 0), window=window)
+        return crosstab
+
+    def build_tables(self, crosstab):
+        """
+        Derive the agreement and confusion matrices from the cross-tabulation.
+
+        Args:
+            crosstab (CrossTabulation): Output of compute_crosstab
+
+        Returns:
+            dict: Table name to pandas.DataFrame; matrices have the Hansen classes as
+                index and the GLAD classes as columns
+        """
+        tables = {'Hansen_GLAD_Crosstab': crosstab.long_table()}
+        names = crosstab.names
+        comparisons = {}
+        if 'hansen_forest' in names and 'glad_forest' in names:
+            comparisons['forest'] = crosstab.matrix('hansen_forest', 'glad_forest')
+            tables['Hansen_GLAD_Forest_Agreement'] = comparisons['forest']
+        if 'hansen_lossyear' in names:
+            hansen_loss = crosstab.collapse('hansen_lossyear', LOSS_LABELS,
+                                            [0] + [1] * (len(crosstab.labels['hansen_lossyear']) - 1))
+            if 'glad_loss' in names:
+                comparisons['loss'] = hansen_loss.matrix('hansen_lossyear', 'glad_loss')
+            elif 'glad_forest_type' in names:
+                # Without a GLAD loss layer, the Forest Loss type stands for GLAD loss
+                is_loss = [0] + [int(name == 'Forest Loss') for name in GLAD_FOREST_TYPE_NAMES.values()]
+                glad_loss = hansen_loss.collapse('glad_forest_type', LOSS_LABELS, is_loss)
+                comparisons['loss'] = glad_loss.matrix('hansen_lossyear', 'glad_forest_type')
+            if 'loss' in comparisons:
+                tables['Hansen_GLAD_Loss_Agreement'] = comparisons['loss']
+            if 'glad_forest_type' in names:
+                tables['Hansen_Loss_Year_by_GLAD_Type'] = crosstab.matrix('hansen_lossyear', 'glad_forest_type')
+        if 'hansen_forest' in names and 'glad_forest_type' in names:
+            tables['Hansen_Forest_by_GLAD_Type'] = crosstab.matrix('hansen_forest', 'glad_forest_type')
+        if comparisons:
+            tables['Hansen_GLAD_Agreement_Metrics'] = pd.DataFrame(
+                [{'comparison': name, **agreement_metrics(matrix)} for name, matrix in comparisons.items()])
+        return tables
+
+    def save_tables(self, tables):
+        """
+        Save the cross-tabulation and matrices as CSVs.
+
+        Args:
+            tables (dict): Output of build_tables
+
+        Returns:
+            list: Paths of the written CSVs
+        """
+        try:
+            paths = []
+            for name, table in tables.items():
+                path = os.path.join(self.output_dir, f"{name}.csv")
+                # Matrices keep their Hansen class labels as the first column
+                table.to_csv(path, index=table.index.name is not None)
+                paths.append(path)
+            self.logger.info(f"Forest agreement tables saved to {self.output_dir}")
+            return paths
+        except Exception as e:
+            self.logger.error(f"Error saving forest agreement tables: {str(e)}")
+            raise
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Earth Engine Table Schemas
+-------------------------
+Constants shared by the scripts that write CSVs in the schemas of the Earth
+Engine table exports. Kept free of heavy imports so any script can use them.
+"""
+
+# Earth Engine writes this geometry for features created without one
+GEE_EMPTY_GEO = '{"type":"MultiPoint","coordinates":[]}'
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Pixel Area
+---------
+True (ellipsoidal) area of raster pixels, the local counterpart of
+ee.Image.pixelArea(). On geographic grids the area of a pixel depends only on
+its latitude, so a single value per row is computed in closed form and cached
+per grid; area-weighted sums then reduce to a row-vector product with the
+per-row sums of a block. On projected grids the planar pixel area is corrected
+by the areal scale factor of the projection at each pixel centre. Grids without
+a CRS fall back to the planar pixel area in transform units.
+"""
+
+from functools import lru_cache
+import numpy as np
+from pyproj import CRS, Proj, Transformer
+
+
+def _authalic_integral(latitude, semi_major, eccentricity):
+    """Area between the equator and a latitude per radian of longitude on the ellipsoid."""
+    sin_lat = np.sin(np.radians(latitude))
+    if eccentricity == 0:
+        return semi_major ** 2 * sin_lat
+    e_sin = eccentricity * sin_lat
+    return semi_major ** 2 * (1 - eccentricity ** 2) / 2 * (
+        sin_lat / (1 - e_sin ** 2) + np.arctanh(e_sin) / eccentricity
+    )
+
+
+@lru_cache(maxsize=32)
+def _row_areas(transform, height, crs_wkt):
+    """Per-row pixel areas, cached by grid."""
+    ellipsoid = CRS.from_wkt(crs_wkt).ellipsoid
+    semi_major = ellipsoid.semi_major_metre
+    inverse_flattening = ellipsoid.inverse_flattening
+    flattening = 1 / inverse_flattening if inverse_flattening else 0.0
+    eccentricity = np.sqrt(flattening * (2 - flattening))
+
+    edges = transform.f + transform.e * np.arange(height + 1)
+    integral = _authalic_integral(edges, semi_major, eccentricity)
+    row_areas = np.abs(np.diff(integral)) * np.radians(abs(transform.a))
+    row_areas.setflags(write=False)
+    return row_areas
+
+
+def geographic_row_areas(transform, height, crs):
+    """
+    Compute the exact ellipsoidal area of one pixel in each row of a geographic grid.
+
+    The vector is computed once per grid and cached.
+
+    Args:
+        transform (affine.Affine): Raster transform in degrees (north-up)
+        height (int): Number of rows
+        crs: Geographic coordinate reference system of the grid
+
+    Returns:
+        numpy.ndarray: Read-only pixel area per row in square meters
+    """
+    return _row_areas(transform, int(height), CRS.from_user_input(crs).to_wkt())
+
+
+def metric_pixel_size(transform, crs, row=0):
+    """
+    Height and width of a pixel in meters, e.g. for distance_transform_edt sampling.
+
+    On geographic grids they are ellipsoidal lengths at the centre latitude of the
+    given row; on projected grids the transform units are converted to meters.
+    Without a CRS the transform units are returned unchanged.
+
+    Args:
+        transform (affine.Affine): Raster transform (north-up)
+        crs: Coordinate reference system of the grid, or None
+        row (float): Row at which the pixel size is evaluated on geographic grids
+
+    Returns:
+        tuple: (pixel height, pixel width) in meters
+    """
+    height, width = abs(transform.e), abs(transform.a)
+    if crs is None:
+        return height, width
+    crs = CRS.from_user_input(crs)
+    if crs.is_geographic:
+        latitude = transform.f + transform.e * (row + 0.5)
+        geod = crs.get_geod()
+        return (geod.line_length([0, 0], [latitude - height / 2, latitude + height / 2]),
+                geod.line_length([0, width], [latitude, latitude]))
+    factor = crs.axis_info[0].unit_conversion_factor
+    return height * factor, width * factor
+
+
+def weighted_total(values, weights):
+    """
+    Sum of values times pixel areas for a block.
+
+    Args:
+        values (numpy.ndarray): 2-D block (boolean masks count as 0/1); masked pixels must be 0
+        weights (numpy.ndarray): Per-row areas (1-D, as returned by PixelArea.weights on
+            geographic grids) or per-pixel areas (2-D)
+
+    Returns:
+        float: Weighted sum
+    """
+    if weights.ndim == 1:
+        # Row-weighted sum: one matrix-vector product instead of a 2-D area block
+        return float(weights @ values.sum(axis=1, dtype=np.float64))
+    return float(np.sum(values * weights, dtype=np.float64))
+
+
+def _linear_weights(positions, knots):
+    """Indices and weights for linear interpolation of positions between sorted knots."""
+    upper = np.clip(np.searchsorted(knots, positions), 1, len(knots) - 1)
+    lower = upper - 1
+    span = knots[upper] - knots[lower]
+    weight = np.where(span > 0, (positions - knots[lower]) / np.where(span > 0, span, 1), 0.0)
+    return lower, upper, weight
+
+
+class PixelArea:
+    """Per-pixel area of a raster grid in square meters."""
+
+    def __init__(self, transform, crs, width, height, sample_step=16):
+        """
+        Initialize the PixelArea for a grid.
+
+        Args:
+            transform (affine.Affine): Raster transform (north-up, no rotation)
+            crs: Coordinate reference system of the grid; None uses the planar area
+                abs(a * e) of the transform
+            width (int): Raster width in pixels
+            height (int): Raster height in pixels
+            sample_step (int): Spacing in pixels at which the scale factor of a projected grid
+                is evaluated; it is interpolated linearly in between
+        """
+        if transform.b != 0 or transform.d != 0:
+            raise ValueError("Rotated grids are not supported")
+        self.transform = transform
+        self.crs = CRS.from_user_input(crs) if crs is not None else None
+        self.width = width
+        self.height = height
+        self.sample_step = sample_step
+        self.planar = self.crs is None
+        self.geographic = not self.planar and self.crs.is_geographic
+        self.row_areas = geographic_row_areas(transform, height, self.crs) if self.geographic else None
+        if not self.geographic and not self.planar:
+            self._proj = Proj(self.crs)
+            self._to_lonlat = Transformer.from_crs(self.crs, self.crs.geodetic_crs, always_xy=True)
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        """Create the PixelArea for an open rasterio dataset."""
+        return cls(dataset.transform, dataset.crs, dataset.width, dataset.height)
+
+    def weights(self, window):
+        """
+        Compact pixel areas of a window for weighted_total.
+
+        Args:
+            window (rasterio.windows.Window): Window of the grid
+
+        Returns:
+            numpy.ndarray: Per-row areas (1-D) on geographic grids, per-pixel areas (2-D) otherwise
+        """
+        if self.geographic:
+            row_off = int(window.row_off)
+            return self.row_areas[row_off:row_off + int(window.height)]
+        return self.block(window)
+
+    def weighted_sum(self, values, window):
+        """
+        Area-weighted sum of a block in square meters.
+
+        Args:
+            values (numpy.ndarray): Block read from the window; masked pixels must be 0
+            window (rasterio.windows.Window): Window the block was read from
+
+        Returns:
+            float: Sum of values times pixel area
+        """
+        return weighted_total(values, self.weights(window))
+
+    def block(self, window):
+        """
+        Pixel areas of a window.
+
+        Args:
+            window (rasterio.windows.Window): Window of the grid
+
+        Returns:
+            numpy.ndarray: Area of each pixel in square meters, shape (height, width) of the window
+        """
+        row_off, col_off = int(window.row_off), int(window.col_off)
+        rows, cols = int(window.height), int(window.width)
+        if self.geographic:
+            return np.broadcast_to(self.row_areas[row_off:row_off + rows, None], (rows, cols))
+        if self.planar:
+            return np.broadcast_to(np.float64(abs(self.transform.a * self.transform.e)), (rows, cols))
+
+        # Planar area divided by the areal scale factor, which varies smoothly and is
+        # evaluated on a coarse lattice of pixel centres
+        row_knots = np.unique(np.append(np.arange(0, rows, self.sample_step), rows - 1))
+        col_knots = np.unique(np.append(np.arange(0, cols, self.sample_step), cols - 1))
+        x = self.transform.c + self.transform.a * (col_off + col_knots + 0.5)
+        y = self.transform.f + self.transform.e * (row_off + row_knots + 0.5)
+        lon, lat = self._to_lonlat.transform(*np.meshgrid(x, y))
+        factors = self._proj.get_factors(lon, lat, radians=False, errcheck=False)
+        scale = np.asarray(factors.areal_scale).reshape(len(row_knots), len(col_knots))
+
+        lower, upper, weight = _linear_weights(np.arange(cols), col_knots)
+        scale = scale[:, lower] * (1 - weight) + scale[:, upper] * weight
+        lower, upper, weight = _linear_weights(np.arange(rows), row_knots)
+        scale = scale[lower] * (1 - weight[:, None]) + scale[upper] * weight[:, None]
+        return abs(self.transform.a * self.transform.e) / scale
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Stage Profiling
+--------------
+Lightweight instrumentation of the analyzer classes. Every public method of a
+class decorated with profile_methods is recorded as a stage with its wall and
+CPU time, peak memory growth, bytes read and written by the process (rasterio,
+GDAL and geopandas I/O included) and throughput in pixels or features per
+second. Records accumulate in a per-process RunProfile that is written as JSON
+and CSV next to the analysis results.
+
+Optional hooks, enabled through environment variables so they also reach
+worker processes:
+- WILDLANDS_CPROFILE_DIR: dump a cProfile (pstats) file per top-level stage
+- WILDLANDS_TRACE_MEMORY=1: measure the exact peak of Python/NumPy allocations
+  with tracemalloc instead of the resident set high-water mark
+While a stage runs, the thread is named after it, so py-spy dump/top output
+shows which stage a sample belongs to.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import resource
+import threading
+import tracemalloc
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+import numpy as np
+
+CPROFILE_DIR_ENV = 'WILDLANDS_CPROFILE_DIR'
+TRACE_MEMORY_ENV = 'WILDLANDS_TRACE_MEMORY'
+
+RASTER_EXTENSIONS = ('.tif', '.tiff', '.vrt', '.img', '.jp2')
+
+# Columns of the CSV profile, in order
+PROFILE_COLUMNS = ('stage', 'depth', 'parent', 'status', 'started', 'wall_s', 'cpu_s', 'cpu_children_s',
+                   'peak_rss_delta_mb', 'peak_traced_mb', 'bytes_read', 'bytes_written', 'items', 'unit',
+                   'items_per_s')
+
+logger = logging.getLogger(__name__)
+
+
+def _io_counters():
+    """Bytes read and written by this process through system calls (Linux only)."""
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(':') for line in f.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _peak_rss_mb():
+    """Resident set high-water mark in MB (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _children_cpu_s():
+    """CPU time of terminated child processes (process pools) in seconds."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _raster_pixels(path):
+    """Pixel count of a raster file, read from its header (None if it is not a raster)."""
+    if not str(path).lower().endswith(RASTER_EXTENSIONS) or not os.path.exists(path):
+        return None
+    import rasterio
+    try:
+        with rasterio.open(path) as src:
+            return src.width * src.height
+    except rasterio.errors.RasterioIOError:
+        return None
+
+
+def count_items(args, kwargs):
+    """
+    Estimate the amount of data a stage processes from its arguments.
+
+    Arrays and packed masks count their pixels, raster paths the pixels of the raster
+    and GeoDataFrames their features; dicts (e.g. date to path) count the sum of their
+    values. The largest count is reported.
+
+    Args:
+        args (tuple): Positional arguments of the call (without self)
+        kwargs (dict): Keyword arguments of the call
+
+    Returns:
+        tuple: (items, unit) with unit 'pixels' or 'features', or (None, None)
+    """
+    best = (None, None)
+    for value in list(args) + list(kwargs.values()):
+        items, unit = None, None
+        if isinstance(value, dict):
+            counts = [count_items((item,), {}) for item in value.values()]
+            counts = [count for count in counts if count[0] is not None]
+            if counts:
+                items, unit = sum(count[0] for count in counts), counts[0][1]
+        elif isinstance(value, np.ndarray) and value.ndim >= 2:
+            items, unit = value.size, 'pixels'
+        elif hasattr(value, 'unpack') and hasattr(value, 'shape'):
+            items, unit = int(np.prod(value.shape)), 'pixels'
+        elif hasattr(value, 'geometry') and hasattr(value, '__len__'):
+            items, unit = len(value), 'features'
+        elif isinstance(value, (str, os.PathLike)):
+            items, unit = _raster_pixels(value), 'pixels'
+        if items is not None and (best[0] is None or items > best[0]):
+            best = (int(items), unit)
+    return best
+
+
+class RunProfile:
+    """Stage records of one process, written as JSON and CSV profiles."""
+
+    def __init__(self):
+        """Initialize an empty profile."""
+        self.records = []
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self._local = threading.local()
+
+    @property
+    def _stack(self):
+        """Open stages of the current thread (innermost last)."""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def reset(self):
+        """Drop the recorded stages."""
+        self.records = []
+        self.started = datetime.now().isoformat(timespec='seconds')
+
+    @contextmanager
+    def stage(self, name, items=None, unit=None):
+        """
+        Record a block of code as a stage.
+
+        Args:
+            name (str): Stage name, e.g. 'DeforestationAnalyzer.calculate_annual_loss'
+            items (int, optional): Pixels or features processed, for the throughput
+            unit (str, optional): Unit of items
+
+        Yields:
+            dict: The stage record; items and unit may be set inside the block
+        """
+        stack = self._stack
+        record = {'stage': name, 'depth': len(stack), 'parent': stack[-1]['stage'] if stack else None,
+                  'status': 'ok', 'started': datetime.now().isoformat(timespec='milliseconds'),
+                  'items': items, 'unit': unit}
+        trace_memory = os.environ.get(TRACE_MEMORY_ENV) == '1'
+        cprofile_dir = os.environ.get(CPROFILE_DIR_ENV)
+
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            traced_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        record['_child_peak'] = 0
+        profiler = cProfile.Profile() if cprofile_dir and not stack else None
+        thread = threading.current_thread()
+        thread_name = thread.name
+        thread.name = name
+
+        read_start, written_start = _io_counters()
+        rss_start = _peak_rss_mb()
+        children_start = _children_cpu_s()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        stack.append(record)
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        except BaseException:
+            record['status'] = 'failed'
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            stack.pop()
+            record['wall_s'] = time.perf_counter() - wall_start
+            record['cpu_s'] = time.process_time() - cpu_start
+            record['cpu_children_s'] = _children_cpu_s() - children_start
+            record['peak_rss_delta_mb'] = _peak_rss_mb() - rss_start
+            read_end, written_end = _io_counters()
+            record['bytes_read'] = read_end - read_start if read_end is not None else None
+            record['bytes_written'] = written_end - written_start if written_end is not None else None
+            record['peak_traced_mb'] = None
+            child_peak = record.pop('_child_peak')
+            if trace_memory:
+                # Nested stages reset the peak, so combine it with theirs
+                peak = max(tracemalloc.get_traced_memory()[1], child_peak)
+                record['peak_traced_mb'] = (peak - traced_start) / 2 ** 20
+                if stack:
+                    stack[-1]['_child_peak'] = max(stack[-1]['_child_peak'], peak)
+            record['items_per_s'] = (record['items'] / record['wall_s']
+                                     if record['items'] and record['wall_s'] > 0 else None)
+            thread.name = thread_name
+            if profiler is not None:
+                os.makedirs(cprofile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(cprofile_dir, f"{name}.{os.getpid()}.{len(self.records)}.prof"))
+            self.records.append(record)
+            logger.debug(f"Stage {name}: {record['wall_s']:.3f} s wall, {record['cpu_s']:.3f} s CPU")
+
+    def summary(self):
+        """
+        Aggregate the top-level stages by name.
+
+        Returns:
+            pandas.DataFrame: Calls, total wall and CPU time and share of the run per stage,
+                slowest first
+        """
+        import pandas as pd
+        top = pd.DataFrame([record for record in self.records if record['depth'] == 0],
+                           columns=PROFILE_COLUMNS)
+        summary = top.groupby('stage').agg(calls=('wall_s', 'size'), wall_s=('wall_s', 'sum'),
+                                           cpu_s=('cpu_s', 'sum'), bytes_read=('bytes_read', 'sum'),
+                                           bytes_written=('bytes_written', 'sum'))
+        summary['share'] = summary['wall_s'] / summary['wall_s'].sum()
+        return summary.sort_values('wall_s', ascending=False).reset_index()
+
+    def save(self, path_prefix):
+        """
+        Write the profile as {path_prefix}.json and {path_prefix}.csv.
+
+        Args:
+            path_prefix (str): Output path without extension, e.g. results/deforestation_analysis_profile
+
+        Returns:
+            tuple: Paths of the JSON and CSV files
+        """
+        import pandas as pd
+        json_path, csv_path = f"{path_prefix}.json", f"{path_prefix}.csv"
+        with open(json_path, 'w') as f:
+            json.dump({'started': self.started, 'pid': os.getpid(), 'stages': self.records}, f, indent=2)
+        pd.DataFrame(self.records, columns=PROFILE_COLUMNS).to_csv(csv_path, index=False)
+        return json_path, csv_path
+
+
+# Profile of the current process
+_PROFILE = RunProfile()
+
+
+def get_profile():
+    """Return the profile of the current process."""
+    return _PROFILE
+
+
+def profiled(method):
+    """
+    Decorator recording each call of a method as a stage named Class.method.
+
+    Args:
+        method (callable): Method to instrument
+
+    Returns:
+        callable: Wrapped method
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        items, unit = count_items(args, kwargs)
+        with _PROFILE.stage(f"{type(self).__name__}.{method.__name__}", items, unit):
+            return method(self, *args, **kwargs)
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+def profile_methods(cls):
+    """
+    Class decorator instrumenting every public method defined on the class.
+
+    Args:
+        cls (type): Class to instrument
+
+    Returns:
+        type: The same class
+    """
+    for name, attribute in list(vars(cls).items()):
+        if (name.startswith('_') or not callable(attribute) or isinstance(attribute, (staticmethod, classmethod))
+                or getattr(attribute, '__profiled__', False)):
+            continue
+        setattr(cls, name, profiled(attribute))
+    return cls
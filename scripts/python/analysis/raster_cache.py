@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Raster Cache
+-----------
+Content-addressed local cache of decoded raster bands. The first read of a band
+decodes the (compressed) GeoTIFF block by block into an uncompressed .npy file;
+later reads are served as read-only memory-mapped views, so repeated runs over
+the same inputs skip decompression entirely.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import rasterio
+from rasterio.windows import Window, intersect
+
+
+class RasterCache:
+    """A disk cache of decoded raster bands served as read-only memory maps."""
+
+    def __init__(self, cache_dir, max_bytes=20 * 1024 ** 3):
+        """
+        Initialize the RasterCache.
+
+        Args:
+            cache_dir (str): Directory holding the cached .npy files
+            max_bytes (int): Total disk budget; least recently used entries are evicted beyond it
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+
+        # Create cache directory if it doesn't exist
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _key(self, path, band, window):
+        """Build the cache key from the source path, its modification time, size, band and window."""
+        stat = os.stat(path)
+        window_key = None
+        if window is not None:
+            window_key = [int(window.col_off), int(window.row_off), int(window.width), int(window.height)]
+        identity = {
+            'path': os.path.abspath(path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'band': band,
+            'window': window_key
+        }
+        return hashlib.sha1(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+    def read(self, path, band=1, window=None):
+        """
+        Read a raster band, decoding it into the cache on first access.
+
+        Args:
+            path (str): Path to the raster file
+            band (int): Band index to read
+            window (rasterio.windows.Window, optional): Window to read (defaults to the full band)
+
+        Returns:
+            numpy.memmap: Read-only view of the decoded band
+        """
+        try:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"File not found: {path}")
+
+            cache_path = os.path.join(self.cache_dir, f"{self._key(path, band, window)}.npy")
+            if os.path.exists(cache_path):
+                # Refresh the modification time so eviction is least recently used
+                os.utime(cache_path)
+                self.logger.info(f"Serving {path} from raster cache")
+                return np.load(cache_path, mmap_mode='r')
+
+            self._decode(path, band, window, cache_path)
+            self.evict(keep=cache_path)
+            self.logger.info(f"Cached {path} to {cache_path}")
+            return np.load(cache_path, mmap_mode='r')
+        except Exception as e:
+            self.logger.error(f"Error reading raster through cache: {str(e)}")
+            raise
+
+    def _decode(self, path, band, window, cache_path):
+        """Decode a band block by block into a new .npy file."""
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with rasterio.open(path) as src:
+            if window is None:
+                window = Window(0, 0, src.width, src.height)
+            target = np.lib.format.open_memmap(
+                tmp_path, mode='w+', dtype=src.dtypes[band - 1], shape=(int(window.height), int(window.width))
+            )
+            try:
+                for _, block in src.block_windows(band):
+                    if not intersect(block, window):
+                        continue
+                    overlap = block.intersection(window)
+                    row = int(overlap.row_off - window.row_off)
+                    col = int(overlap.col_off - window.col_off)
+                    target[row:row + int(overlap.height), col:col + int(overlap.width)] = \
+                        src.read(band, window=overlap)
+                target.flush()
+            finally:
+                del target
+        # Atomic rename so concurrent readers never see a partial file
+        os.replace(tmp_path, cache_path)
+
+    def size(self):
+        """
+        Total size of the cached files.
+
+        Returns:
+            int: Size in bytes
+        """
+        return sum(entry.stat().st_size for entry in os.scandir(self.cache_dir)
+                   if entry.name.endswith('.npy'))
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits in its disk budget.
+
+        Args:
+            keep (str, optional): Cache file that must not be evicted
+        """
+        entries = sorted(
+            (entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.npy')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.path == keep:
+                continue
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                # Still memory-mapped by another process (Windows); try again next time
+                continue
+
+    def clear(self):
+        """Remove every cached entry."""
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npy'):
+                os.remove(entry.path)
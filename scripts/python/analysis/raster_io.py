@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Raster I/O Helpers
+-----------------
+Shared writer for the raster outputs of the analysis scripts. Rasters are written
+as Cloud-Optimized GeoTIFFs: internally tiled, compressed and with overview pyramids
+stored ahead of the full-resolution data, so QGIS and the shared drive only have to
+read the tiles in view.
+"""
+
+import os
+import math
+import warnings
+import numpy as np
+import rasterio
+import rasterio.shutil
+from rasterio.enums import OverviewResampling, Resampling
+from rasterio.windows import Window
+
+# Creation options for binary 0/1 masks (deforestation maps, hotspots)
+MASK_OPTIONS = {'nbits': 1, 'predictor': 1, 'resampling': 'nearest'}
+
+# Reductions supported by block_reduce (NaN-aware)
+BLOCK_REDUCERS = {'max': np.nanmax, 'min': np.nanmin, 'mean': np.nanmean}
+
+# Pixels per strip when block_reduce streams a band from disk
+STRIP_PIXELS = 1 << 24
+
+# Profile keys that are GeoTIFF creation options rather than dataset metadata
+CREATION_OPTION_KEYS = ('tiled', 'blockxsize', 'blockysize', 'compress', 'predictor', 'nbits', 'bigtiff')
+
+
+def overview_factors(width, height, blocksize=512):
+    """
+    Compute overview decimation factors until the overview fits in a single block.
+
+    Args:
+        width (int): Raster width in pixels
+        height (int): Raster height in pixels
+        blocksize (int): Internal tile size in pixels
+
+    Returns:
+        list: Decimation factors (2, 4, 8, ...)
+    """
+    factors = []
+    factor = 2
+    while max(width, height) / (factor / 2) > blocksize:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+class RasterWriter:
+    """
+    Write a single-band raster as a tiled, compressed Cloud-Optimized GeoTIFF.
+
+    Use as a context manager and call write() with the whole array or with blocks
+    and their windows. When overviews are requested the data is first written to a
+    temporary tiled GeoTIFF, the pyramid is built there and the result is copied
+    into COG layout on close.
+    """
+
+    def __init__(self, path, meta, dtype=None, compress='deflate', predictor=None, blocksize=512,
+                 nbits=None, overviews=True, resampling='nearest'):
+        """
+        Initialize the writer.
+
+        Args:
+            path (str): Output raster path
+            meta (dict): Raster metadata (driver, crs, transform, width, height, ...)
+            dtype (str, optional): Output data type (defaults to meta['dtype'])
+            compress (str): Compression codec, one of 'deflate', 'lzw', 'zstd' or None
+            predictor (int, optional): TIFF predictor (defaults to 2 for integers, 3 for floats)
+            blocksize (int): Internal tile size in pixels (multiple of 16)
+            nbits (int, optional): Bits per sample, e.g. 1 for binary masks; the output then
+                has no nodata value
+            overviews (bool): Build internal overview pyramids
+            resampling (str): Resampling method for overviews ('nearest', 'average', 'mode', ...)
+        """
+        self.path = path
+        self.overviews = overviews
+        self.resampling = Resampling[resampling]
+        self.blocksize = blocksize
+
+        dtype = np.dtype(dtype or meta['dtype'])
+        if predictor is None:
+            predictor = 3 if np.issubdtype(dtype, np.floating) else 2
+
+        self.profile = meta.copy()
+        self.profile.update(driver='GTiff', dtype=dtype.name, count=1, tiled=True,
+                            blockxsize=blocksize, blockysize=blocksize, bigtiff='IF_SAFER')
+        if compress:
+            self.profile.update(compress=compress.upper(), predictor=predictor)
+        if nbits:
+            # A source nodata value (e.g. 255) does not fit a reduced bit depth, and any
+            # value that does would mask valid mask pixels
+            self.profile.pop('nodata', None)
+            self.profile.update(nbits=nbits)
+
+        self._tmp_path = f"{path}.tmp.tif" if overviews else path
+        self._dst = None
+
+    def __enter__(self):
+        self._dst = rasterio.open(self._tmp_path, 'w', **self.profile)
+        return self
+
+    def write(self, data, window=None):
+        """
+        Write the full array or a single block.
+
+        Args:
+            data (numpy.ndarray): 2-D array to write
+            window (rasterio.windows.Window, optional): Target window for a block
+        """
+        self._dst.write(data.astype(self.profile['dtype'], copy=False), 1, window=window)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._dst.close()
+        if exc_type is not None:
+            if self._tmp_path != self.path and os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+            return False
+
+        if self.overviews:
+            try:
+                with rasterio.open(self._tmp_path, 'r+') as dst:
+                    factors = overview_factors(dst.width, dst.height, self.blocksize)
+                    if factors:
+                        dst.build_overviews(factors, self.resampling)
+                        dst.update_tags(ns='rio_overview', resampling=self.resampling.name)
+                # Copying with the source overviews places them ahead of the
+                # full-resolution data, which is the Cloud-Optimized layout
+                creation_options = {key: self.profile[key] for key in CREATION_OPTION_KEYS
+                                    if key in self.profile}
+                rasterio.shutil.copy(self._tmp_path, self.path, driver='GTiff',
+                                     copy_src_overviews=True, **creation_options)
+            finally:
+                os.remove(self._tmp_path)
+        return False
+
+
+def write_raster(path, data, meta, **options):
+    """
+    Write a 2-D array as a Cloud-Optimized GeoTIFF.
+
+    Args:
+        path (str): Output raster path
+        data (numpy.ndarray): Raster data
+        meta (dict): Raster metadata
+        **options: Creation options passed to RasterWriter
+
+    Returns:
+        str: Path of the written raster
+    """
+    with RasterWriter(path, meta, **options) as writer:
+        writer.write(data)
+    return path
+
+
+def overview_factor(width, height, max_width, max_height):
+    """
+    Integer decimation factor so a raster fits in a target image size.
+
+    Args:
+        width (int): Raster width in pixels
+        height (int): Raster height in pixels
+        max_width (int): Target image width in pixels
+        max_height (int): Target image height in pixels
+
+    Returns:
+        int: Decimation factor (1 = full resolution)
+    """
+    return max(1, math.ceil(width / max_width), math.ceil(height / max_height))
+
+
+def read_overview(path, max_width, max_height, resampling='average', band=1):
+    """
+    Read a raster decimated to roughly a target image size.
+
+    For overview resampling methods ('average', 'mode', 'nearest', ...) GDAL serves
+    the read from the internal overview closest to the requested resolution, so memory
+    and time depend on the output size, not the raster size. GDAL cannot build 'max'
+    or 'min' overviews, so these reductions stream the full-resolution band in strips
+    through block_reduce: memory stays bounded by the strip and output size, but time
+    grows with the raster size.
+
+    Args:
+        path (str): Raster path
+        max_width (int): Target image width in pixels
+        max_height (int): Target image height in pixels
+        resampling (str): Reduction of each block of pixels ('average', 'mode', 'max', 'min', ...)
+        band (int): Band index to read
+
+    Returns:
+        tuple: Masked array of the decimated band and the plotting extent (left, right, bottom, top)
+    """
+    with rasterio.open(path) as src:
+        factor = overview_factor(src.width, src.height, max_width, max_height)
+        out_shape = (math.ceil(src.height / factor), math.ceil(src.width / factor))
+        if resampling in OverviewResampling.__members__:
+            data = src.read(band, out_shape=out_shape, resampling=Resampling[resampling], masked=True)
+        elif resampling in BLOCK_REDUCERS:
+            strip_rows = max(factor, STRIP_PIXELS // src.width)
+            data = np.ma.masked_invalid(block_reduce(_BandStrips(src, band), factor, reducer=resampling,
+                                                     strip_rows=strip_rows), copy=False)
+        else:
+            raise ValueError(f"Unsupported resampling for overview reads: {resampling}")
+        bounds = src.bounds
+    return data, (bounds.left, bounds.right, bounds.bottom, bounds.top)
+
+
+class _BandStrips:
+    """Rows of a raster band as float32 with nodata as NaN, read on demand by block_reduce."""
+
+    def __init__(self, src, band):
+        self.src = src
+        self.band = band
+        self.shape = (src.height, src.width)
+
+    def unpack(self, row_start, row_stop):
+        window = Window(0, row_start, self.src.width, row_stop - row_start)
+        return self.src.read(self.band, window=window, masked=True).astype(np.float32).filled(np.nan)
+
+
+def block_reduce(data, factor, reducer='max', strip_rows=4096):
+    """
+    Decimate an array by reducing factor x factor blocks, one strip of rows at a time.
+
+    Args:
+        data: 2-D array, or an object with shape and unpack(row_start, row_stop) such as PackedMask
+        factor (int): Block size in pixels
+        reducer (str): 'max', 'min' or 'mean'; NaNs are ignored
+        strip_rows (int): Rows processed at once (rounded to a multiple of factor)
+
+    Returns:
+        numpy.ndarray: float32 array of shape (ceil(rows / factor), ceil(cols / factor))
+    """
+    rows, cols = data.shape
+    get_rows = data.unpack if hasattr(data, 'unpack') else (lambda start, stop: data[start:stop])
+    if factor <= 1:
+        return np.asarray(get_rows(0, rows), dtype=np.float32)
+    reduce = BLOCK_REDUCERS[reducer]
+    strip_rows = max(factor, strip_rows // factor * factor)
+    out_cols = math.ceil(cols / factor)
+    strips = []
+    for row_start in range(0, rows, strip_rows):
+        strip = np.asarray(get_rows(row_start, min(row_start + strip_rows, rows)), dtype=np.float32)
+        pad_rows = -strip.shape[0] % factor
+        if pad_rows or out_cols * factor != cols:
+            strip = np.pad(strip, ((0, pad_rows), (0, out_cols * factor - cols)), constant_values=np.nan)
+        with warnings.catch_warnings():
+            # Blocks that are entirely nodata reduce to NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            strips.append(reduce(strip.reshape(strip.shape[0] // factor, factor, out_cols, factor), axis=(1, 3)))
+    return np.concatenate(strips)
+
+
+def read_padded(read_mask, window, width, height, halo, fill):
+    """
+    Read a window plus halo, padding the parts outside the raster with a constant.
+
+    Args:
+        read_mask (callable): Function returning the data of a Window
+        window (rasterio.windows.Window): Tile window
+        width (int): Raster width
+        height (int): Raster height
+        halo (int): Halo width in pixels
+        fill: Value used outside the raster
+
+    Returns:
+        numpy.ndarray: Array of shape (window.height + 2 * halo, window.width + 2 * halo)
+    """
+    row_start = max(window.row_off - halo, 0)
+    col_start = max(window.col_off - halo, 0)
+    row_stop = min(window.row_off + window.height + halo, height)
+    col_stop = min(window.col_off + window.width + halo, width)
+    data = read_mask(Window(col_start, row_start, col_stop - col_start, row_stop - row_start))
+    pad = ((row_start - (window.row_off - halo), window.row_off + window.height + halo - row_stop),
+           (col_start - (window.col_off - halo), window.col_off + window.width + halo - col_stop))
+    return np.pad(data, pad, constant_values=fill)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Raster Statistics
+----------------
+Single-pass, mergeable summary statistics for raster blocks. Partial results
+from different blocks, chunks or worker processes are combined exactly with
+Chan's parallel variance update, so a raster only has to be read once.
+"""
+
+import numpy as np
+from pixel_area import weighted_total
+
+
+class StreamingStats:
+    """
+    Accumulate count, sum, min, max, variance and an optional histogram over raster blocks.
+
+    When pixel areas are passed as weights, the total weight (area) and the
+    area-weighted sum of the values are accumulated as well.
+    """
+
+    def __init__(self, histogram_range=None, bins=1000):
+        """
+        Initialize an empty accumulator.
+
+        Args:
+            histogram_range (tuple, optional): (min, max) of a fixed-bin histogram used for
+                approximate percentiles. Values outside the range are clipped into the end bins.
+            bins (int): Number of histogram bins
+        """
+        self.count = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.weight = 0.0
+        self.weighted_sum = 0.0
+        self.histogram_range = histogram_range
+        self.histogram = np.zeros(bins, dtype=np.int64) if histogram_range is not None else None
+
+    def update(self, block, nodata=None, mask=None, weights=None):
+        """
+        Add a block of values.
+
+        Args:
+            block (numpy.ndarray): Raster block
+            nodata (float, optional): Nodata value to exclude
+            mask (numpy.ndarray, optional): Boolean array, True where pixels are valid
+            weights (numpy.ndarray, optional): Pixel areas of the block, per row (1-D) or
+                per pixel (2-D), see PixelArea.weights
+
+        Returns:
+            StreamingStats: self
+        """
+        valid = np.isfinite(block) if np.issubdtype(block.dtype, np.floating) else np.ones(block.shape, bool)
+        if nodata is not None:
+            valid &= block != nodata
+        if mask is not None:
+            valid &= mask
+        values = block[valid].astype(np.float64, copy=False)
+        if values.size == 0:
+            return self
+
+        block_stats = StreamingStats()
+        block_stats.count = values.size
+        block_stats.sum = float(values.sum())
+        block_stats.mean = block_stats.sum / values.size
+        block_stats.m2 = float(np.square(values - block_stats.mean).sum())
+        block_stats.min = float(values.min())
+        block_stats.max = float(values.max())
+        if weights is not None:
+            block_stats.weight = weighted_total(valid, weights)
+            block_stats.weighted_sum = weighted_total(np.where(valid, block, 0), weights)
+        if self.histogram is not None:
+            low, high = self.histogram_range
+            clipped = np.clip(values, low, high)
+            block_stats.histogram = np.histogram(clipped, bins=self.histogram.size, range=self.histogram_range)[0]
+            block_stats.histogram_range = self.histogram_range
+        return self.merge(block_stats)
+
+    def merge(self, other):
+        """
+        Merge the partial result of another accumulator (Chan et al. parallel update).
+
+        Args:
+            other (StreamingStats): Partial statistics to merge
+
+        Returns:
+            StreamingStats: self
+        """
+        if other.count == 0:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.weight += other.weight
+        self.weighted_sum += other.weighted_sum
+        if self.histogram is not None:
+            if other.histogram is None or other.histogram_range != self.histogram_range \
+                    or other.histogram.size != self.histogram.size:
+                raise ValueError("Cannot merge statistics with different histograms")
+            self.histogram += other.histogram
+        return self
+
+    @property
+    def variance(self):
+        """float: Population variance of the accumulated values."""
+        return self.m2 / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        """float: Population standard deviation of the accumulated values."""
+        return float(np.sqrt(self.variance))
+
+    def percentile(self, q):
+        """
+        Approximate a percentile from the histogram.
+
+        Args:
+            q (float): Percentile in [0, 100]
+
+        Returns:
+            float: Approximate value, accurate to one histogram bin width
+        """
+        if self.histogram is None:
+            raise ValueError("Percentiles require a histogram_range")
+        if self.count == 0:
+            return np.nan
+        cumulative = np.cumsum(self.histogram)
+        target = q / 100 * cumulative[-1]
+        index = int(np.searchsorted(cumulative, target))
+        index = min(index, self.histogram.size - 1)
+        low, high = self.histogram_range
+        width = (high - low) / self.histogram.size
+        before = cumulative[index - 1] if index > 0 else 0
+        fraction = (target - before) / self.histogram[index] if self.histogram[index] else 0.0
+        value = low + (index + fraction) * width
+        return float(np.clip(value, self.min, self.max))
+
+    def result(self, prefix='', percentiles=()):
+        """
+        Summarize the accumulated statistics.
+
+        Args:
+            prefix (str): Prefix for the result keys
+            percentiles (sequence): Percentiles to include as '{prefix}p{q}'
+
+        Returns:
+            dict: count, total, mean, std, min and max (plus requested percentiles)
+        """
+        stats = {
+            f'{prefix}count': self.count,
+            f'{prefix}total': self.sum,
+            f'{prefix}mean': self.sum / self.count if self.count else np.nan,
+            f'{prefix}std': self.std,
+            f'{prefix}min': self.min if self.count else np.nan,
+            f'{prefix}max': self.max if self.count else np.nan
+        }
+        for q in percentiles:
+            stats[f'{prefix}p{q:g}'] = self.percentile(q)
+        return stats
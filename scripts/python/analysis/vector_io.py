@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Vector I/O Helpers
+-----------------
+Columnar reading and writing of large vector layers such as province-wide road
+networks. GeoParquet files are read through pyarrow, other formats through
+pyogrio's Arrow path when available. Reads can be restricted to the features
+touching an area of interest and large files can be iterated in chunks, so only
+the part of a layer around the park is ever materialized.
+"""
+
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import geopandas as gpd
+import shapely
+from pyproj import CRS, Transformer
+
+try:
+    import pyogrio
+except ImportError:  # Fall back to geopandas/fiona
+    pyogrio = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # GeoParquet support is optional
+    pq = None
+
+PARQUET_EXTENSIONS = ('.parquet', '.geoparquet')
+
+logger = logging.getLogger(__name__)
+
+
+def is_parquet(path):
+    """Return True if the path points to a GeoParquet file."""
+    return os.path.splitext(str(path))[1].lower() in PARQUET_EXTENSIONS
+
+
+def _parquet_geo_metadata(path):
+    """Read the GeoParquet 'geo' metadata of a file."""
+    metadata = pq.read_schema(path).metadata or {}
+    if b'geo' not in metadata:
+        raise ValueError(f"{path} has no GeoParquet metadata")
+    return json.loads(metadata[b'geo'])
+
+
+def dataset_crs(path):
+    """
+    Read the coordinate reference system of a vector file without loading features.
+
+    Args:
+        path (str): Path to the vector file
+
+    Returns:
+        pyproj.CRS: Layer CRS, or None if the layer has none
+    """
+    if is_parquet(path):
+        geo = _parquet_geo_metadata(path)
+        crs = geo['columns'][geo['primary_column']].get('crs', 'OGC:CRS84')
+        return CRS.from_user_input(crs) if crs is not None else None
+    if pyogrio is not None:
+        crs = pyogrio.read_info(path)['crs']
+        return CRS.from_user_input(crs) if crs else None
+    return gpd.read_file(path, rows=0).crs
+
+
+def aoi_bbox(aoi, target_crs=None):
+    """
+    Compute the bounding box of an area of interest in the CRS of the layer to read.
+
+    Args:
+        aoi: GeoDataFrame, GeoSeries, shapely geometry or (minx, miny, maxx, maxy) tuple.
+            Geometries without a CRS and tuples are assumed to be in target_crs.
+        target_crs (pyproj.CRS, optional): CRS of the layer to read
+
+    Returns:
+        tuple: (minx, miny, maxx, maxy) in target_crs
+    """
+    if isinstance(aoi, (gpd.GeoDataFrame, gpd.GeoSeries)):
+        bounds, aoi_crs = tuple(aoi.total_bounds), aoi.crs
+    elif isinstance(aoi, shapely.Geometry):
+        bounds, aoi_crs = aoi.bounds, None
+    else:
+        bounds, aoi_crs = tuple(aoi), None
+    if aoi_crs is not None and target_crs is not None and CRS.from_user_input(aoi_crs) != target_crs:
+        transformer = Transformer.from_crs(aoi_crs, target_crs, always_xy=True)
+        bounds = transformer.transform_bounds(*bounds, densify_pts=21)
+    return tuple(float(value) for value in bounds)
+
+
+def _clip_to_aoi(data, aoi):
+    """Clip features to the AOI geometry (bounding box for tuples)."""
+    if isinstance(aoi, (gpd.GeoDataFrame, gpd.GeoSeries)):
+        return gpd.clip(data, aoi.to_crs(data.crs) if aoi.crs is not None else aoi)
+    if isinstance(aoi, shapely.Geometry):
+        return gpd.clip(data, aoi)
+    return gpd.clip(data, shapely.box(*aoi))
+
+
+def _bbox_filter(data, bbox):
+    """Keep the features whose geometry intersects the bounding box."""
+    return data[shapely.intersects(data.geometry.values, shapely.box(*bbox))]
+
+
+def _batch_to_frame(batch, geometry_column, crs):
+    """Convert an Arrow record batch with a WKB geometry column to a GeoDataFrame."""
+    frame = batch.to_pandas()
+    geometry = shapely.from_wkb(frame.pop(geometry_column).values)
+    chunk = gpd.GeoDataFrame(frame, geometry=gpd.GeoSeries(geometry, crs=crs, index=frame.index), crs=crs)
+    return chunk.rename_geometry(geometry_column) if geometry_column != 'geometry' else chunk
+
+
+def read_vector(path, aoi=None, columns=None, where=None, clip=False):
+    """
+    Read a vector layer, optionally only the features touching an area of interest.
+
+    Args:
+        path (str): Path to a GeoParquet, GeoPackage, shapefile or GeoJSON file
+        aoi (optional): Area of interest (GeoDataFrame, geometry or bounds tuple);
+            only features intersecting its bounding box are read
+        columns (list, optional): Attribute columns to read (geometry is always read)
+        where (str, optional): SQL WHERE clause (OGR formats only)
+        clip (bool): Clip the features to the AOI geometry after reading
+
+    Returns:
+        geopandas.GeoDataFrame: Layer features
+    """
+    bbox = aoi_bbox(aoi, dataset_crs(path)) if aoi is not None else None
+
+    if is_parquet(path):
+        if pq is None:
+            raise ImportError("Reading GeoParquet requires pyarrow")
+        if where is not None:
+            raise ValueError("where is not supported for GeoParquet; filter the result instead")
+        if columns is not None:
+            geo = _parquet_geo_metadata(path)
+            columns = list(columns) + [geo['primary_column']]
+        # Uses the bbox covering column for row-group pruning when the file has one
+        data = gpd.read_parquet(path, columns=columns, bbox=bbox)
+        if bbox is not None:
+            data = _bbox_filter(data, bbox)
+    elif pyogrio is not None:
+        data = pyogrio.read_dataframe(path, columns=columns, where=where, bbox=bbox,
+                                      use_arrow=pq is not None)
+    else:
+        data = gpd.read_file(path, bbox=bbox, columns=columns, where=where)
+        data = data if columns is None else data[list(columns) + [data.geometry.name]]
+
+    if clip and aoi is not None:
+        data = _clip_to_aoi(data, aoi)
+    logger.info(f"Read {len(data)} features from {path}")
+    return data
+
+
+def iter_vector_chunks(path, chunk_size=100000, aoi=None, columns=None):
+    """
+    Iterate over a large vector layer in chunks of features.
+
+    Args:
+        path (str): Path to the vector file
+        chunk_size (int): Maximum number of features per chunk
+        aoi (optional): Area of interest; only features intersecting its bounding box are returned
+        columns (list, optional): Attribute columns to read
+
+    Yields:
+        geopandas.GeoDataFrame: Consecutive chunks of the layer
+    """
+    crs = dataset_crs(path)
+    bbox = aoi_bbox(aoi, crs) if aoi is not None else None
+
+    if is_parquet(path):
+        if pq is None:
+            raise ImportError("Reading GeoParquet requires pyarrow")
+        geo = _parquet_geo_metadata(path)
+        geometry_column = geo['primary_column']
+        if geo['columns'][geometry_column].get('encoding', 'WKB').upper() != 'WKB':
+            raise ValueError("Chunked reads require WKB-encoded GeoParquet")
+        if columns is not None:
+            columns = list(columns) + [geometry_column]
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            chunk = _batch_to_frame(batch, geometry_column, crs)
+            if bbox is not None:
+                chunk = _bbox_filter(chunk, bbox)
+            if len(chunk):
+                yield chunk
+        return
+
+    if pyogrio is not None and pq is not None:
+        # One sequential pass over the layer; batches are already bbox-filtered by OGR
+        with pyogrio.open_arrow(path, columns=columns, bbox=bbox, batch_size=chunk_size,
+                                use_pyarrow=True) as (meta, reader):
+            geometry_column = meta['geometry_name'] or 'wkb_geometry'
+            for batch in reader:
+                if batch.num_rows:
+                    # Same geometry column name as pyogrio.read_dataframe
+                    yield _batch_to_frame(batch, geometry_column, crs).rename_geometry('geometry')
+        return
+
+    # Without the Arrow reader each chunk is a new read that skips the features before it
+    offset = 0
+    while True:
+        if pyogrio is not None:
+            chunk = pyogrio.read_dataframe(path, columns=columns, bbox=bbox, skip_features=offset,
+                                           max_features=chunk_size)
+        else:
+            chunk = gpd.read_file(path, bbox=bbox, rows=slice(offset, offset + chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+        offset += len(chunk)
+        if len(chunk) < chunk_size:
+            return
+
+
+def read_vectors(paths, aoi=None, max_workers=4, **kwargs):
+    """
+    Read several vector layers concurrently (pyogrio and pyarrow release the GIL while decoding).
+
+    Args:
+        paths (dict): Mapping of layer name to file path
+        aoi (optional): Area of interest passed to read_vector
+        max_workers (int): Number of reader threads
+        **kwargs: Further arguments passed to read_vector
+
+    Returns:
+        dict: Mapping of layer name to GeoDataFrame
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(read_vector, path, aoi=aoi, **kwargs) for name, path in paths.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def write_vector(data, path, row_group_size=100000):
+    """
+    Write a vector layer, choosing the format from the file extension.
+
+    GeoParquet files are written with a bbox covering column so later AOI reads can
+    skip row groups; other formats are written through pyogrio's Arrow path when available.
+
+    Args:
+        data (geopandas.GeoDataFrame): Features to write
+        path (str): Output path (.parquet/.geoparquet, .gpkg, .shp, .geojson, ...)
+        row_group_size (int): Rows per Parquet row group
+
+    Returns:
+        str: Path of the written file
+    """
+    if is_parquet(path):
+        if pq is None:
+            raise ImportError("Writing GeoParquet requires pyarrow")
+        data.to_parquet(path, index=False, write_covering_bbox=True, row_group_size=row_group_size)
+    elif pyogrio is not None:
+        data.to_file(path, engine='pyogrio', use_arrow=pq is not None)
+    else:
+        data.to_file(path)
+    logger.info(f"Wrote {len(data)} features to {path}")
+    return path
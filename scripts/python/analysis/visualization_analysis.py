@@ -8,17 +8,25 @@ Creates advanced visualizations for forest change analysis, including:
 - Statistical distribution plots
 - Interactive maps (using folium)
 - Custom matplotlib-based visualizations
+
+Figures are described by specs (plain dicts) and rendered with object-oriented
+matplotlib Figures on the Agg canvas, so batches can be rendered in worker
+processes without shared pyplot state. Figures whose spec and data are
+unchanged since the last render are skipped.
 """
 
+import os
+import json
+import hashlib
+import inspect
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import folium
 from pathlib import Path
-import geopandas as gpd
 import logging
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from profiling import get_profile, profile_methods
 
 # Configure logging
 logging.basicConfig(
@@ -26,6 +34,122 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# Record of the spec hashes of rendered figures, kept in the output directory
+FIGURE_MANIFEST = '.figure_manifest.json'
+
+
+def _render_timeseries(ax, spec):
+    """Line plot with markers, e.g. forest cover over time."""
+    data = spec['data']
+    ax.plot(data[spec.get('x', 'year')], data[spec.get('y', 'forest_cover')], marker='o')
+    ax.grid(True)
+
+
+def _render_bar(ax, spec):
+    """Bar chart of a DataFrame column or of a {category: value} dict."""
+    data = spec['data']
+    if isinstance(data, dict):
+        categories, values = list(data.keys()), list(data.values())
+    else:
+        categories, values = data[spec.get('x', 'year')], data[spec.get('y', 'area')]
+    ax.bar(categories, values, color=spec.get('color', 'forestgreen'), alpha=spec.get('alpha', 0.7))
+    if spec.get('rotate_labels'):
+        ax.tick_params(axis='x', labelrotation=spec['rotate_labels'])
+    ax.grid(True, alpha=0.3)
+
+
+def _render_distribution(ax, spec):
+    """Histogram with a Gaussian kernel density estimate scaled to counts."""
+    values = np.asarray(spec['data'][spec['column']], dtype=float)
+    values = values[np.isfinite(values)]
+    color = spec.get('color', 'tab:blue')
+    counts, edges, _ = ax.hist(values, bins=spec.get('bins', 10), color=color, alpha=0.5, edgecolor='white')
+    if spec.get('kde', True) and len(values) > 1 and np.ptp(values) > 0:
+        from scipy.stats import gaussian_kde
+        grid = np.linspace(edges[0], edges[-1], 200)
+        ax.plot(grid, gaussian_kde(values)(grid) * len(values) * (edges[1] - edges[0]), color=color)
+    ax.grid(True, alpha=0.3)
+
+
+def _render_pie(ax, spec):
+    """Pie chart of a DataFrame column."""
+    data = spec['data']
+    ax.pie(data[spec['values']], labels=data[spec['labels']], autopct='%1.1f%%', colors=spec.get('colors'))
+
+
+def _render_trend(ax, spec):
+    """Annual values with a moving average."""
+    data = spec['data']
+    x, y = data[spec.get('x', 'year')], data[spec.get('y', 'area')]
+    window = spec.get('window', 5)
+    ax.plot(x, y, 'r-', label='Annual Loss', alpha=0.6)
+    ax.plot(x, y.rolling(window=window).mean(), 'b-', label=f'{window}-year Moving Average', linewidth=2)
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+
+FIGURE_RENDERERS = {
+    'timeseries': _render_timeseries,
+    'bar': _render_bar,
+    'distribution': _render_distribution,
+    'pie': _render_pie,
+    'trend': _render_trend
+}
+
+
+def figure_hash(spec):
+    """
+    Hash a figure spec, its data and the code of its renderer.
+
+    Args:
+        spec (dict): Figure spec
+
+    Returns:
+        str: SHA-1 hex digest
+    """
+    digest = hashlib.sha1()
+    data = spec.get('data')
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        digest.update(repr(list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]).encode())
+    else:
+        digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+    options = {key: value for key, value in spec.items() if key != 'data'}
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    digest.update(inspect.getsource(FIGURE_RENDERERS[spec['kind']]).encode())
+    return digest.hexdigest()
+
+
+def render_figure(spec, output_dir):
+    """
+    Render one figure spec to a PNG with an object-oriented Figure on the Agg canvas.
+
+    Args:
+        spec (dict): Figure spec with 'kind', 'output' (file name) and 'data', plus optional
+            'title', 'xlabel', 'ylabel', 'figsize', 'dpi' and renderer-specific options
+        output_dir (str): Directory for the PNG
+
+    Returns:
+        str: Path of the written figure
+    """
+    figure = Figure(figsize=spec.get('figsize', (12, 6)))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    FIGURE_RENDERERS[spec['kind']](ax, spec)
+    if spec.get('title'):
+        ax.set_title(spec['title'], **spec.get('title_kwargs', {}))
+    if spec.get('xlabel'):
+        ax.set_xlabel(spec['xlabel'], **spec.get('label_kwargs', {}))
+    if spec.get('ylabel'):
+        ax.set_ylabel(spec['ylabel'], **spec.get('label_kwargs', {}))
+    if spec.get('tight_layout'):
+        figure.tight_layout()
+    output_path = os.path.join(output_dir, spec['output'])
+    figure.savefig(output_path, dpi=spec.get('dpi', 300), bbox_inches='tight')
+    return output_path
+
+
+@profile_methods
 class ForestVisualization:
     """A class for creating advanced visualizations of forest analysis data."""
     
@@ -44,6 +168,54 @@ class ForestVisualization:
         # Create output directory if it doesn't exist
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
+    def render_figures(self, specs, max_workers=None, force=False):
+        """
+        Render a batch of figure specs, in parallel worker processes when max_workers > 1.
+
+        Figures whose spec, data and renderer are unchanged since they were last rendered
+        (and whose PNG still exists) are skipped.
+
+        Args:
+            specs (list): Figure specs (see render_figure)
+            max_workers (int, optional): Number of worker processes (None = one per core)
+            force (bool): Render every figure even when it is up to date
+
+        Returns:
+            dict: Output file name to 'rendered' or 'skipped'
+        """
+        try:
+            manifest_path = self.output_dir / FIGURE_MANIFEST
+            manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+            status, pending = {}, []
+            for spec in specs:
+                if spec['kind'] not in FIGURE_RENDERERS:
+                    raise ValueError(f"Unknown figure kind: {spec['kind']}")
+                key = figure_hash(spec)
+                if not force and manifest.get(spec['output']) == key and (self.output_dir / spec['output']).exists():
+                    status[spec['output']] = 'skipped'
+                else:
+                    pending.append((spec, key))
+
+            if max_workers == 1 or len(pending) <= 1:
+                paths = [render_figure(spec, str(self.output_dir)) for spec, _ in pending]
+            else:
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    paths = list(executor.map(render_figure, [spec for spec, _ in pending],
+                                              [str(self.output_dir)] * len(pending)))
+
+            for (spec, key), path in zip(pending, paths):
+                manifest[spec['output']] = key
+                status[spec['output']] = 'rendered'
+                self.logger.info(f"Saved figure to {path}")
+            tmp_path = manifest_path.with_name(f"{FIGURE_MANIFEST}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+            os.replace(tmp_path, manifest_path)
+            return status
+        except Exception as e:
+            self.logger.error(f"Error rendering figures: {str(e)}")
+            raise
+
     def plot_forest_change_timeseries(self, data, title="Forest Cover Change Over Time"):
         """
         Create a time series plot of forest cover changes.
@@ -52,16 +224,10 @@ class ForestVisualization:
             data (pd.DataFrame): DataFrame with dates and forest cover values
             title (str): Plot title
         """
-        plt.figure(figsize=(12, 6))
-        sns.lineplot(data=data, x='year', y='forest_cover', marker='o')
-        plt.title(title)
-        plt.xlabel('Year')
-        plt.ylabel('Forest Cover (ha)')
-        plt.grid(True)
-        
-        output_path = self.output_dir / 'forest_change_timeseries.png'
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        output_path = render_figure({
+            'kind': 'timeseries', 'output': 'forest_change_timeseries.png', 'data': data,
+            'title': title, 'xlabel': 'Year', 'ylabel': 'Forest Cover (ha)'
+        }, str(self.output_dir))
         self.logger.info(f"Saved time series plot to {output_path}")
         
     def create_comparative_analysis(self, baseline_stats, current_stats, output_name="comparative_analysis.png"):
@@ -73,20 +239,10 @@ class ForestVisualization:
             current_stats (dict): Current forest statistics
             output_name (str): Name for the output file
         """
-        categories = list(baseline_stats.keys())
-        baseline_values = list(baseline_stats.values())
-        
-        plt.figure(figsize=(12, 6))
-        plt.bar(categories, baseline_values, color='forestgreen', alpha=0.7)
-        plt.title('Forest Type Distribution')
-        plt.xlabel('Forest Type')
-        plt.ylabel('Area (ha)')
-        plt.xticks(rotation=45)
-        plt.grid(True, alpha=0.3)
-        
-        output_path = self.output_dir / output_name
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        output_path = render_figure({
+            'kind': 'bar', 'output': output_name, 'data': dict(baseline_stats), 'rotate_labels': 45,
+            'title': 'Forest Type Distribution', 'xlabel': 'Forest Type', 'ylabel': 'Area (ha)'
+        }, str(self.output_dir))
         self.logger.info(f"Saved comparative analysis to {output_path}")
         
     def plot_statistical_distribution(self, data, column, output_name="distribution.png"):
@@ -98,25 +254,101 @@ class ForestVisualization:
             column (str): Column to analyze
             output_name (str): Name for the output file
         """
-        plt.figure(figsize=(12, 7))
+        output_path = render_figure(annual_loss_distribution_spec(data, column, output_name),
+                                    str(self.output_dir))
+        self.logger.info(f"Saved distribution plot to {output_path}")
         
-        # Create a combination of histogram and kernel density estimation
-        sns.histplot(data=data, x=column, kde=True, bins=10)
+    def create_tiled_map(self, raster_layers=None, vector_layers=None, output_name="interactive_map.html",
+                         min_zoom=8, max_zoom=14, max_workers=None):
+        """
+        Create an interactive folium map backed by local XYZ tile pyramids.
         
-        plt.title('Distribution of Annual Forest Loss (2001-2023)', fontsize=12, pad=15)
-        plt.xlabel('Forest Loss (hectares per year)', fontsize=10)
-        plt.ylabel('Number of Years with This Loss Range', fontsize=10)
+        Layers are exported to output_dir/tiles and referenced by URL rather than embedded,
+        so the map opens instantly however large the AOI.
         
-        # Add grid for better readability
-        plt.grid(True, alpha=0.3)
+        Args:
+            raster_layers (dict, optional): Layer name to {'path': raster path, plus optional
+                'cmap', 'vmin', 'vmax', 'resampling', 'zero_transparent'}
+            vector_layers (dict, optional): Layer name to {'data': GeoDataFrame, plus optional 'color'}
+            output_name (str): Name for the HTML map
+            min_zoom (int): First zoom level of the pyramids
+            max_zoom (int): Last zoom level of the pyramids
+            max_workers (int, optional): Number of tile rendering processes
         
-        # Adjust layout to prevent label cutoff
-        plt.tight_layout()
+        Returns:
+            str: Path of the HTML map
+        """
+        try:
+            from web_tiles import WebTileExporter
+            exporter = WebTileExporter(str(self.output_dir / 'tiles'), max_workers=max_workers)
+            layers = []
+            for name, options in (raster_layers or {}).items():
+                options = dict(options)
+                layers.append(exporter.export_raster(options.pop('path'), name, min_zoom, max_zoom, **options))
+            for name, options in (vector_layers or {}).items():
+                options = dict(options)
+                layers.append(exporter.export_vector(options.pop('data'), name, min_zoom, max_zoom, **options))
+            output_path = str(self.output_dir / output_name)
+            exporter.create_map(layers, output_path)
+            return output_path
+        except Exception as e:
+            self.logger.error(f"Error creating tiled map: {str(e)}")
+            raise
         
-        output_path = self.output_dir / output_name
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        self.logger.info(f"Saved distribution plot to {output_path}")
+
+def annual_loss_distribution_spec(data, column, output_name="distribution.png"):
+    """Spec of the histogram and density of annual forest loss."""
+    return {
+        'kind': 'distribution', 'output': output_name, 'data': data[[column]], 'column': column,
+        'bins': 10, 'figsize': (12, 7), 'tight_layout': True,
+        'title': 'Distribution of Annual Forest Loss (2001-2023)', 'title_kwargs': {'fontsize': 12, 'pad': 15},
+        'xlabel': 'Forest Loss (hectares per year)', 'ylabel': 'Number of Years with This Loss Range',
+        'label_kwargs': {'fontsize': 10}
+    }
+
+
+def report_figure_specs(annual_loss_df, glad_stats, initial_forest):
+    """
+    Build the specs of the standard report figures.
+
+    Args:
+        annual_loss_df (pd.DataFrame): Annual loss table (year, area)
+        glad_stats (pd.DataFrame): GLAD forest type statistics (forest_type, area_ha)
+        initial_forest (float): Forest area in 2000 (ha)
+
+    Returns:
+        list: Figure specs
+    """
+    annual_loss_df = annual_loss_df[['year', 'area']].copy()
+    annual_loss_df['forest_cover'] = initial_forest - annual_loss_df['area'].cumsum()
+    return [
+        # 1. Time series of forest cover
+        {'kind': 'timeseries', 'output': 'forest_change_timeseries.png',
+         'data': annual_loss_df[['year', 'forest_cover']],
+         'title': "Algonquin Park Forest Cover Change (2001-2023)", 'xlabel': 'Year',
+         'ylabel': 'Forest Cover (ha)'},
+        # 2. Annual forest loss
+        {'kind': 'bar', 'output': 'annual_forest_loss.png', 'data': annual_loss_df[['year', 'area']],
+         'color': 'darkred', 'title': 'Annual Forest Loss in Algonquin Park (2001-2023)',
+         'xlabel': 'Year', 'ylabel': 'Area Lost (ha)'},
+        # 3. Comparative analysis between forest types
+        {'kind': 'bar', 'output': 'forest_type_distribution.png',
+         'data': dict(zip(glad_stats['forest_type'], glad_stats['area_ha'])), 'rotate_labels': 45,
+         'title': 'Forest Type Distribution', 'xlabel': 'Forest Type', 'ylabel': 'Area (ha)'},
+        # 4. Statistical distribution of annual forest loss
+        annual_loss_distribution_spec(pd.DataFrame({'Annual Forest Loss': annual_loss_df['area']}),
+                                      'Annual Forest Loss', 'annual_loss_distribution.png'),
+        # 5. Pie chart of forest types
+        {'kind': 'pie', 'output': 'forest_type_pie.png', 'data': glad_stats[['forest_type', 'area_ha']],
+         'values': 'area_ha', 'labels': 'forest_type', 'figsize': (10, 10),
+         'colors': ['darkgreen', 'red', 'lightgreen', 'orange'],
+         'title': 'Forest Type Distribution in Algonquin Park'},
+        # 6. Trend analysis with a 5-year moving average
+        {'kind': 'trend', 'output': 'forest_loss_trend.png', 'data': annual_loss_df[['year', 'area']],
+         'window': 5, 'title': 'Forest Loss Trend Analysis (2001-2023)', 'xlabel': 'Year',
+         'ylabel': 'Area Lost (ha)'}
+    ]
+
 
 def main():
     """Main execution function."""
@@ -127,75 +359,13 @@ def main():
     )
     
     try:
-        # 1. Create time series visualization of annual forest loss
         annual_loss_df = pd.read_csv("results/Annual_Forest_Loss_2001_2023.csv")
-        
-        # Create cumulative forest cover time series
-        initial_forest = 690675.0  # From Overall_Forest_Statistics.csv
-        annual_loss_df['cumulative_loss'] = annual_loss_df['area'].cumsum()
-        annual_loss_df['forest_cover'] = initial_forest - annual_loss_df['cumulative_loss']
-        
-        visualizer.plot_forest_change_timeseries(
-            data=annual_loss_df[['year', 'forest_cover']],
-            title="Algonquin Park Forest Cover Change (2001-2023)"
-        )
-        
-        # 2. Create forest loss trend visualization
-        plt.figure(figsize=(12, 6))
-        plt.bar(annual_loss_df['year'], annual_loss_df['area'], color='darkred', alpha=0.7)
-        plt.title('Annual Forest Loss in Algonquin Park (2001-2023)')
-        plt.xlabel('Year')
-        plt.ylabel('Area Lost (ha)')
-        plt.grid(True, alpha=0.3)
-        plt.savefig('results/visualizations/annual_forest_loss.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 3. Create comparative analysis between forest types
         glad_stats = pd.read_csv("results/GLAD_Forest_Type_Statistics.csv")
-        forest_types = dict(zip(glad_stats['forest_type'], glad_stats['area_ha']))
-        
-        visualizer.create_comparative_analysis(
-            baseline_stats=forest_types,
-            current_stats=forest_types,  # Using same data as it's current state
-            output_name="forest_type_distribution.png"
-        )
-        
-        # 4. Create statistical distribution of annual forest loss
-        loss_stats = pd.DataFrame({
-            'Annual Forest Loss': annual_loss_df['area']
-        })
-        
-        visualizer.plot_statistical_distribution(
-            loss_stats,
-            'Annual Forest Loss',
-            'annual_loss_distribution.png'
-        )
-        
-        # 5. Create a pie chart of forest types
-        plt.figure(figsize=(10, 10))
-        plt.pie(glad_stats['area_ha'], 
-                labels=glad_stats['forest_type'], 
-                autopct='%1.1f%%',
-                colors=['darkgreen', 'red', 'lightgreen', 'orange'])
-        plt.title('Forest Type Distribution in Algonquin Park')
-        plt.savefig('results/visualizations/forest_type_pie.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 6. Create trend analysis visualization
-        # Calculate moving average of forest loss
-        annual_loss_df['moving_avg'] = annual_loss_df['area'].rolling(window=5).mean()
-        
-        plt.figure(figsize=(12, 6))
-        plt.plot(annual_loss_df['year'], annual_loss_df['area'], 'r-', label='Annual Loss', alpha=0.6)
-        plt.plot(annual_loss_df['year'], annual_loss_df['moving_avg'], 'b-', 
-                label='5-year Moving Average', linewidth=2)
-        plt.title('Forest Loss Trend Analysis (2001-2023)')
-        plt.xlabel('Year')
-        plt.ylabel('Area Lost (ha)')
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.savefig('results/visualizations/forest_loss_trend.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        initial_forest = 690675.0  # From Overall_Forest_Statistics.csv
+        
+        # Render all report figures in parallel; unchanged figures are skipped
+        visualizer.render_figures(report_figure_specs(annual_loss_df, glad_stats, initial_forest))
+        get_profile().save(str(visualizer.output_dir / "visualization_profile"))
         
         visualizer.logger.info("All visualizations completed successfully!")
         
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Web Map Tiles
+------------
+Exports analysis layers as local XYZ PNG tile pyramids (Web Mercator) for
+interactive folium maps. Rasters (deforestation, hotspots, carbon) are warped
+only at the deepest zoom level and every coarser level is reduced from the four
+tiles below it, so the raster is read once however many levels are exported.
+Vector layers (roads, impact zones) are simplified to the pixel size of each
+zoom level and rasterized; a vector tile at zoom z + 1 is rendered only if its
+parent at zoom z had features. Only tiles that contain data are written. Tiles
+are rendered in worker processes, and the folium map references the pyramids
+instead of embedding the layers, so the HTML stays small however large the AOI.
+"""
+
+import os
+import json
+import math
+import shutil
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import rasterio
+import shapely
+from matplotlib import colormaps
+from matplotlib.colors import Normalize, to_rgba
+from matplotlib.image import imsave
+from rasterio.enums import Resampling
+from rasterio.features import rasterize
+from rasterio.transform import from_bounds
+from rasterio.warp import reproject, transform_bounds
+from raster_io import block_reduce
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+WEB_MERCATOR = 'EPSG:3857'
+TILE_SIZE = 256
+# Fast zlib level: tiles are written once and mostly transparent
+PNG_OPTIONS = {'compress_level': 1}
+# Half the circumference of the Web Mercator world square (m)
+ORIGIN_SHIFT = math.pi * 6378137.0
+# block_reduce reducer used to build a parent tile for each warp resampling;
+# other methods take every second pixel of the child tiles
+TILE_REDUCERS = {'max': 'max', 'min': 'min', 'average': 'mean'}
+
+
+def tile_resolution(zoom, tile_size=TILE_SIZE):
+    """Ground resolution of a tile pixel at a zoom level (Web Mercator meters)."""
+    return 2 * ORIGIN_SHIFT / (tile_size * 2 ** zoom)
+
+
+def tile_bounds(zoom, x, y):
+    """
+    Web Mercator bounds of an XYZ tile.
+
+    Args:
+        zoom (int): Zoom level
+        x (int): Tile column
+        y (int): Tile row (0 at the north edge)
+
+    Returns:
+        tuple: (minx, miny, maxx, maxy) in meters
+    """
+    size = 2 * ORIGIN_SHIFT / 2 ** zoom
+    return (x * size - ORIGIN_SHIFT, ORIGIN_SHIFT - (y + 1) * size,
+            (x + 1) * size - ORIGIN_SHIFT, ORIGIN_SHIFT - y * size)
+
+
+def tiles_for_bounds(bounds, zoom):
+    """
+    List the tiles of a zoom level covering Web Mercator bounds.
+
+    Args:
+        bounds (tuple): (minx, miny, maxx, maxy) in meters
+        zoom (int): Zoom level
+
+    Returns:
+        list: (x, y) tile indices
+    """
+    size = 2 * ORIGIN_SHIFT / 2 ** zoom
+    last = 2 ** zoom - 1
+    x0 = min(max(int((bounds[0] + ORIGIN_SHIFT) // size), 0), last)
+    x1 = min(max(int((bounds[2] + ORIGIN_SHIFT) // size), 0), last)
+    y0 = min(max(int((ORIGIN_SHIFT - bounds[3]) // size), 0), last)
+    y1 = min(max(int((ORIGIN_SHIFT - bounds[1]) // size), 0), last)
+    return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+
+def _children(tiles):
+    """Tiles of the next zoom level covering the given tiles."""
+    return [(2 * x + dx, 2 * y + dy) for x, y in tiles for dy in (0, 1) for dx in (0, 1)]
+
+
+def _tile_path(tiles_dir, zoom, x, y):
+    """Path of a tile PNG in a {z}/{x}/{y}.png pyramid, creating its directory."""
+    directory = os.path.join(tiles_dir, str(zoom), str(x))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{y}.png")
+
+
+def _overview_level(src, zoom):
+    """Index of the coarsest internal overview still finer than the tile resolution (None = full)."""
+    bounds = transform_bounds(src.crs, WEB_MERCATOR, *src.bounds)
+    resolution = (bounds[2] - bounds[0]) / src.width
+    level = None
+    for index, factor in enumerate(src.overviews(1)):
+        if resolution * factor <= tile_resolution(zoom):
+            level = index
+    return level
+
+
+def _reduce_tile(data, resampling):
+    """Halve a tile's resolution the way its parent combines it (None stays None)."""
+    if data is None:
+        return None
+    if resampling in TILE_REDUCERS:
+        return block_reduce(data, 2, reducer=TILE_REDUCERS[resampling])
+    return data[::2, ::2]
+
+
+def _parent_tile(children):
+    """Mosaic the half-resolution data of four child tiles ((dx, dy) -> array or None) into their parent."""
+    half = TILE_SIZE // 2
+    data = np.full((TILE_SIZE, TILE_SIZE), np.nan, dtype=np.float32)
+    for (dx, dy), child in children.items():
+        if child is not None:
+            data[dy * half:(dy + 1) * half, dx * half:(dx + 1) * half] = child
+    return data
+
+
+def _colorize(data, style, cmap, norm):
+    """RGBA image of a tile, or None if it has no visible data."""
+    empty = np.isnan(data)
+    if style['zero_transparent']:
+        empty |= data == 0
+    if empty.all():
+        return None
+    rgba = cmap(norm(np.where(empty, style['vmin'], data)), bytes=True)
+    rgba[empty, 3] = 0
+    return rgba
+
+
+def _render_raster_tiles(raster_path, zoom, roots, max_zoom, bounds, tiles_dir, style):
+    """
+    Render root tiles and all their descendants down to max_zoom (worker function).
+
+    Only max_zoom tiles are warped from the raster: from full resolution for 'max'
+    (decimated overviews can drop isolated pixels), otherwise from the closest internal
+    overview. Every tile above is reduced from its four children, depth first, so only
+    the tiles on the current path are held in memory.
+
+    Args:
+        raster_path (str): Source raster
+        zoom (int): Zoom level of the root tiles
+        roots (list): (x, y) root tiles
+        max_zoom (int): Deepest zoom level
+        bounds (tuple): Web Mercator bounds of the raster; tiles outside are skipped
+        tiles_dir (str): Root of the tile pyramid
+        style (dict): cmap, vmin, vmax, resampling and zero_transparent
+
+    Returns:
+        tuple: Tiles written per zoom level (dict) and the half-resolution data of each
+            root tile for its parent (dict, None where the root has no data)
+    """
+    cmap = colormaps[style['cmap']]
+    norm = Normalize(style['vmin'], style['vmax'], clip=True)
+    resampling = style['resampling']
+    written = {level: [] for level in range(zoom, max_zoom + 1)}
+    level = None
+    if resampling != 'max':
+        with rasterio.open(raster_path) as full:
+            level = _overview_level(full, max_zoom)
+
+    with rasterio.open(raster_path, overview_level=level) as src:
+        def render(tile_zoom, x, y):
+            tile = tile_bounds(tile_zoom, x, y)
+            if tile[0] >= bounds[2] or tile[2] <= bounds[0] or tile[1] >= bounds[3] or tile[3] <= bounds[1]:
+                return None
+            if tile_zoom == max_zoom:
+                data = np.full((TILE_SIZE, TILE_SIZE), np.nan, dtype=np.float32)
+                reproject(rasterio.band(src, 1), data, src_nodata=src.nodata, dst_nodata=np.nan,
+                          dst_transform=from_bounds(*tile, TILE_SIZE, TILE_SIZE),
+                          dst_crs=WEB_MERCATOR, resampling=Resampling[resampling], init_dest_nodata=False)
+            else:
+                children = {(dx, dy): render(tile_zoom + 1, 2 * x + dx, 2 * y + dy)
+                            for dy in (0, 1) for dx in (0, 1)}
+                if all(child is None for child in children.values()):
+                    return None
+                data = _parent_tile(children)
+            if np.isnan(data).all():
+                return None
+            rgba = _colorize(data, style, cmap, norm)
+            if rgba is not None:
+                imsave(_tile_path(tiles_dir, tile_zoom, x, y), rgba, pil_kwargs=PNG_OPTIONS)
+                written[tile_zoom].append((x, y))
+            return _reduce_tile(data, resampling)
+
+        reduced = {(x, y): render(zoom, x, y) for x, y in roots}
+    return written, reduced
+
+
+def _render_vector_tiles(geometries, zoom, tiles, tiles_dir, color):
+    """
+    Rasterize simplified geometries into the tiles of one zoom level (worker function).
+
+    Args:
+        geometries (numpy.ndarray): Web Mercator geometries intersecting the tiles
+        zoom (int): Zoom level
+        tiles (list): (x, y) tiles to render
+        tiles_dir (str): Root of the tile pyramid
+        color (tuple): RGBA color as 0-255 integers
+
+    Returns:
+        list: Tiles that contained features and were written
+    """
+    tree = shapely.STRtree(geometries)
+    written = []
+    for x, y in tiles:
+        bounds = tile_bounds(zoom, x, y)
+        hits = geometries[tree.query(shapely.box(*bounds), predicate='intersects')]
+        if len(hits) == 0:
+            continue
+        drawn = rasterize(((geometry, 1) for geometry in hits), out_shape=(TILE_SIZE, TILE_SIZE),
+                          transform=from_bounds(*bounds, TILE_SIZE, TILE_SIZE), fill=0,
+                          all_touched=True, dtype='uint8').astype(bool)
+        if not drawn.any():
+            continue
+        rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+        rgba[drawn] = color
+        imsave(_tile_path(tiles_dir, zoom, x, y), rgba, pil_kwargs=PNG_OPTIONS)
+        written.append((x, y))
+    return written
+
+
+def _chunks(items, count):
+    """Split a list into at most count contiguous chunks."""
+    size = max(1, math.ceil(len(items) / count))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _lonlat_bounds(bounds):
+    """Convert Web Mercator bounds to [[south, west], [north, east]] for folium."""
+    west, south, east, north = transform_bounds(WEB_MERCATOR, 'EPSG:4326', *bounds)
+    return [[south, west], [north, east]]
+
+
+class WebTileExporter:
+    """A class for exporting analysis layers as XYZ tile pyramids and tiled folium maps."""
+
+    def __init__(self, output_dir, max_workers=None):
+        """
+        Initialize the WebTileExporter.
+
+        Args:
+            output_dir (str): Directory for the tile pyramids (one subdirectory per layer)
+            max_workers (int, optional): Number of worker processes (None = one per core)
+        """
+        self.output_dir = output_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.logger = logging.getLogger(__name__)
+
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _tiles_dir(self, name):
+        """Directory of a layer's pyramid, with the zoom levels of earlier exports removed."""
+        tiles_dir = os.path.join(self.output_dir, name)
+        if os.path.isdir(tiles_dir):
+            # Only the {z} directories written here, so stale tiles cannot outlive a new export
+            for entry in os.listdir(tiles_dir):
+                if entry.isdigit() and os.path.isdir(os.path.join(tiles_dir, entry)):
+                    shutil.rmtree(os.path.join(tiles_dir, entry))
+        os.makedirs(tiles_dir, exist_ok=True)
+        return tiles_dir
+
+    def _save_layer(self, name, tiles_dir, bounds, min_zoom, max_zoom, counts):
+        """Write the metadata.json of a pyramid and return its layer record."""
+        for zoom in range(min_zoom, max_zoom + 1):
+            self.logger.info(f"{name}: wrote {counts[zoom]} tiles at zoom {zoom}")
+        layer = {'name': name, 'tiles_dir': tiles_dir, 'bounds': _lonlat_bounds(bounds),
+                 'min_zoom': min_zoom, 'max_zoom': max_zoom, 'tile_counts': counts}
+        with open(os.path.join(tiles_dir, 'metadata.json'), 'w') as f:
+            json.dump(layer, f, indent=2)
+        return layer
+
+    def _render_pyramid(self, name, bounds, min_zoom, max_zoom, submit):
+        """
+        Render a layer zoom by zoom, descending only into the children of tiles with data.
+
+        Args:
+            name (str): Layer name (subdirectory of the pyramid)
+            bounds (tuple): Web Mercator bounds of the layer
+            min_zoom (int): First zoom level
+            max_zoom (int): Last zoom level
+            submit (callable): submit(executor, zoom, tiles, tiles_dir) returning futures of written tiles
+
+        Returns:
+            dict: Layer record (name, tile directory, bounds, zoom range and tile counts)
+        """
+        tiles_dir = self._tiles_dir(name)
+        counts, written = {}, []
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            for zoom in range(min_zoom, max_zoom + 1):
+                candidates = tiles_for_bounds(bounds, zoom) if zoom == min_zoom else _children(written)
+                futures = submit(executor, zoom, candidates, tiles_dir)
+                written = [tile for future in futures for tile in future.result()]
+                counts[zoom] = len(written)
+        return self._save_layer(name, tiles_dir, bounds, min_zoom, max_zoom, counts)
+
+    def _render_raster_pyramid(self, raster_path, name, bounds, min_zoom, max_zoom, style):
+        """
+        Render a raster pyramid from its deepest zoom level up.
+
+        The pyramid is split at the first zoom level with enough tiles to keep every worker
+        busy. Workers render the subtrees below that level (see _render_raster_tiles) and
+        the levels above it are reduced here from the tiles the workers return.
+
+        Args:
+            raster_path (str): Source raster
+            name (str): Layer name (subdirectory of the pyramid)
+            bounds (tuple): Web Mercator bounds of the raster
+            min_zoom (int): First zoom level
+            max_zoom (int): Last zoom level
+            style (dict): cmap, vmin, vmax, resampling and zero_transparent
+
+        Returns:
+            dict: Layer record (name, tile directory, bounds, zoom range and tile counts)
+        """
+        tiles_dir = self._tiles_dir(name)
+        split_zoom = min_zoom
+        while split_zoom < max_zoom and len(tiles_for_bounds(bounds, split_zoom)) < self.max_workers * 4:
+            split_zoom += 1
+
+        counts = {zoom: 0 for zoom in range(min_zoom, max_zoom + 1)}
+        reduced = {}
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(_render_raster_tiles, raster_path, split_zoom, chunk, max_zoom, bounds,
+                                       tiles_dir, style)
+                       for chunk in _chunks(tiles_for_bounds(bounds, split_zoom), self.max_workers * 4)]
+            for future in futures:
+                written, chunk_reduced = future.result()
+                for zoom, tiles in written.items():
+                    counts[zoom] += len(tiles)
+                reduced.update((tile, data) for tile, data in chunk_reduced.items() if data is not None)
+
+        cmap = colormaps[style['cmap']]
+        norm = Normalize(style['vmin'], style['vmax'], clip=True)
+        for zoom in range(split_zoom - 1, min_zoom - 1, -1):
+            parents = {}
+            for (x, y), data in reduced.items():
+                parents.setdefault((x // 2, y // 2), {})[(x % 2, y % 2)] = data
+            reduced = {}
+            for (x, y), children in parents.items():
+                data = _parent_tile(children)
+                rgba = _colorize(data, style, cmap, norm)
+                if rgba is not None:
+                    imsave(_tile_path(tiles_dir, zoom, x, y), rgba, pil_kwargs=PNG_OPTIONS)
+                    counts[zoom] += 1
+                reduced[(x, y)] = _reduce_tile(data, style['resampling'])
+        return self._save_layer(name, tiles_dir, bounds, min_zoom, max_zoom, counts)
+
+    def export_raster(self, raster_path, name, min_zoom=8, max_zoom=14, cmap='Reds', vmin=None, vmax=None,
+                      resampling='max', zero_transparent=True):
+        """
+        Export a single-band raster as a colorized tile pyramid.
+
+        Only the tiles of max_zoom are warped from the raster; each coarser tile is reduced
+        from the four tiles below it with the same resampling, so the raster is read once
+        instead of once per zoom level, and a coarse tile is empty only if all of its
+        descendants are. With 'max' the deepest tiles are warped from full resolution,
+        since decimated overviews (nearest for masks) can drop isolated pixels.
+
+        Args:
+            raster_path (str): Path to the raster (e.g. deforestation mask, hotspots, carbon stocks)
+            name (str): Layer name
+            min_zoom (int): First zoom level
+            max_zoom (int): Last zoom level
+            cmap (str): Matplotlib colormap
+            vmin (float, optional): Value mapped to the bottom of the colormap (defaults to 0)
+            vmax (float, optional): Value mapped to the top of the colormap (defaults to 1)
+            resampling (str): Resampling when warping and building coarser tiles ('max' keeps
+                sparse masks visible, 'average' suits continuous layers)
+            zero_transparent (bool): Draw zero pixels transparent (binary masks)
+
+        Returns:
+            dict: Layer record for create_map
+        """
+        try:
+            if not os.path.exists(raster_path):
+                raise FileNotFoundError(f"File not found: {raster_path}")
+            with rasterio.open(raster_path) as src:
+                bounds = transform_bounds(src.crs, WEB_MERCATOR, *src.bounds)
+            style = {'cmap': cmap, 'vmin': 0 if vmin is None else vmin, 'vmax': 1 if vmax is None else vmax,
+                     'resampling': resampling, 'zero_transparent': zero_transparent}
+
+            layer = self._render_raster_pyramid(raster_path, name, bounds, min_zoom, max_zoom, style)
+            self.logger.info(f"Raster tiles for {name} exported to {layer['tiles_dir']}")
+            return layer
+        except Exception as e:
+            self.logger.error(f"Error exporting raster tiles: {str(e)}")
+            raise
+
+    def export_vector(self, data, name, min_zoom=8, max_zoom=14, color='#d62728'):
+        """
+        Export a vector layer (roads, impact zones) as a tile pyramid.
+
+        Geometries are simplified to half a pixel at each zoom level before rasterizing,
+        so coarse zoom levels draw only a few vertices per feature.
+
+        Args:
+            data (geopandas.GeoDataFrame): Features to draw
+            name (str): Layer name
+            min_zoom (int): First zoom level
+            max_zoom (int): Last zoom level
+            color (str): Matplotlib color of the features
+
+        Returns:
+            dict: Layer record for create_map
+        """
+        try:
+            geometries = data.to_crs(WEB_MERCATOR).geometry.values
+            geometries = np.asarray(geometries[~(geometries.isna() | geometries.is_empty)])
+            if len(geometries) == 0:
+                raise ValueError(f"Layer {name} has no geometries")
+            bounds = tuple(shapely.total_bounds(geometries))
+            rgba = tuple(int(round(channel * 255)) for channel in to_rgba(color))
+
+            def submit(executor, zoom, tiles, tiles_dir):
+                simplified = shapely.simplify(geometries, tile_resolution(zoom) / 2)
+                simplified = simplified[~shapely.is_empty(simplified)]
+                tree = shapely.STRtree(simplified)
+                futures = []
+                for chunk in _chunks(tiles, self.max_workers * 4):
+                    corners = np.array([tile_bounds(zoom, x, y) for x, y in chunk])
+                    extent = shapely.box(corners[:, 0].min(), corners[:, 1].min(),
+                                         corners[:, 2].max(), corners[:, 3].max())
+                    hits = simplified[tree.query(extent, predicate='intersects')]
+                    if len(hits):
+                        futures.append(executor.submit(_render_vector_tiles, hits, zoom, chunk, tiles_dir, rgba))
+                return futures
+
+            layer = self._render_pyramid(name, bounds, min_zoom, max_zoom, submit)
+            self.logger.info(f"Vector tiles for {name} exported to {layer['tiles_dir']}")
+            return layer
+        except Exception as e:
+            self.logger.error(f"Error exporting vector tiles: {str(e)}")
+            raise
+
+    def create_map(self, layers, output_path, basemap='OpenStreetMap', opacity=0.8):
+        """
+        Create a folium map referencing exported tile pyramids.
+
+        Tile URLs are relative to the HTML file, so the map and tile directories can be
+        moved or served together.
+
+        Args:
+            layers (list): Layer records returned by export_raster / export_vector
+            output_path (str): Path of the HTML map
+            basemap (str): folium basemap tiles
+            opacity (float): Opacity of the overlay layers
+
+        Returns:
+            folium.Map: The saved map
+        """
+        try:
+            import folium
+            web_map = folium.Map(tiles=basemap)
+            for layer in layers:
+                url = os.path.relpath(layer['tiles_dir'], os.path.dirname(os.path.abspath(output_path)))
+                folium.TileLayer(
+                    tiles=url.replace(os.sep, '/') + '/{z}/{x}/{y}.png',
+                    attr='Wildlands League', name=layer['name'], overlay=True, control=True,
+                    opacity=opacity, min_zoom=0, max_native_zoom=layer['max_zoom'], max_zoom=20
+                ).add_to(web_map)
+            folium.LayerControl().add_to(web_map)
+
+            south = min(layer['bounds'][0][0] for layer in layers)
+            west = min(layer['bounds'][0][1] for layer in layers)
+            north = max(layer['bounds'][1][0] for layer in layers)
+            east = max(layer['bounds'][1][1] for layer in layers)
+            web_map.fit_bounds([[south, west], [north, east]])
+            web_map.save(output_path)
+            self.logger.info(f"Tiled map saved to {output_path}")
+            return web_map
+        except Exception as e:
+            self.logger.error(f"Error creating tiled map: {str(e)}")
+            raise
@@ -0,0 +1,620 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+--------------
+Times the hot paths of the analyzer classes on deterministic synthetic inputs,
+so performance can be measured without park data. Hansen-like lossyear and
+treecover2000 rasters, forest masks and GLAD forest type rasters are generated
+block by block from a fixed seed, together with a random road network. Each
+benchmark case runs in a fresh process, which records its wall and CPU time and
+peak resident memory. Every run is appended to a JSON history and compared with
+the previous run of the same size, so regressions and speedups are visible
+across releases.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import socket
+import platform
+import resource
+import argparse
+import logging
+import subprocess
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Analyzer implementations live in the analysis and infrastructure script folders
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, 'analysis'))
+sys.path.append(os.path.join(SCRIPT_DIR, 'infrastructure'))
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Raster width/height in pixels and number of road segments of the preset sizes
+SIZES = {
+    'small': (1024, 1000),
+    'medium': (10240, 10000),
+    'large': (40960, 100000)
+}
+
+# Synthetic grid: 30 m pixels in UTM zone 17N (Algonquin Park)
+SYNTHETIC_CRS = 'EPSG:32617'
+SYNTHETIC_ORIGIN = (650000.0, 5150000.0)
+PIXEL_SIZE = 30.0
+BLOCK_SIZE = 512
+# Edge length in pixels of the patches (stands, disturbances) of the synthetic rasters
+PATCH_SIZE = 16
+
+# Synthetic rasters: name to (dtype, overview resampling)
+SYNTHETIC_RASTERS = {
+    'treecover2000': ('uint8', 'average'),
+    'lossyear': ('uint8', 'nearest'),
+    'forest_2000': ('uint8', 'nearest'),
+    'forest_2023': ('uint8', 'nearest'),
+    'deforestation': ('uint8', 'nearest'),
+    'glad_forest_type': ('uint8', 'nearest')
+}
+
+# Carbon density per GLAD forest type (tC/ha)
+CARBON_DENSITIES = {1: 120.0, 2: 15.0, 3: 40.0, 4: 80.0}
+# Road buffer distances (m) of the buffer_sweep and buffer_loop cases
+SWEEP_DISTANCES = list(range(50, 550, 50))
+
+DEFAULT_OUTPUT_DIR = os.path.join('results', 'benchmarks')
+HISTORY_FILENAME = 'benchmark_history.json'
+
+logger = logging.getLogger(__name__)
+
+
+# Synthetic inputs
+
+def _synthetic_block(rng, rows, cols):
+    """
+    Generate all synthetic layers for one block.
+
+    Stands, disturbances and loss years are drawn per patch of PATCH_SIZE pixels so the
+    rasters have realistic spatial structure (and compress like real data).
+    """
+    patch_rows, patch_cols = math.ceil(rows / PATCH_SIZE), math.ceil(cols / PATCH_SIZE)
+
+    def patches(values):
+        return np.repeat(np.repeat(values, PATCH_SIZE, axis=0), PATCH_SIZE, axis=1)[:rows, :cols]
+
+    treecover = patches(rng.normal(70, 25, (patch_rows, patch_cols))) + rng.normal(0, 8, (rows, cols))
+    treecover = np.clip(treecover, 0, 100).astype(np.uint8)
+    forest_2000 = treecover >= 25
+
+    disturbed = patches(rng.random((patch_rows, patch_cols)) < 0.15) & (rng.random((rows, cols)) < 0.5)
+    loss_years = patches(rng.integers(1, 24, (patch_rows, patch_cols), dtype=np.uint8))
+    lossyear = np.where(forest_2000 & disturbed, loss_years, 0).astype(np.uint8)
+    forest_2023 = forest_2000 & (lossyear == 0)
+
+    glad = np.where(forest_2000, np.where(lossyear > 0, 2, 1), 0).astype(np.uint8)
+    glad[~forest_2000 & patches(rng.random((patch_rows, patch_cols)) < 0.1)] = 3
+    glad[forest_2023 & patches(rng.random((patch_rows, patch_cols)) < 0.05)] = 4
+
+    return {
+        'treecover2000': treecover,
+        'lossyear': lossyear,
+        'forest_2000': forest_2000,
+        'forest_2023': forest_2023,
+        'deforestation': forest_2000 & ~forest_2023,
+        'glad_forest_type': glad
+    }
+
+
+def synthetic_meta(size):
+    """Raster metadata of the synthetic grid."""
+    from rasterio.transform import from_origin
+    return {'driver': 'GTiff', 'dtype': 'uint8', 'count': 1, 'width': size, 'height': size,
+            'crs': SYNTHETIC_CRS, 'transform': from_origin(*SYNTHETIC_ORIGIN, PIXEL_SIZE, PIXEL_SIZE),
+            'nodata': None}
+
+
+def generate_rasters(data_dir, size, seed=0):
+    """
+    Generate the synthetic rasters block by block (memory bounded by the block size).
+
+    Each block is drawn from its own generator seeded with (seed, row, col), so the
+    rasters are identical across runs and machines.
+
+    Args:
+        data_dir (str): Directory for the rasters
+        size (int): Raster width and height in pixels
+        seed (int): Random seed
+
+    Returns:
+        dict: Layer name to raster path
+    """
+    from contextlib import ExitStack
+    from rasterio.windows import Window
+    from raster_io import RasterWriter
+
+    paths = {name: os.path.join(data_dir, f"{name}.tif") for name in SYNTHETIC_RASTERS}
+    if all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    os.makedirs(data_dir, exist_ok=True)
+    meta = synthetic_meta(size)
+    with ExitStack() as stack:
+        writers = {name: stack.enter_context(RasterWriter(paths[name], meta, dtype=dtype, resampling=resampling))
+                   for name, (dtype, resampling) in SYNTHETIC_RASTERS.items()}
+        for row_off in range(0, size, BLOCK_SIZE):
+            for col_off in range(0, size, BLOCK_SIZE):
+                window = Window(col_off, row_off, min(BLOCK_SIZE, size - col_off), min(BLOCK_SIZE, size - row_off))
+                rng = np.random.default_rng([seed, row_off, col_off])
+                block = _synthetic_block(rng, int(window.height), int(window.width))
+                for name, writer in writers.items():
+                    writer.write(block[name], window=window)
+    logger.info(f"Generated {size} x {size} synthetic rasters in {data_dir}")
+    return paths
+
+
+def generate_roads(data_dir, size, segments, seed=0):
+    """
+    Generate a random road network of short polylines across the synthetic grid.
+
+    Args:
+        data_dir (str): Directory for the road layer
+        size (int): Raster width and height in pixels
+        segments (int): Number of road segments
+        seed (int): Random seed
+
+    Returns:
+        str: Path of the road layer (GeoParquet when pyarrow is installed, else GeoPackage)
+    """
+    import geopandas as gpd
+    import shapely
+    from vector_io import pq, write_vector
+
+    path = os.path.join(data_dir, f"roads_{segments}.{'parquet' if pq is not None else 'gpkg'}")
+    if os.path.exists(path):
+        return path
+
+    rng = np.random.default_rng([seed, segments])
+    vertices = 4
+    extent = size * PIXEL_SIZE
+    start = rng.random((segments, 1, 2)) * extent + [SYNTHETIC_ORIGIN[0], SYNTHETIC_ORIGIN[1] - extent]
+    # Random walk of 50-500 m steps with a slowly turning heading
+    heading = rng.uniform(0, 2 * np.pi, (segments, 1)) + np.cumsum(rng.normal(0, 0.3, (segments, vertices - 1)),
+                                                                 axis=1)
+    steps = rng.uniform(50, 500, (segments, vertices - 1))[..., None] * np.stack([np.cos(heading),
+                                                                                 np.sin(heading)], axis=-1)
+    coordinates = np.concatenate([start, start + np.cumsum(steps, axis=1)], axis=1)
+    roads = gpd.GeoDataFrame({'road_class': rng.integers(1, 5, segments)},
+                             geometry=shapely.linestrings(coordinates), crs=SYNTHETIC_CRS)
+    os.makedirs(data_dir, exist_ok=True)
+    write_vector(roads, path)
+    return path
+
+
+def generate_stands(data_dir, size, stands, seed=0):
+    """
+    Generate forest stands as Voronoi cells across the synthetic grid, shrunk 20 m to
+    leave gaps between neighbouring stands.
+
+    Args:
+        data_dir (str): Directory for the stand layer
+        size (int): Raster width and height in pixels
+        stands (int): Number of stands
+        seed (int): Random seed
+
+    Returns:
+        str: Path of the stand layer (GeoParquet when pyarrow is installed, else GeoPackage)
+    """
+    import geopandas as gpd
+    import shapely
+    from vector_io import pq, write_vector
+
+    path = os.path.join(data_dir, f"stands_{stands}.{'parquet' if pq is not None else 'gpkg'}")
+    if os.path.exists(path):
+        return path
+
+    rng = np.random.default_rng([seed, stands, 1])
+    extent = size * PIXEL_SIZE
+    grid = shapely.box(SYNTHETIC_ORIGIN[0], SYNTHETIC_ORIGIN[1] - extent,
+                       SYNTHETIC_ORIGIN[0] + extent, SYNTHETIC_ORIGIN[1])
+    seeds = shapely.multipoints(rng.random((stands, 2)) * extent
+                                + [SYNTHETIC_ORIGIN[0], SYNTHETIC_ORIGIN[1] - extent])
+    cells = shapely.intersection(shapely.get_parts(shapely.voronoi_polygons(seeds, extend_to=grid)), grid)
+    cells = shapely.buffer(cells, -20)
+    forest = gpd.GeoDataFrame({'stand': np.arange(len(cells))}, geometry=cells, crs=SYNTHETIC_CRS)
+    forest = forest[~forest.geometry.is_empty].reset_index(drop=True)
+    os.makedirs(data_dir, exist_ok=True)
+    write_vector(forest, path)
+    return path
+
+
+# Benchmark cases. Each runs in a fresh process: it prepares its inputs (untimed)
+# and returns the call to time with the number of items (pixels or features) it processes.
+
+def case_load(inputs, work_dir, workers):
+    """Read a forest cover raster into memory."""
+    from deforestation_analysis import DeforestationAnalyzer
+    analyzer = DeforestationAnalyzer(inputs['data_dir'], work_dir)
+    return lambda: analyzer.load_forest_cover_timeseries({2000: inputs['forest_2000']}), inputs['pixels']
+
+
+def case_rate(inputs, work_dir, workers):
+    """Windowed deforestation rate and map between two forest masks."""
+    from deforestation_analysis import DeforestationAnalyzer
+    analyzer = DeforestationAnalyzer(inputs['data_dir'], work_dir)
+    output = os.path.join(work_dir, 'deforestation.tif')
+    return lambda: analyzer.calculate_deforestation_rate_windowed(
+        inputs['forest_2000'], inputs['forest_2023'], 23, output_filename=output), inputs['pixels']
+
+
+def case_annual_loss(inputs, work_dir, workers):
+    """Annual loss areas from a lossyear raster."""
+    from deforestation_analysis import DeforestationAnalyzer
+    analyzer = DeforestationAnalyzer(inputs['data_dir'], work_dir)
+    return lambda: analyzer.calculate_annual_loss(inputs['lossyear']), inputs['pixels']
+
+
+def case_baseline(inputs, work_dir, workers):
+    """Fused baseline statistics over the Hansen and GLAD layers."""
+    from baseline_assessment import BaselineAssessment
+    assessment = BaselineAssessment(inputs['data_dir'], work_dir)
+    layers = {name: inputs[name] for name in ('treecover2000', 'lossyear', 'glad_forest_type')}
+    return lambda: assessment.compute_statistics(layers), inputs['pixels']
+
+
+def case_agreement(inputs, work_dir, workers):
+    """Hansen forest x loss year x GLAD forest type cross-tabulation with disagreement rasters."""
+    from forest_agreement import ForestAgreement
+    agreement = ForestAgreement(inputs['data_dir'], work_dir)
+    layers = {name: inputs[name] for name in ('treecover2000', 'lossyear', 'glad_forest_type')}
+    return lambda: agreement.compute_crosstab(layers, disagreement_prefix='disagreement'), inputs['pixels']
+
+
+def case_hotspots(inputs, work_dir, workers):
+    """Tiled hotspot detection on a deforestation map."""
+    from deforestation_analysis import DeforestationAnalyzer
+    analyzer = DeforestationAnalyzer(inputs['data_dir'], work_dir)
+    output = os.path.join(work_dir, 'hotspots.tif')
+    return lambda: analyzer.identify_hotspots_tiled(inputs['deforestation'], output,
+                                                    max_workers=workers), inputs['pixels']
+
+
+def case_carbon_stocks(inputs, work_dir, workers):
+    """Carbon stock raster from GLAD forest types through a density lookup table."""
+    from carbon_mapping import CarbonMapper
+    mapper = CarbonMapper(inputs['data_dir'], work_dir)
+    output = os.path.join(work_dir, 'carbon.tif')
+    return lambda: mapper.calculate_carbon_stocks_lut(inputs['glad_forest_type'], CARBON_DENSITIES,
+                                                      output), inputs['pixels']
+
+
+def case_carbon_stats(inputs, work_dir, workers):
+    """Streamed carbon distribution statistics with percentiles."""
+    from carbon_mapping import CarbonMapper
+    mapper = CarbonMapper(inputs['data_dir'], work_dir)
+    carbon_map = os.path.join(work_dir, 'carbon_input.tif')
+    if not os.path.exists(carbon_map):
+        mapper.calculate_carbon_stocks_lut(inputs['glad_forest_type'], CARBON_DENSITIES, carbon_map)
+    return lambda: mapper.analyze_carbon_raster(carbon_map, percentiles=(5, 50, 95),
+                                                max_workers=workers), inputs['pixels']
+
+
+def case_buffer(inputs, work_dir, workers):
+    """Vector impact zones around the road network."""
+    from infrastructure_analysis import InfrastructureAnalyzer
+    analyzer = InfrastructureAnalyzer(inputs['data_dir'], work_dir)
+    roads = analyzer.load_infrastructure_data(inputs['roads'])
+    return lambda: analyzer.calculate_impact_zones(roads, 100), inputs['segments']
+
+
+def case_distance(inputs, work_dir, workers):
+    """Raster distance to roads on the forest grid."""
+    from infrastructure_analysis import InfrastructureAnalyzer
+    analyzer = InfrastructureAnalyzer(inputs['data_dir'], work_dir)
+    roads = analyzer.load_infrastructure_data(inputs['roads'])
+    output = os.path.join(work_dir, 'road_distance.tif')
+    return lambda: analyzer.calculate_distance_surface(roads, inputs['forest_2000'], output, 1000), inputs['pixels']
+
+
+def case_fragmentation(inputs, work_dir, workers):
+    """Tiled connected-component fragmentation of the forest mask outside road impact zones."""
+    from infrastructure_analysis import InfrastructureAnalyzer
+    analyzer = InfrastructureAnalyzer(inputs['data_dir'], work_dir)
+    distance = os.path.join(work_dir, 'road_distance_input.tif')
+    if not os.path.exists(distance):
+        analyzer.calculate_distance_surface(analyzer.load_infrastructure_data(inputs['roads']),
+                                            inputs['forest_2000'], distance, 1000)
+    return lambda: analyzer.analyze_raster_fragmentation(inputs['forest_2000'], distance, 100), inputs['pixels']
+
+
+def case_buffer_sweep(inputs, work_dir, workers):
+    """Vector forest fragmentation at ten road buffer distances in one incremental sweep."""
+    from infrastructure_analysis import InfrastructureAnalyzer
+    from vector_io import read_vector
+    analyzer = InfrastructureAnalyzer(inputs['data_dir'], work_dir)
+    roads = analyzer.load_infrastructure_data(inputs['roads'])
+    stands = read_vector(inputs['stands'])
+    return lambda: analyzer.sweep_buffer_distances(roads, stands, SWEEP_DISTANCES), len(stands)
+
+
+def case_buffer_loop(inputs, work_dir, workers):
+    """Vector forest fragmentation at the buffer_sweep distances, one overlay per distance."""
+    from infrastructure_analysis import InfrastructureAnalyzer
+    from vector_io import read_vector
+    analyzer = InfrastructureAnalyzer(inputs['data_dir'], work_dir)
+    roads = analyzer.load_infrastructure_data(inputs['roads'])
+    stands = read_vector(inputs['stands'])
+    return lambda: [analyzer.analyze_forest_fragmentation(stands, analyzer.calculate_impact_zones(roads, distance))
+                    for distance in SWEEP_DISTANCES], len(stands)
+
+
+def case_batch(inputs, work_dir, workers):
+    """Deforestation, carbon and road statistics for a grid of overlapping AOIs read once."""
+    import geopandas as gpd
+    import shapely
+    from batch_analysis import BatchAnalyzer
+    from vector_io import read_vector
+    analyzer = BatchAnalyzer(inputs['data_dir'], work_dir)
+    extent = int(inputs['pixels'] ** 0.5) * PIXEL_SIZE
+    # 5 x 5 discs of 0.3 extent diameter, so neighbouring AOIs share windows
+    centres = (np.arange(5) + 0.5) * extent / 5
+    discs = [shapely.Point(SYNTHETIC_ORIGIN[0] + x, SYNTHETIC_ORIGIN[1] - y).buffer(0.15 * extent)
+             for y in centres for x in centres]
+    aois = gpd.GeoDataFrame({'aoi': [f"aoi_{index}" for index in range(len(discs))]}, geometry=discs,
+                            crs=SYNTHETIC_CRS)
+    roads = read_vector(inputs['roads'])
+    granules = [{'treecover2000': inputs['treecover2000'], 'lossyear': inputs['lossyear'],
+                 'forest_classes': inputs['glad_forest_type']}]
+    return lambda: analyzer.analyze(aois, granules, roads=roads, class_densities=CARBON_DENSITIES,
+                                    max_workers=workers), inputs['pixels']
+
+
+def case_plot_hotspots(inputs, work_dir, workers):
+    """Hotspot map plotted from a max-decimated read of the hotspot raster."""
+    from deforestation_analysis import DeforestationAnalyzer
+    analyzer = DeforestationAnalyzer(inputs['data_dir'], work_dir)
+    output = os.path.join(work_dir, 'hotspots.png')
+    return lambda: analyzer.plot_hotspots(inputs['deforestation'], output), inputs['pixels']
+
+
+def case_report_figures(inputs, work_dir, workers):
+    """Standard report figures rendered as a batch."""
+    from deforestation_analysis import DeforestationAnalyzer
+    from baseline_assessment import BaselineAssessment
+    from visualization_analysis import ForestVisualization, report_figure_specs
+    annual_loss = DeforestationAnalyzer(inputs['data_dir'], work_dir).calculate_annual_loss(inputs['lossyear'])
+    assessment = BaselineAssessment(inputs['data_dir'], work_dir)
+    tables = assessment.build_tables(assessment.compute_statistics(
+        {name: inputs[name] for name in ('treecover2000', 'lossyear', 'glad_forest_type')}))
+    glad_stats = tables['GLAD_Forest_Type_Statistics']
+    initial_forest = float(glad_stats['area_ha'].sum())
+    visualizer = ForestVisualization(inputs['data_dir'], os.path.join(work_dir, 'figures'))
+    specs = report_figure_specs(annual_loss, glad_stats, initial_forest)
+    return lambda: visualizer.render_figures(specs, max_workers=workers, force=True), len(specs)
+
+
+CASES = {
+    'load': case_load,
+    'rate': case_rate,
+    'annual_loss': case_annual_loss,
+    'baseline': case_baseline,
+    'agreement': case_agreement,
+    'hotspots': case_hotspots,
+    'carbon_stocks': case_carbon_stocks,
+    'carbon_stats': case_carbon_stats,
+    'buffer': case_buffer,
+    'distance': case_distance,
+    'fragmentation': case_fragmentation,
+    'buffer_sweep': case_buffer_sweep,
+    'buffer_loop': case_buffer_loop,
+    'batch': case_batch,
+    'plot_hotspots': case_plot_hotspots,
+    'report_figures': case_report_figures
+}
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size in MB (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_case(name, inputs, work_dir, workers, repeat):
+    """Prepare and time one case in the current (fresh) process."""
+    logging.getLogger().setLevel(logging.WARNING)
+    os.makedirs(work_dir, exist_ok=True)
+    call, items = CASES[name](inputs, work_dir, workers)
+    rss_before = _peak_rss_mb()
+
+    wall, cpu = [], []
+    for _ in range(repeat):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        call()
+        wall.append(time.perf_counter() - wall_start)
+        cpu.append(time.process_time() - cpu_start)
+
+    best = min(wall)
+    return {
+        'wall_s': best,
+        'wall_median_s': float(np.median(wall)),
+        'cpu_s': min(cpu),
+        'items': items,
+        'items_per_s': items / best if best > 0 else None,
+        'peak_rss_mb': _peak_rss_mb(),
+        'peak_rss_delta_mb': _peak_rss_mb() - rss_before,
+        'peak_rss_children_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    }
+
+
+def _git_revision():
+    """Short hash of the checked-out commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkSuite:
+    """Runs benchmark cases on synthetic inputs and keeps a history of results."""
+
+    def __init__(self, output_dir=DEFAULT_OUTPUT_DIR, size='small', pixels=None, segments=None, seed=0):
+        """
+        Initialize the suite.
+
+        Args:
+            output_dir (str): Directory for synthetic inputs, case outputs and the history
+            size (str): Preset size ('small', 'medium' or 'large')
+            pixels (int, optional): Raster width and height, overriding the preset
+            segments (int, optional): Number of road segments, overriding the preset
+            seed (int): Random seed of the synthetic inputs
+        """
+        preset_pixels, preset_segments = SIZES[size]
+        self.pixels = pixels or preset_pixels
+        self.segments = segments or preset_segments
+        self.seed = seed
+        self.output_dir = output_dir
+        self.data_dir = os.path.join(output_dir, 'data', f"{self.pixels}px_seed{seed}")
+        self.work_dir = os.path.join(output_dir, 'work')
+        self.history_path = os.path.join(output_dir, HISTORY_FILENAME)
+        self.logger = logging.getLogger(__name__)
+
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+
+    def prepare_inputs(self):
+        """
+        Generate (or reuse) the synthetic inputs.
+
+        Returns:
+            dict: Input paths plus data_dir, pixels and segments
+        """
+        inputs = generate_rasters(self.data_dir, self.pixels, self.seed)
+        inputs['roads'] = generate_roads(self.data_dir, self.pixels, self.segments, self.seed)
+        inputs['stands'] = generate_stands(self.data_dir, self.pixels, self.segments, self.seed)
+        inputs.update(data_dir=self.data_dir, pixels=self.pixels ** 2, segments=self.segments)
+        return inputs
+
+    def run(self, cases=None, repeat=1, workers=1):
+        """
+        Run benchmark cases, each in a fresh process, and append the results to the history.
+
+        Args:
+            cases (list, optional): Case names (default: all)
+            repeat (int): Timed repetitions per case (the best is reported)
+            workers (int): Worker processes for cases that support parallelism
+
+        Returns:
+            dict: Run record with per-case results and the speedup over the previous comparable run
+        """
+        cases = list(cases or CASES)
+        unknown = [name for name in cases if name not in CASES]
+        if unknown:
+            raise ValueError(f"Unknown benchmark cases: {', '.join(unknown)}")
+
+        inputs = self.prepare_inputs()
+        results = {}
+        context = multiprocessing.get_context('spawn')
+        for name in cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                try:
+                    results[name] = executor.submit(_run_case, name, inputs, os.path.join(self.work_dir, name),
+                                                    workers, repeat).result()
+                except Exception as e:
+                    self.logger.error(f"Benchmark {name} failed: {str(e)}")
+                    results[name] = {'error': str(e)}
+                    continue
+            self.logger.info(f"{name}: {results[name]['wall_s']:.3f} s, "
+                             f"peak RSS {results[name]['peak_rss_mb']:.0f} MB")
+
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'host': socket.gethostname(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'pixels': self.pixels,
+            'segments': self.segments,
+            'seed': self.seed,
+            'repeat': repeat,
+            'workers': workers,
+            'results': results
+        }
+        record['speedup'] = self.compare(record)
+        self.append_history(record)
+        return record
+
+    def load_history(self):
+        """Read the list of previous run records."""
+        if not os.path.exists(self.history_path):
+            return []
+        with open(self.history_path) as f:
+            return json.load(f)
+
+    def append_history(self, record):
+        """Append a run record to the history file (written atomically)."""
+        history = self.load_history()
+        history.append(record)
+        tmp_path = f"{self.history_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(history, f, indent=2)
+        os.replace(tmp_path, self.history_path)
+
+    def compare(self, record):
+        """
+        Compare a run with the last recorded run on the same inputs and settings.
+
+        Args:
+            record (dict): Run record (not yet in the history)
+
+        Returns:
+            dict: Case name to wall time ratio previous / current (> 1 is a speedup)
+        """
+        same = ('pixels', 'segments', 'seed', 'workers')
+        previous = [run for run in self.load_history() if all(run.get(key) == record[key] for key in same)]
+        if not previous:
+            return {}
+        baseline = previous[-1]['results']
+        return {name: baseline[name]['wall_s'] / result['wall_s']
+                for name, result in record['results'].items()
+                if 'wall_s' in result and 'wall_s' in baseline.get(name, {}) and result['wall_s'] > 0}
+
+
+def main(argv=None):
+    """
+    Main execution function.
+
+    Args:
+        argv (list, optional): Command-line arguments (defaults to sys.argv)
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the analyzers on synthetic inputs.")
+    parser.add_argument('cases', nargs='*', help=f"Cases to run (default: all): {', '.join(CASES)}")
+    parser.add_argument('--size', choices=sorted(SIZES), default='small', help="Preset input size")
+    parser.add_argument('--pixels', type=int, default=None, help="Raster width and height in pixels")
+    parser.add_argument('--segments', type=int, default=None, help="Number of road segments")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the synthetic inputs")
+    parser.add_argument('--repeat', type=int, default=1, help="Timed repetitions per case")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes for parallel cases")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help="Inputs, outputs and history")
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(args.output_dir, args.size, args.pixels, args.segments, args.seed)
+    record = suite.run(args.cases, repeat=args.repeat, workers=args.workers)
+    speedups = record['speedup']
+    print(f"{'case':<16}{'wall (s)':>10}{'cpu (s)':>10}{'items/s':>14}{'peak MB':>10}{'vs prev':>9}")
+    for name, result in record['results'].items():
+        if 'error' in result:
+            print(f"{name:<16}  failed: {result['error']}")
+            continue
+        ratio = f"{speedups[name]:.2f}x" if name in speedups else '-'
+        print(f"{name:<16}{result['wall_s']:>10.3f}{result['cpu_s']:>10.3f}{result['items_per_s'] or 0:>14.3g}"
+              f"{result['peak_rss_mb']:>10.0f}{ratio:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,19 +7,33 @@ and their impact on forest areas.
 """
 
 import os
+import sys
 import numpy as np
 import pandas as pd
 import geopandas as gpd
 import rasterio
-from rasterio.mask import mask
-from shapely.geometry import LineString, Point, Polygon
-from shapely.ops import unary_union
-import folium
+from rasterio.features import rasterize
+from rasterio.windows import Window
+from rasterio.windows import bounds as window_bounds
+from rasterio.windows import transform as window_transform
+import shapely
+from shapely.geometry import box
+from shapely.strtree import STRtree
 import logging
+from contextlib import nullcontext
+
+if __name__ == "__main__":
+    # Run as a script: the shared raster and vector helpers live alongside the analysis scripts
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+from raster_io import RasterWriter
+from pixel_area import PixelArea, metric_pixel_size
+from vector_io import read_vector, write_vector
+from profiling import get_profile, profile_methods
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+@profile_methods
 class InfrastructureAnalyzer:
     """A class for analyzing infrastructure impacts on forest ecosystems."""
     
@@ -38,18 +52,22 @@ class InfrastructureAnalyzer:
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
     
-    def load_infrastructure_data(self, infra_file_path):
+    def load_infrastructure_data(self, infra_file_path, aoi=None, columns=None, clip=False):
         """
-        Load infrastructure data from a shapefile or GeoJSON.
+        Load infrastructure data from a GeoParquet file, shapefile, GeoPackage or GeoJSON.
         
         Args:
             infra_file_path (str): Path to the infrastructure data file
+            aoi (optional): Area of interest (GeoDataFrame, geometry or bounds tuple);
+                only features intersecting its bounding box are read
+            columns (list, optional): Attribute columns to read
+            clip (bool): Clip the features to the AOI geometry
             
         Returns:
             geopandas.GeoDataFrame: Infrastructure data
         """
         try:
-            infra_data = gpd.read_file(infra_file_path)
+            infra_data = read_vector(infra_file_path, aoi=aoi, columns=columns, clip=clip)
             self.logger.info(f"Successfully loaded infrastructure data from {infra_file_path}")
             return infra_data
         except Exception as e:
@@ -76,27 +94,208 @@ class InfrastructureAnalyzer:
             self.logger.error(f"Error calculating impact zones: {str(e)}")
             raise
     
-    def analyze_forest_fragmentation(self, forest_data, impact_zones):
+    def calculate_distance_surface(self, infra_data, reference_raster_path, output_path, max_distance,
+                                   tile_size=1024):
+        """
+        Calculate the distance to the nearest infrastructure feature on a raster grid.
+        
+        Features are burned onto the grid of the reference raster (e.g. the Hansen or GLAD
+        forest raster) and a Euclidean distance transform is run tile by tile. Each tile is
+        read with a halo of max_distance, so every distance up to max_distance is exact;
+        pixels farther away are set to infinity. Distances are measured between pixel
+        centres, so zones derived from them follow the pixel grid rather than the exact
+        polygon buffer outline.
+        
+        Distances are in meters on any grid: on geographic grids (the native EPSG:4326
+        Hansen/GLAD rasters) the pixel height and width in meters are evaluated at the
+        centre latitude of each tile, and the halo is sized for the narrowest pixels.
+        
+        Args:
+            infra_data (geopandas.GeoDataFrame): Infrastructure data
+            reference_raster_path (str): Raster defining the target grid
+            output_path (str): Path to save the float32 distance raster (m)
+            max_distance (float): Largest buffer distance of interest in meters
+            tile_size (int): Tile edge length in pixels, excluding the halo
+            
+        Returns:
+            str: Path of the saved distance raster
+        """
+        try:
+            from scipy.ndimage import distance_transform_edt
+            with rasterio.open(reference_raster_path) as src:
+                meta = src.meta.copy()
+            if infra_data.crs is not None and meta['crs'] is not None and infra_data.crs != meta['crs']:
+                infra_data = infra_data.to_crs(meta['crs'])
+            
+            transform = meta['transform']
+            height, width = meta['height'], meta['width']
+            # Pixels are narrowest at the row farthest from the equator
+            edge_sizes = [metric_pixel_size(transform, meta['crs'], row) for row in (0, height - 1)]
+            halo_rows = int(np.ceil(max_distance / min(size[0] for size in edge_sizes))) + 1
+            halo_cols = int(np.ceil(max_distance / min(size[1] for size in edge_sizes))) + 1
+            geometries = infra_data.geometry.values
+            tree = STRtree(geometries)
+            
+            meta.update(dtype='float32', nodata=None, count=1)
+            with RasterWriter(output_path, meta, resampling='average') as writer:
+                for row_off in range(0, height, tile_size):
+                    for col_off in range(0, width, tile_size):
+                        window = Window(col_off, row_off, min(tile_size, width - col_off),
+                                        min(tile_size, height - row_off))
+                        halo_window = Window(col_off - halo_cols, row_off - halo_rows,
+                                             window.width + 2 * halo_cols, window.height + 2 * halo_rows)
+                        distance = np.full((window.height, window.width), np.inf, dtype=np.float32)
+                        
+                        candidates = tree.query(box(*window_bounds(halo_window, transform)))
+                        if len(candidates):
+                            burned = rasterize(geometries[candidates],
+                                               out_shape=(halo_window.height, halo_window.width),
+                                               transform=window_transform(halo_window, transform),
+                                               fill=0, default_value=1, all_touched=True, dtype='uint8')
+                            if burned.any():
+                                pixel_size = metric_pixel_size(transform, meta['crs'],
+                                                               row_off + window.height / 2)
+                                halo_distance = distance_transform_edt(burned == 0, sampling=pixel_size)
+                                interior = halo_distance[halo_rows:halo_rows + window.height,
+                                                         halo_cols:halo_cols + window.width]
+                                interior[interior > max_distance] = np.inf
+                                distance = interior.astype(np.float32)
+                        writer.write(distance, window=window)
+            
+            self.logger.info(f"Distance surface saved to {output_path}")
+            return output_path
+        except Exception as e:
+            self.logger.error(f"Error calculating distance surface: {str(e)}")
+            raise
+    
+    def calculate_impact_rings(self, distance_raster_path, buffer_distances, output_path=None):
+        """
+        Derive impact zones for several buffer distances from one distance surface.
+        
+        Every buffer is a threshold on the distance raster, so all rings come out of a
+        single pass. Ring areas are true pixel areas (see PixelArea), so they are in
+        hectares on geographic grids as well. The optional ring raster stores 1 for pixels within the first
+        distance, 2 for the second ring and so on (0 beyond the last distance) and lines
+        up with the Hansen/GLAD rasters for direct joins.
+        
+        Args:
+            distance_raster_path (str): Distance raster from calculate_distance_surface
+            buffer_distances (list): Buffer distances in meters
+            output_path (str, optional): Path to save the ring raster
+            
+        Returns:
+            pandas.DataFrame: Ring and cumulative impact zone area (ha) per buffer distance
+        """
+        try:
+            buffer_distances = sorted(buffer_distances)
+            ring_area = np.zeros(len(buffer_distances) + 1, dtype=np.float64)
+            
+            with rasterio.open(distance_raster_path) as src:
+                pixel_area = PixelArea.from_dataset(src)
+                meta = src.meta.copy()
+                meta.update(dtype='uint8', nodata=0, count=1)
+                if output_path:
+                    writer_context = RasterWriter(output_path, meta, resampling='mode')
+                else:
+                    writer_context = nullcontext()
+                
+                with writer_context as writer:
+                    for _, window in src.block_windows(1):
+                        distance = src.read(1, window=window)
+                        # Ring i holds distances in (d[i-1], d[i]]; the last bin is outside every buffer
+                        rings = np.searchsorted(buffer_distances, distance, side='left')
+                        ring_area += np.bincount(rings.ravel(), weights=pixel_area.block(window).ravel(),
+                                                 minlength=len(buffer_distances) + 1) / 10000
+                        if writer is not None:
+                            labels = (rings + 1).astype(np.uint8)
+                            labels[rings == len(buffer_distances)] = 0
+                            writer.write(labels, window=window)
+            
+            ring_area = ring_area[:-1]
+            rings = pd.DataFrame({
+                'buffer_distance': buffer_distances,
+                'ring_area_ha': ring_area,
+                'impact_area_ha': np.cumsum(ring_area)
+            })
+            self.logger.info(f"Impact rings calculated for {len(buffer_distances)} buffer distances")
+            return rings
+        except Exception as e:
+            self.logger.error(f"Error calculating impact rings: {str(e)}")
+            raise
+    
+    def subtract_impact_zones(self, forest_data, impact_zones, dissolve_ratio=8):
+        """
+        Remove impact zones from forest polygons using a spatial index.
+        
+        An STRtree over the impact zones finds the candidate pairs, and each forest
+        polygon only has the buffers that intersect it subtracted. When each impact zone
+        would be unioned many times over (large forest polygons over a dense road
+        network), the impact zones are dissolved once instead and the dissolved mask,
+        clipped to each polygon's bounds, is subtracted. The result matches
+        gpd.overlay(forest_data, impact_zones, how='difference').
+        
+        Args:
+            forest_data (geopandas.GeoDataFrame): Forest cover data
+            impact_zones (geopandas.GeoDataFrame): Infrastructure impact zones
+            dissolve_ratio (float): Switch to the dissolved mask when the candidate pairs
+                exceed this multiple of the number of impact zones
+            
+        Returns:
+            geopandas.GeoDataFrame: Forest polygons outside the impact zones
+        """
+        forest_geoms = forest_data.geometry.values
+        impact_geoms = impact_zones.geometry.values
+        
+        tree = STRtree(impact_geoms)
+        forest_idx, impact_idx = tree.query(forest_geoms, predicate='intersects')
+        
+        remaining = np.array(forest_geoms, dtype=object)
+        if len(impact_idx) > dissolve_ratio * len(impact_geoms):
+            # Dissolving once is cheaper than a union per forest polygon
+            dissolved = shapely.union_all(impact_geoms)
+            for polygon in np.unique(forest_idx):
+                local_mask = shapely.clip_by_rect(dissolved, *shapely.bounds(remaining[polygon]))
+                remaining[polygon] = shapely.difference(remaining[polygon], local_mask)
+        elif len(impact_idx):
+            order = np.argsort(forest_idx, kind='stable')
+            forest_idx, impact_idx = forest_idx[order], impact_idx[order]
+            touched, starts = np.unique(forest_idx, return_index=True)
+            for polygon, group in zip(touched, np.split(impact_idx, starts[1:])):
+                remaining[polygon] = shapely.difference(remaining[polygon], shapely.union_all(impact_geoms[group]))
+        
+        fragmented_forest = forest_data.copy()
+        fragmented_forest['geometry'] = gpd.GeoSeries(remaining, index=forest_data.index, crs=forest_data.crs)
+        fragmented_forest = fragmented_forest[~fragmented_forest.geometry.is_empty]
+        return fragmented_forest.reset_index(drop=True)
+    
+    def analyze_forest_fragmentation(self, forest_data, impact_zones, method='indexed'):
         """
         Analyze forest fragmentation caused by infrastructure.
         
         Args:
             forest_data (geopandas.GeoDataFrame): Forest cover data
             impact_zones (geopandas.GeoDataFrame): Infrastructure impact zones
+            method (str): 'indexed' for the STRtree path (see subtract_impact_zones)
+                or 'overlay' for gpd.overlay
             
         Returns:
             dict: Fragmentation metrics
         """
         try:
             # Calculate intersection
-            fragmented_forest = gpd.overlay(forest_data, impact_zones, how='difference')
+            if method == 'overlay':
+                fragmented_forest = gpd.overlay(forest_data, impact_zones, how='difference')
+            elif method == 'indexed':
+                fragmented_forest = self.subtract_impact_zones(forest_data, impact_zones)
+            else:
+                raise ValueError(f"Unknown fragmentation method: {method}")
             
-            # Calculate metrics
+            # Calculate metrics; each part of a multipart remainder is a separate fragment
             metrics = {
                 'original_forest_area': forest_data.geometry.area.sum(),
                 'fragmented_forest_area': fragmented_forest.geometry.area.sum(),
                 'impact_zone_area': impact_zones.geometry.area.sum(),
-                'num_fragments': len(fragmented_forest)
+                'num_fragments': int(shapely.get_num_geometries(fragmented_forest.geometry.values).sum())
             }
             
             self.logger.info("Forest fragmentation analysis completed")
@@ -105,23 +304,156 @@ class InfrastructureAnalyzer:
             self.logger.error(f"Error analyzing forest fragmentation: {str(e)}")
             raise
     
-    def save_results(self, impact_zones, metrics, output_prefix):
+    def analyze_raster_fragmentation(self, forest_raster_path, distance_raster_path=None, buffer_distance=None,
+                                     min_area_ha=1.0, edge_depth=0.0, connectivity=8, tile_size=2048,
+                                     output_path=None):
+        """
+        Analyze forest fragmentation on the raster grid with connected-component labeling.
+        
+        The forest mask (pixels equal to 1) minus the impact zone (distance to infrastructure
+        within buffer_distance) is labeled tile by tile, and patches that touch across tile
+        borders are merged, so each patch is counted once however it is split.
+        
+        Areas, edge lengths and edge_depth are in meters; on geographic grids the pixel
+        size is evaluated at the centre latitude of the raster.
+        
+        Args:
+            forest_raster_path (str): Path to the binary forest raster
+            distance_raster_path (str, optional): Distance raster from calculate_distance_surface
+            buffer_distance (float, optional): Impact zone distance in meters
+            min_area_ha (float): Minimum patch area counted as a fragment (1 ha Canadian definition)
+            edge_depth (float): Edge depth in meters used for the core area
+            connectivity (int): 4 or 8 neighbour connectivity
+            tile_size (int): Tile edge length in pixels
+            output_path (str, optional): Path to save the forest mask with patches below
+                min_area_ha removed
+            
+        Returns:
+            dict: Fragment count, patch area distribution, largest patch, edge density and core area
+        """
+        try:
+            if (distance_raster_path is None) != (buffer_distance is None):
+                raise ValueError("distance_raster_path and buffer_distance must be given together")
+            
+            from fragmentation import PatchAnalysis
+            forest_src = rasterio.open(forest_raster_path)
+            distance_src = rasterio.open(distance_raster_path) if distance_raster_path else None
+            try:
+                if distance_src is not None and distance_src.shape != forest_src.shape:
+                    raise ValueError("Forest and distance raster dimensions do not match")
+                
+                def read_mask(window):
+                    mask = forest_src.read(1, window=window) == 1
+                    if distance_src is not None:
+                        mask &= ~(distance_src.read(1, window=window) <= buffer_distance)
+                    return mask
+                
+                pixel_size = metric_pixel_size(forest_src.transform, forest_src.crs, forest_src.height / 2)
+                analysis = PatchAnalysis(read_mask, forest_src.width, forest_src.height,
+                                         pixel_size, tile_size=tile_size,
+                                         connectivity=connectivity).run(edge_depth=edge_depth)
+                metrics = analysis.metrics(min_area_ha=min_area_ha)
+                if output_path:
+                    min_pixels = int(np.ceil(min_area_ha * 10000 / (pixel_size[0] * pixel_size[1])))
+                    analysis.write_min_area_mask(output_path, forest_src.meta, min_pixels)
+            finally:
+                forest_src.close()
+                if distance_src is not None:
+                    distance_src.close()
+            
+            self.logger.info("Raster forest fragmentation analysis completed")
+            return metrics
+        except Exception as e:
+            self.logger.error(f"Error analyzing raster forest fragmentation: {str(e)}")
+            raise
+    
+    def sweep_buffer_distances(self, infra_data, forest_data, buffer_distances):
+        """
+        Analyze forest fragmentation for a series of buffer distances in one sweep.
+        
+        An STRtree query at the largest distance finds the candidate infrastructure
+        features of every forest polygon once. The distances are then swept in
+        increasing order, and each step subtracts from what remains of a polygon only
+        the buffers of the features still within the distance of that remainder, so
+        polygons and features consumed by earlier steps drop out instead of being
+        re-overlaid from the original geometry.
+        
+        Args:
+            infra_data (geopandas.GeoDataFrame): Infrastructure data
+            forest_data (geopandas.GeoDataFrame): Forest cover data
+            buffer_distances (list): Buffer distances in meters
+            
+        Returns:
+            pandas.DataFrame: One row per buffer distance with the metrics of
+                analyze_forest_fragmentation for calculate_impact_zones at that distance
+        """
+        try:
+            buffer_distances = sorted(buffer_distances)
+            infra_geoms = np.array(infra_data.geometry.values, dtype=object)
+            remaining = np.array(forest_data.geometry.values, dtype=object)
+            original_forest_area = float(shapely.area(remaining).sum())
+            
+            tree = STRtree(infra_geoms)
+            forest_idx, infra_idx = tree.query(remaining, predicate='dwithin',
+                                               distance=buffer_distances[-1])
+            order = np.argsort(forest_idx, kind='stable')
+            forest_idx, infra_idx = forest_idx[order], infra_idx[order]
+            pair_distance = shapely.distance(remaining[forest_idx], infra_geoms[infra_idx])
+            
+            rows = []
+            for distance in buffer_distances:
+                # Same buffers as calculate_impact_zones (GeoSeries.buffer uses 16 segments)
+                zones = shapely.buffer(infra_geoms, distance, quad_segs=16)
+                
+                pairs = np.flatnonzero(pair_distance < distance)
+                pairs = pairs[~shapely.is_empty(remaining[forest_idx[pairs]])]
+                pairs = pairs[shapely.dwithin(remaining[forest_idx[pairs]],
+                                              infra_geoms[infra_idx[pairs]], distance)]
+                touched, starts = np.unique(forest_idx[pairs], return_index=True)
+                for polygon, group in zip(touched, np.split(infra_idx[pairs], starts[1:])):
+                    if len(group) == 1:
+                        mask = zones[group[0]]
+                    else:
+                        # Only the part of the buffers over the remainder needs unioning
+                        mask = shapely.union_all(shapely.clip_by_rect(zones[group],
+                                                                      *shapely.bounds(remaining[polygon])))
+                    remaining[polygon] = shapely.difference(remaining[polygon], mask)
+                
+                rows.append({
+                    'buffer_distance': distance,
+                    'original_forest_area': original_forest_area,
+                    'fragmented_forest_area': float(shapely.area(remaining).sum()),
+                    'impact_zone_area': float(shapely.area(zones).sum()),
+                    'num_fragments': int(shapely.get_num_geometries(
+                        remaining[~shapely.is_empty(remaining)]).sum())
+                })
+            
+            self.logger.info(f"Buffer sweep completed for {len(buffer_distances)} distances")
+            return pd.DataFrame(rows)
+        except Exception as e:
+            self.logger.error(f"Error sweeping buffer distances: {str(e)}")
+            raise
+    
+    def save_results(self, impact_zones, metrics, output_prefix, vector_format='gpkg'):
         """
-        Save analysis results to files.
+        Save analysis results to files, with the stage profile of the run
+        ({output_prefix}_profile.json and .csv) alongside.
         
         Args:
             impact_zones (geopandas.GeoDataFrame): Impact zones
             metrics (dict): Analysis metrics
             output_prefix (str): Prefix for output filenames
+            vector_format (str): 'gpkg' or 'parquet' (GeoParquet) for the impact zones
         """
         try:
             # Save impact zones to file
-            impact_zones_path = os.path.join(self.output_dir, f"{output_prefix}_impact_zones.gpkg")
-            impact_zones.to_file(impact_zones_path, driver="GPKG")
+            impact_zones_path = os.path.join(self.output_dir, f"{output_prefix}_impact_zones.{vector_format}")
+            write_vector(impact_zones, impact_zones_path)
             
             # Save metrics to CSV
             metrics_path = os.path.join(self.output_dir, f"{output_prefix}_metrics.csv")
             pd.DataFrame([metrics]).to_csv(metrics_path, index=False)
+            get_profile().save(os.path.join(self.output_dir, f"{output_prefix}_profile"))
             
             self.logger.info(f"Results saved to {self.output_dir}")
         except Exception as e:
@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""
+Analysis Pipeline
+----------------
+Runs the deforestation, carbon, zonal and visualization steps as one pipeline.
+Each stage declares the files it reads and writes; stages are ordered by those
+dependencies, independent branches run concurrently in a process pool, and a
+stage is skipped when the content hashes of its inputs, its parameters and its
+code are unchanged since the run that produced its outputs.
+"""
+
+import os
+import sys
+import ast
+import json
+import time
+import hashlib
+import inspect
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Stage implementations live in the analysis and infrastructure script folders
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, 'analysis'))
+sys.path.append(os.path.join(SCRIPT_DIR, 'infrastructure'))
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Name of the file recording the hashes of completed stages
+STATE_FILENAME = '.pipeline_state.json'
+# Prefix of the profile of the analyzer stages of the last run (.json and .csv)
+PROFILE_PREFIX = 'pipeline_profile'
+
+
+# Stage functions. They run in worker processes, so they are module-level and
+# import the analysis modules themselves.
+
+def run_loss(forest_start, forest_end, years_between, deforestation_map, loss_results, output_dir):
+    """Deforestation map and rate between two forest cover rasters."""
+    import pandas as pd
+    from deforestation_analysis import DeforestationAnalyzer
+    analyzer = DeforestationAnalyzer(os.path.dirname(forest_start), output_dir)
+    annual_rate, total_deforested = analyzer.calculate_deforestation_rate_windowed(
+        forest_start, forest_end, years_between, output_filename=deforestation_map
+    )
+    pd.DataFrame([{
+        "Annual Deforestation Rate (ha/yr)": annual_rate,
+        "Total Deforested Area (ha)": total_deforested
+    }]).to_csv(loss_results, index=False)
+
+
+def run_annual_loss(lossyear, annual_loss, output_dir, base_year=2000, num_years=23):
+    """Annual loss table from a Hansen lossyear raster."""
+    from deforestation_analysis import DeforestationAnalyzer
+    analyzer = DeforestationAnalyzer(os.path.dirname(lossyear), output_dir)
+    analyzer.save_annual_loss(analyzer.calculate_annual_loss(lossyear, base_year=base_year,
+                                                             num_years=num_years), annual_loss)
+
+
+def run_baseline(layers, aoi, statistics, output_dir, treecover_threshold=25, height_threshold=5,
+                 base_year=2000, num_years=23):
+    """Baseline statistics CSVs from the exported Hansen and GLAD rasters."""
+    from baseline_assessment import BaselineAssessment
+    from vector_io import read_vector
+    assessment = BaselineAssessment(os.path.dirname(next(iter(layers.values()))), output_dir)
+    tables = assessment.build_tables(assessment.compute_statistics(
+        layers, aoi=read_vector(aoi) if aoi else None,
+        treecover_threshold=treecover_threshold, height_threshold=height_threshold,
+        base_year=base_year, num_years=num_years
+    ))
+    if statistics is not None:
+        # Write only the declared tables; the annual loss CSV may belong to the annual_loss stage
+        declared = {os.path.basename(path) for path in statistics}
+        tables = {name: table for name, table in tables.items() if f"{name}.csv" in declared}
+    assessment.save_tables(tables)
+
+
+def run_hotspots(deforestation_map, hotspots, output_dir, threshold=0.1, sigma=2, tile_size=1024):
+    """Deforestation hotspot raster."""
+    from deforestation_analysis import DeforestationAnalyzer
+    analyzer = DeforestationAnalyzer(os.path.dirname(deforestation_map), output_dir)
+    analyzer.identify_hotspots_tiled(deforestation_map, hotspots, threshold=threshold, sigma=sigma,
+                                     tile_size=tile_size, max_workers=1)
+
+
+def run_carbon(forest_classes, carbon_map, carbon_summary, output_dir, class_densities, percentiles=()):
+    """Carbon stock raster and its distribution summary."""
+    import pandas as pd
+    from carbon_mapping import CarbonMapper
+    mapper = CarbonMapper(os.path.dirname(forest_classes), output_dir)
+    mapper.calculate_carbon_stocks_lut(forest_classes, {int(code): density for code, density
+                                                        in class_densities.items()}, carbon_map)
+    summary = mapper.analyze_carbon_raster(carbon_map, percentiles=percentiles)
+    pd.DataFrame([summary]).to_csv(carbon_summary, index=False)
+
+
+def run_zonal(zones, loss_by_zone, output_dir, deforestation_map=None, carbon_map=None,
+              carbon_by_zone=None, zone_field=None):
+    """Deforestation and carbon broken down by zone."""
+    from vector_io import read_vector
+    zone_data = read_vector(zones)
+    if deforestation_map:
+        from deforestation_analysis import DeforestationAnalyzer
+        analyzer = DeforestationAnalyzer(os.path.dirname(zones), output_dir)
+        analyzer.analyze_loss_by_zone(deforestation_map, zone_data, zone_field).to_csv(loss_by_zone, index=False)
+    if carbon_map:
+        from carbon_mapping import CarbonMapper
+        mapper = CarbonMapper(os.path.dirname(zones), output_dir)
+        mapper.analyze_carbon_by_zone(carbon_map, zone_data, zone_field).to_csv(carbon_by_zone, index=False)
+
+
+def run_plots(annual_loss, glad_statistics, plots, output_dir, initial_forest_ha=None,
+              title="Forest Cover Change"):
+    """Time series, distribution and forest type figures."""
+    import pandas as pd
+    from visualization_analysis import ForestVisualization
+    visualizer = ForestVisualization(os.path.dirname(annual_loss), output_dir)
+    annual_loss_df = pd.read_csv(annual_loss)
+    if initial_forest_ha is not None:
+        annual_loss_df['forest_cover'] = initial_forest_ha - annual_loss_df['area'].cumsum()
+        visualizer.plot_forest_change_timeseries(annual_loss_df[['year', 'forest_cover']], title=title)
+    visualizer.plot_statistical_distribution(pd.DataFrame({'Annual Forest Loss': annual_loss_df['area']}),
+                                             'Annual Forest Loss', 'annual_loss_distribution.png')
+    if glad_statistics:
+        glad_stats = pd.read_csv(glad_statistics)
+        forest_types = dict(zip(glad_stats['forest_type'], glad_stats['area_ha']))
+        visualizer.create_comparative_analysis(forest_types, forest_types, 'forest_type_distribution.png')
+
+
+def annual_loss_filename(base_year=2000, num_years=23):
+    """Name of the annual loss CSV, as in the Earth Engine exports (see BaselineAssessment.build_tables)."""
+    return f"Annual_Forest_Loss_{base_year + 1}_{base_year + num_years}.csv"
+
+
+def _module_path(module):
+    """Source file of an analysis or infrastructure module, or None for other modules."""
+    for folder in ('analysis', 'infrastructure'):
+        path = os.path.join(SCRIPT_DIR, folder, f"{module}.py")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _imported_modules(source):
+    """Analysis and infrastructure modules imported anywhere in Python source."""
+    modules = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.add(node.module.split('.')[0])
+    return {module for module in modules if _module_path(module)}
+
+
+def stage_modules(func, modules=()):
+    """
+    Analysis modules a stage function depends on.
+
+    Args:
+        func (callable): Stage function
+        modules (sequence): Additional modules to include
+
+    Returns:
+        list: Sorted names of the modules the function imports, directly or through
+            other analysis modules, and of the additional modules with their imports
+    """
+    found = set()
+    pending = _imported_modules(inspect.getsource(func)) | set(modules)
+    while pending:
+        module = pending.pop()
+        path = _module_path(module)
+        if path is None:
+            raise FileNotFoundError(f"Module not found: {module}")
+        found.add(module)
+        with open(path) as f:
+            pending |= _imported_modules(f.read()) - found
+    return sorted(found)
+
+
+def _run_stage(func, kwargs):
+    """Run a stage in a worker process and return its wall time and analyzer profile records."""
+    from profiling import get_profile
+    profile = get_profile()
+    profile.reset()
+    start = time.perf_counter()
+    func(**kwargs)
+    return time.perf_counter() - start, profile.records
+
+
+class Stage:
+    """A pipeline step with declared input files, output files and parameters."""
+
+    def __init__(self, name, func, inputs=None, outputs=None, params=None, modules=()):
+        """
+        Initialize a stage.
+
+        Args:
+            name (str): Unique stage name
+            func (callable): Module-level function called with inputs, outputs and params
+                as keyword arguments
+            inputs (dict, optional): Keyword to input path (or dict/list of paths)
+            outputs (dict, optional): Keyword to output path (or dict/list of paths)
+            params (dict, optional): JSON-serializable parameters
+            modules (sequence): Analysis modules the stage uses besides those its function
+                imports (see stage_modules); edits to their source invalidate the stage like
+                parameter changes do
+        """
+        self.name = name
+        self.func = func
+        self.inputs = inputs or {}
+        self.outputs = outputs or {}
+        self.params = params or {}
+        self.modules = tuple(modules)
+
+    @staticmethod
+    def _paths(files):
+        """Flatten a keyword-to-path mapping into a list of paths."""
+        paths = []
+        for value in files.values():
+            if isinstance(value, dict):
+                value = list(value.values())
+            paths.extend(value if isinstance(value, (list, tuple)) else [value])
+        return [path for path in paths if path]
+
+    @property
+    def input_paths(self):
+        """list: Paths of all input files."""
+        return self._paths(self.inputs)
+
+    @property
+    def output_paths(self):
+        """list: Paths of all output files."""
+        return self._paths(self.outputs)
+
+    @property
+    def kwargs(self):
+        """dict: Keyword arguments for the stage function."""
+        return {**self.inputs, **self.outputs, **self.params}
+
+
+class Pipeline:
+    """A dependency graph of stages with content-hashed incremental execution."""
+
+    def __init__(self, stages, state_dir):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages (list): Stage objects; dependencies follow from their input and output paths
+            state_dir (str): Directory for the state file recording completed stages
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        self.state_dir = state_dir
+        self.state_path = os.path.join(state_dir, STATE_FILENAME)
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(state_dir, exist_ok=True)
+
+        self.producers = {}
+        for stage in stages:
+            for path in stage.output_paths:
+                path = os.path.abspath(path)
+                if path in self.producers:
+                    raise ValueError(f"{path} is produced by both {self.producers[path]} and {stage.name}")
+                self.producers[path] = stage.name
+        self.dependencies = {
+            stage.name: {self.producers[os.path.abspath(path)] for path in stage.input_paths
+                         if os.path.abspath(path) in self.producers}
+            for stage in stages
+        }
+        self.order = self._toposort()
+        self.state = self._load_state()
+
+    def _toposort(self):
+        """Order the stages so that every stage follows its dependencies."""
+        order, visiting, visited = [], set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage {name}")
+            visiting.add(name)
+            for dependency in sorted(self.dependencies[name]):
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _load_state(self):
+        """Load the recorded stage and file hashes."""
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {'stages': {}, 'files': {}}
+
+    def _save_state(self):
+        """Write the state file atomically."""
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _save_profile(self, records):
+        """Write the analyzer stage records collected from the workers of a run."""
+        from profiling import RunProfile
+        profile = RunProfile()
+        profile.records = records
+        json_path, _ = profile.save(os.path.join(self.state_dir, PROFILE_PREFIX))
+        summary = profile.summary()
+        if len(summary):
+            slowest = summary.iloc[0]
+            self.logger.info(f"Profile saved to {json_path}; slowest stage {slowest['stage']} "
+                             f"({slowest['share']:.0%} of analyzer time)")
+
+    def file_digest(self, path):
+        """
+        Content hash of a file, recomputed only when its size or modification time changed.
+
+        Args:
+            path (str): File path
+
+        Returns:
+            str: SHA-1 hex digest of the file contents
+        """
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found: {path}")
+        stat = os.stat(path)
+        cached = self.state['files'].get(path)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha1']
+
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        self.state['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                     'sha1': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def stage_key(self, stage):
+        """
+        Hash of everything that determines a stage's outputs.
+
+        Args:
+            stage (Stage): Stage to hash
+
+        Returns:
+            str: SHA-1 hex digest of the stage code, parameters, output paths and input contents
+        """
+        identity = {
+            'function': f"{stage.func.__module__}.{stage.func.__qualname__}",
+            'code': hashlib.sha1(inspect.getsource(stage.func).encode()).hexdigest(),
+            'modules': {module: self.file_digest(_module_path(module))
+                        for module in stage_modules(stage.func, stage.modules)},
+            'params': stage.params,
+            'outputs': [os.path.abspath(path) for path in stage.output_paths],
+            'inputs': {os.path.abspath(path): self.file_digest(path) for path in stage.input_paths}
+        }
+        return hashlib.sha1(json.dumps(identity, sort_keys=True, default=str).encode()).hexdigest()
+
+    def is_up_to_date(self, stage, key):
+        """Check that the stage last ran with this key and its outputs are unchanged since."""
+        record = self.state['stages'].get(stage.name)
+        if record is None or record['key'] != key:
+            return False
+        for path in stage.output_paths:
+            if not os.path.exists(path) or self.file_digest(path) != record['outputs'].get(os.path.abspath(path)):
+                return False
+        return True
+
+    def _select(self, targets):
+        """Stages needed for the targets (all stages by default), including their upstream stages."""
+        if not targets:
+            return set(self.stages)
+        selected, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.dependencies[name])
+        return selected
+
+    def run(self, targets=None, force=(), max_workers=None, dry_run=False):
+        """
+        Run the stages that are out of date, concurrently where the graph allows.
+
+        Args:
+            targets (list, optional): Stages to bring up to date (with their upstream stages)
+            force (sequence): Stages to rerun even when up to date
+            max_workers (int, optional): Number of worker processes
+            dry_run (bool): Only report which stages would run
+
+        Returns:
+            dict: Stage name to 'skipped', 'ran', 'would run', 'failed' or 'blocked'
+        """
+        selected = self._select(targets)
+        status = {}
+        if dry_run:
+            for name in self.order:
+                if name not in selected:
+                    continue
+                stage = self.stages[name]
+                upstream_runs = any(status[dependency] == 'would run' for dependency in self.dependencies[name])
+                missing = any(not os.path.exists(path) for path in stage.input_paths)
+                if name in force or upstream_runs or missing or not self.is_up_to_date(stage, self.stage_key(stage)):
+                    status[name] = 'would run'
+                else:
+                    status[name] = 'skipped'
+            return status
+
+        running = {}
+        pending_keys = {}
+        profile_records = []
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                progressed = False
+                for name in self.order:
+                    if name not in selected or name in status or name in running.values():
+                        continue
+                    dependency_status = [status.get(dependency) for dependency in self.dependencies[name]]
+                    if any(state in ('failed', 'blocked') for state in dependency_status):
+                        status[name] = 'blocked'
+                        progressed = True
+                        continue
+                    if any(state is None for state in dependency_status):
+                        continue
+
+                    stage = self.stages[name]
+                    key = self.stage_key(stage)
+                    if name not in force and self.is_up_to_date(stage, key):
+                        status[name] = 'skipped'
+                        self.logger.info(f"Stage {name} is up to date")
+                    else:
+                        for path in stage.output_paths:
+                            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                        self.logger.info(f"Running stage {name}")
+                        running[executor.submit(_run_stage, stage.func, stage.kwargs)] = name
+                        # Invalidate the record until the stage has finished
+                        self.state['stages'][name] = {'key': None, 'outputs': {}}
+                        pending_keys[name] = key
+                    progressed = True
+
+                if not running:
+                    if progressed:
+                        continue
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        elapsed, records = future.result()
+                        profile_records.extend(dict(record, pipeline_stage=name) for record in records)
+                        missing = [path for path in stage.output_paths if not os.path.exists(path)]
+                        if missing:
+                            raise FileNotFoundError(f"Stage did not write {missing}")
+                        self.state['stages'][name] = {
+                            'key': pending_keys.pop(name),
+                            'outputs': {os.path.abspath(path): self.file_digest(path)
+                                        for path in stage.output_paths},
+                            'seconds': round(elapsed, 3)
+                        }
+                        status[name] = 'ran'
+                        self.logger.info(f"Stage {name} finished in {elapsed:.1f} s")
+                    except Exception as e:
+                        status[name] = 'failed'
+                        self.logger.error(f"Stage {name} failed: {str(e)}")
+                    self._save_state()
+
+        self._save_state()
+        if profile_records:
+            self._save_profile(profile_records)
+        failed = [name for name, state in status.items() if state == 'failed']
+        if failed:
+            raise RuntimeError(f"Pipeline stages failed: {', '.join(failed)}")
+        return status
+
+
+def build_stages(config):
+    """
+    Build the standard analysis stages from a configuration.
+
+    Args:
+        config (dict): Input paths and parameters. Recognized keys: output_dir, forest_start,
+            forest_end, years_between, lossyear, annual_loss (base_year, num_years),
+            baseline_layers, aoi, forest_classes, class_densities, zones, zone_field,
+            hotspots, baseline, carbon, plots. Stages whose inputs are not configured are
+            left out.
+
+    Returns:
+        list: Stage objects
+    """
+    output_dir = config.get('output_dir', 'results')
+    figure_dir = os.path.join(output_dir, 'visualizations')
+    out = lambda filename: os.path.join(output_dir, filename)
+    stages = []
+
+    deforestation_map = None
+    if config.get('forest_start') and config.get('forest_end'):
+        deforestation_map = out('deforestation_map.tif')
+        stages.append(Stage('loss', run_loss,
+                            inputs={'forest_start': config['forest_start'], 'forest_end': config['forest_end']},
+                            outputs={'deforestation_map': deforestation_map,
+                                     'loss_results': out('deforestation_analysis_results.csv')},
+                            params={'years_between': config.get('years_between', 20), 'output_dir': output_dir}))
+        stages.append(Stage('hotspots', run_hotspots,
+                            inputs={'deforestation_map': deforestation_map},
+                            outputs={'hotspots': out('hotspots.tif')},
+                            params={'output_dir': output_dir, **config.get('hotspots', {})}))
+
+    # Loss years of the annual loss table, whichever stage writes it
+    loss_years = {'base_year': 2000, 'num_years': 23, **config.get('annual_loss', {})}
+    annual_loss = None
+    if config.get('lossyear'):
+        annual_loss = out(annual_loss_filename(**loss_years))
+        stages.append(Stage('annual_loss', run_annual_loss,
+                            inputs={'lossyear': config['lossyear']},
+                            outputs={'annual_loss': annual_loss},
+                            params={'output_dir': output_dir, **loss_years}))
+
+    glad_statistics = None
+    if config.get('baseline_layers'):
+        glad_statistics = out('GLAD_Forest_Type_Statistics.csv')
+        statistics = [out(f'{name}.csv') for name in ('Area_Statistics', 'Combined_Forest_Statistics',
+                                                       'GLAD_Forest_Type_Statistics', 'Overall_Forest_Statistics')]
+        if 'lossyear' in config['baseline_layers'] and annual_loss is None:
+            statistics.append(out(annual_loss_filename(**loss_years)))
+            annual_loss = statistics[-1]
+        stages.append(Stage('baseline', run_baseline,
+                            inputs={'layers': config['baseline_layers'], 'aoi': config.get('aoi')},
+                            outputs={'statistics': statistics},
+                            params={'output_dir': output_dir, **config.get('baseline', {}), **loss_years}))
+
+    carbon_map = None
+    if config.get('forest_classes') and config.get('class_densities'):
+        carbon_map = out('carbon_stocks.tif')
+        stages.append(Stage('carbon', run_carbon,
+                            inputs={'forest_classes': config['forest_classes']},
+                            outputs={'carbon_map': carbon_map, 'carbon_summary': out('carbon_summary.csv')},
+                            params={'output_dir': output_dir, 'class_densities': config['class_densities'],
+                                    **config.get('carbon', {})}))
+
+    if config.get('zones') and (deforestation_map or carbon_map):
+        inputs = {'zones': config['zones']}
+        outputs = {'loss_by_zone': out('loss_by_zone.csv') if deforestation_map else None}
+        if deforestation_map:
+            inputs['deforestation_map'] = deforestation_map
+        if carbon_map:
+            inputs['carbon_map'] = carbon_map
+            outputs['carbon_by_zone'] = out('carbon_by_zone.csv')
+        stages.append(Stage('zonal', run_zonal, inputs=inputs, outputs=outputs,
+                            params={'output_dir': output_dir, 'zone_field': config.get('zone_field')}))
+
+    if annual_loss:
+        plot_names = ['annual_loss_distribution.png']
+        plot_params = dict(config.get('plots', {}))
+        if plot_params.get('initial_forest_ha') is not None:
+            plot_names.append('forest_change_timeseries.png')
+        if glad_statistics:
+            plot_names.append('forest_type_distribution.png')
+        stages.append(Stage('plots', run_plots,
+                            inputs={'annual_loss': annual_loss, 'glad_statistics': glad_statistics},
+                            outputs={'plots': [os.path.join(figure_dir, name) for name in plot_names]},
+                            params={'output_dir': figure_dir, **plot_params}))
+    return stages
+
+
+def main(argv=None):
+    """
+    Main execution function.
+
+    Args:
+        argv (list, optional): Command-line arguments (defaults to sys.argv)
+    """
+    parser = argparse.ArgumentParser(description="Run the forest analysis pipeline incrementally.")
+    parser.add_argument('config', help="JSON file with input paths and parameters")
+    parser.add_argument('targets', nargs='*', help="Stages to bring up to date (default: all)")
+    parser.add_argument('--force', nargs='*', default=[], help="Stages to rerun even when up to date")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes")
+    parser.add_argument('--dry-run', action='store_true', help="Only report which stages would run")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        config = json.load(f)
+    pipeline = Pipeline(build_stages(config), config.get('output_dir', 'results'))
+    status = pipeline.run(targets=args.targets, force=args.force, max_workers=args.workers,
+                          dry_run=args.dry_run)
+    for name in pipeline.order:
+        if name in status:
+            print(f"{name}: {status[name]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Put the entry points and the analysis and infrastructure modules on the path, and
+share the vector fixtures."""
+
+import os
+import sys
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import LineString, box
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (SCRIPTS_DIR, os.path.join(SCRIPTS_DIR, 'analysis'), os.path.join(SCRIPTS_DIR, 'infrastructure')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from infrastructure_analysis import InfrastructureAnalyzer  # noqa: E402
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    return InfrastructureAnalyzer(str(tmp_path), str(tmp_path / 'output'))
+
+
+@pytest.fixture
+def forest():
+    stands = [box(x, y, x + 1800, y + 1400) for x in range(0, 8000, 2000) for y in range(0, 6000, 1500)]
+    return gpd.GeoDataFrame({'stand': range(len(stands))}, geometry=stands, crs='EPSG:3161')
+
+
+@pytest.fixture
+def roads():
+    lines = [
+        LineString([(-500, 700), (8500, 900)]),
+        LineString([(3000, -500), (3300, 6500)]),
+        LineString([(3100, 2000), (7000, 5200)]),  # crosses both other roads' zones
+        LineString([(6100, 3200), (6150, 3900)]),
+    ]
+    return gpd.GeoDataFrame({'road': range(len(lines))}, geometry=lines, crs='EPSG:3161')
@@ -0,0 +1,25 @@
+"""The incremental buffer sweep must agree with a fresh overlay at every distance."""
+
+import pytest
+
+BUFFER_DISTANCES = [50, 100, 250, 500, 1000]
+
+
+def test_sweep_matches_fragmentation_at_each_distance(analyzer, forest, roads):
+    sweep = analyzer.sweep_buffer_distances(roads, forest, BUFFER_DISTANCES)
+    assert list(sweep['buffer_distance']) == BUFFER_DISTANCES
+
+    for row in sweep.itertuples():
+        impact_zones = analyzer.calculate_impact_zones(roads, row.buffer_distance)
+        expected = analyzer.analyze_forest_fragmentation(forest, impact_zones)
+
+        assert row.original_forest_area == pytest.approx(expected['original_forest_area'])
+        assert row.fragmented_forest_area == pytest.approx(expected['fragmented_forest_area'], rel=1e-6)
+        assert row.impact_zone_area == pytest.approx(expected['impact_zone_area'], rel=1e-9)
+        assert row.num_fragments == expected['num_fragments']
+
+
+def test_sweep_is_independent_of_distance_order(analyzer, forest, roads):
+    ascending = analyzer.sweep_buffer_distances(roads, forest, BUFFER_DISTANCES)
+    shuffled = analyzer.sweep_buffer_distances(roads, forest, [500, 50, 1000, 250, 100])
+    assert ascending.equals(shuffled)
@@ -0,0 +1,68 @@
+"""Streamed and tiled deforestation outputs must match the in-memory calculations."""
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from deforestation_analysis import DeforestationAnalyzer
+from raster_io import write_raster
+
+# Ragged against both the 64 pixel blocks and the hotspot tiles
+WIDTH, HEIGHT = 300, 230
+
+
+@pytest.fixture
+def deforestation_analyzer(tmp_path):
+    return DeforestationAnalyzer(str(tmp_path), str(tmp_path / 'output'))
+
+
+@pytest.fixture
+def meta():
+    # Geographic grid, so every row has a different true pixel area
+    return {'driver': 'GTiff', 'dtype': 'uint8', 'width': WIDTH, 'height': HEIGHT, 'count': 1,
+            'crs': 'EPSG:4326', 'transform': from_origin(-80.0, 50.0, 0.00025, 0.00025)}
+
+
+@pytest.fixture
+def forest_pair(tmp_path, meta):
+    rng = np.random.default_rng(1)
+    start = (rng.random((HEIGHT, WIDTH)) < 0.8).astype(np.uint8)
+    end = start & (rng.random((HEIGHT, WIDTH)) < 0.7).astype(np.uint8)
+    paths = []
+    for name, data in (('forest_start', start), ('forest_end', end)):
+        paths.append(write_raster(str(tmp_path / f'{name}.tif'), data, meta, blocksize=64))
+    return start, end, paths
+
+
+def test_windowed_rate_matches_in_memory_rate(deforestation_analyzer, tmp_path, meta, forest_pair):
+    start, end, (start_path, end_path) = forest_pair
+    output = str(tmp_path / 'deforestation.tif')
+    annual_rate, total = deforestation_analyzer.calculate_deforestation_rate_windowed(
+        start_path, end_path, 20, output_filename=output)
+    expected_rate, expected_total, expected_map = deforestation_analyzer.calculate_deforestation_rate(
+        start, end, 20, meta=meta)
+
+    assert total == pytest.approx(expected_total, rel=1e-12)
+    assert annual_rate == pytest.approx(expected_rate, rel=1e-12)
+    with rasterio.open(output) as src:
+        assert np.array_equal(src.read(1), expected_map.astype(np.uint8))
+
+
+@pytest.mark.parametrize('tile_size', [64, 100])
+def test_tiled_hotspots_match_in_memory_hotspots(deforestation_analyzer, tmp_path, meta, tile_size):
+    rng = np.random.default_rng(2)
+    # Clustered loss, so hotspots cross the tile seams
+    deforestation = (rng.random((HEIGHT, WIDTH)) < np.linspace(0.02, 0.3, WIDTH)).astype(np.uint8)
+    path = write_raster(str(tmp_path / 'deforestation.tif'), deforestation, meta)
+    output = str(tmp_path / 'hotspots.tif')
+
+    count = deforestation_analyzer.identify_hotspots_tiled(path, output, threshold=0.1, sigma=2,
+                                                           tile_size=tile_size, max_workers=1)
+    expected = deforestation_analyzer.identify_hotspots(deforestation, threshold=0.1, sigma=2)
+
+    with rasterio.open(output) as src:
+        hotspots = src.read(1)
+    assert np.array_equal(hotspots, expected.astype(np.uint8))
+    assert count == np.count_nonzero(expected)
+    assert 0 < count < hotspots.size
@@ -0,0 +1,23 @@
+"""Indexed impact zone subtraction must match gpd.overlay on both of its paths."""
+
+import geopandas as gpd
+import pytest
+import shapely
+
+# dissolve_ratio inf keeps the per-polygon union of candidate pairs, 0 always dissolves
+DISSOLVE_RATIOS = [float('inf'), 0]
+
+
+@pytest.mark.parametrize('dissolve_ratio', DISSOLVE_RATIOS)
+@pytest.mark.parametrize('buffer_distance', [100, 600])
+def test_subtraction_matches_overlay(analyzer, forest, roads, dissolve_ratio, buffer_distance):
+    impact_zones = analyzer.calculate_impact_zones(roads, buffer_distance)
+    indexed = analyzer.subtract_impact_zones(forest, impact_zones, dissolve_ratio=dissolve_ratio)
+    overlay = gpd.overlay(forest, impact_zones, how='difference')
+
+    assert list(indexed['stand']) == list(overlay['stand'])
+    assert list(indexed.columns) == list(overlay.columns)
+    for mine, expected in zip(indexed.geometry.values, overlay.geometry.values):
+        assert shapely.area(mine) == pytest.approx(shapely.area(expected), rel=1e-9)
+        assert shapely.area(shapely.symmetric_difference(mine, expected)) < 1e-6 * shapely.area(expected)
+        assert shapely.get_num_geometries(mine) == shapely.get_num_geometries(expected)
@@ -0,0 +1,27 @@
+"""Stage hashes must cover the code a stage runs and its outputs must follow its parameters."""
+
+import os
+
+import pipeline
+from pipeline import build_stages, stage_modules
+
+
+def test_stage_modules_follow_imports():
+    baseline = stage_modules(pipeline.run_baseline)
+    assert {'baseline_assessment', 'raster_io', 'gee_tables', 'pixel_area', 'vector_io'} <= set(baseline)
+    assert 'fragmentation' not in baseline
+
+    assert {'deforestation_analysis', 'carbon_mapping', 'zonal_stats'} <= set(stage_modules(pipeline.run_zonal))
+    assert {'gee_tables', 'raster_io'} <= set(stage_modules(pipeline.run_annual_loss))
+
+
+def test_annual_loss_file_follows_loss_years(tmp_path):
+    stages = {stage.name: stage for stage in build_stages({
+        'output_dir': str(tmp_path), 'lossyear': 'lossyear.tif', 'baseline_layers': {'lossyear': 'lossyear.tif'},
+        'annual_loss': {'base_year': 2000, 'num_years': 24}
+    })}
+    annual_loss = stages['annual_loss']
+    assert os.path.basename(annual_loss.outputs['annual_loss']) == 'Annual_Forest_Loss_2001_2024.csv'
+    assert annual_loss.params['num_years'] == 24
+    assert stages['baseline'].params['num_years'] == 24
+    assert stages['plots'].inputs['annual_loss'] == annual_loss.outputs['annual_loss']
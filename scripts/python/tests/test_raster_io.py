@@ -0,0 +1,21 @@
+"""Raster writer outputs must keep valid creation options for their bit depth."""
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from raster_io import MASK_OPTIONS, RasterWriter
+
+
+def test_mask_output_drops_source_nodata(tmp_path):
+    meta = {'driver': 'GTiff', 'dtype': 'uint8', 'width': 64, 'height': 64, 'count': 1, 'crs': 'EPSG:32617',
+            'transform': from_origin(650000, 5150000, 30, 30), 'nodata': 255}
+    mask = (np.indices((64, 64)).sum(axis=0) % 2).astype(np.uint8)
+    path = str(tmp_path / 'mask.tif')
+    with RasterWriter(path, meta, **MASK_OPTIONS) as writer:
+        writer.write(mask)
+
+    with rasterio.open(path) as src:
+        assert src.tags(1, ns='IMAGE_STRUCTURE')['NBITS'] == '1'
+        assert src.nodata is None
+        assert np.array_equal(src.read(1), mask)
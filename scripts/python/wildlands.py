@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Wildlands Analysis Command Line
+------------------------------
+Single entry point for the analysis scripts, with one subcommand per analysis:
+
+    python wildlands.py rate forest_2000.tif forest_2020.tif --years 20
+    python wildlands.py annual-loss lossyear.tif
+    python wildlands.py hotspots deforestation_map.tif --plot hotspot_map.png
+    python wildlands.py batch protected_areas.gpkg --aoi-field name --granules granules.json
+    python wildlands.py pipeline config.json
+    python wildlands.py startup
+
+Only the standard library is imported at startup; each subcommand imports the
+analysis modules it needs when it runs, so small batch jobs do not pay for
+geopandas, matplotlib or scipy unless they use them. The startup subcommand
+measures the import cost of every subcommand in a fresh interpreter against
+STARTUP_BUDGET_S and fails when a budget is exceeded, so regressions are
+caught in CI or on the batch nodes.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+
+# Analysis implementations live in the analysis and infrastructure script folders
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULE_DIRS = [SCRIPT_DIR, os.path.join(SCRIPT_DIR, 'analysis'), os.path.join(SCRIPT_DIR, 'infrastructure')]
+sys.path.extend(path for path in MODULE_DIRS if path not in sys.path)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Modules imported by each subcommand, used by the startup check
+COMMAND_MODULES = {
+    'rate': ('pipeline', 'deforestation_analysis'),
+    'annual-loss': ('pipeline', 'deforestation_analysis'),
+    'hotspots': ('deforestation_analysis',),
+    'baseline': ('pipeline', 'baseline_assessment', 'vector_io'),
+    'agreement': ('forest_agreement', 'vector_io'),
+    'carbon': ('pipeline', 'carbon_mapping'),
+    'fragmentation': ('infrastructure_analysis', 'fragmentation'),
+    'batch': ('batch_analysis', 'vector_io'),
+    'figures': ('visualization_analysis',),
+    'tiles': ('web_tiles', 'vector_io', 'folium'),
+    'pipeline': ('pipeline',),
+    'benchmark': ('benchmarks',)
+}
+
+# Subcommands whose arguments are passed on to another script's main
+PASSTHROUGH_COMMANDS = ('pipeline', 'benchmark')
+
+# Startup budgets in seconds for a fresh interpreter: 'cli' is parsing the command
+# line (python wildlands.py --help), the others are importing a subcommand's modules
+STARTUP_BUDGET_S = {
+    'cli': 0.3,
+    'rate': 1.2,
+    'annual-loss': 1.2,
+    'hotspots': 1.2,
+    'baseline': 1.5,
+    'agreement': 1.5,
+    'carbon': 1.2,
+    'fragmentation': 1.8,
+    'batch': 1.5,
+    'figures': 1.5,
+    'tiles': 2.5,
+    'pipeline': 0.3,
+    'benchmark': 0.5
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _key_value_pairs(pairs):
+    """Parse name=value arguments into a dict."""
+    result = {}
+    for pair in pairs or []:
+        name, separator, value = pair.partition('=')
+        if not separator:
+            raise argparse.ArgumentTypeError(f"Expected name=value, got {pair}")
+        result[name] = value
+    return result
+
+
+# Subcommands. Each imports the analysis modules it needs.
+
+def command_rate(args):
+    """Deforestation rate and map between two forest cover rasters."""
+    from pipeline import run_loss
+    run_loss(args.start, args.end, args.years, args.map or os.path.join(args.output_dir, 'deforestation_map.tif'),
+             args.output or os.path.join(args.output_dir, 'deforestation_analysis_results.csv'), args.output_dir)
+
+
+def command_annual_loss(args):
+    """Annual loss table from a Hansen lossyear raster."""
+    from pipeline import annual_loss_filename, run_annual_loss
+    output = args.output or os.path.join(args.output_dir, annual_loss_filename(args.base_year, args.num_years))
+    run_annual_loss(args.lossyear, output, args.output_dir, base_year=args.base_year, num_years=args.num_years)
+
+
+def command_hotspots(args):
+    """Hotspot raster (and optionally a map) from a deforestation raster."""
+    from deforestation_analysis import DeforestationAnalyzer
+    analyzer = DeforestationAnalyzer(os.path.dirname(args.deforestation_map), args.output_dir)
+    output = args.output or os.path.join(args.output_dir, 'hotspots.tif')
+    analyzer.identify_hotspots_tiled(args.deforestation_map, output, threshold=args.threshold, sigma=args.sigma,
+                                     max_workers=args.workers)
+    if args.plot:
+        analyzer.plot_hotspots(output, args.plot)
+
+
+def command_baseline(args):
+    """Baseline statistics CSVs from local Hansen and GLAD rasters."""
+    from pipeline import run_baseline
+    run_baseline(_key_value_pairs(args.layer), args.aoi, None, args.output_dir,
+                 treecover_threshold=args.treecover_threshold, height_threshold=args.height_threshold)
+
+
+def command_agreement(args):
+    """Hansen vs GLAD cross-tabulation, agreement matrices and disagreement rasters."""
+    from forest_agreement import ForestAgreement
+    from vector_io import read_vector
+    layers = _key_value_pairs(args.layer)
+    agreement = ForestAgreement(os.path.dirname(next(iter(layers.values()))), args.output_dir)
+    crosstab = agreement.compute_crosstab(layers, aoi=read_vector(args.aoi) if args.aoi else None,
+                                          treecover_threshold=args.treecover_threshold,
+                                          height_threshold=args.height_threshold,
+                                          disagreement_prefix=None if args.no_rasters else 'Hansen_GLAD_Disagreement')
+    agreement.save_tables(agreement.build_tables(crosstab))
+
+
+def command_carbon(args):
+    """Carbon stock raster and summary from a forest class raster."""
+    from pipeline import run_carbon
+    with open(args.densities) as f:
+        class_densities = {int(code): density for code, density in json.load(f).items()}
+    run_carbon(args.forest_classes, args.output or os.path.join(args.output_dir, 'carbon_stocks.tif'),
+               args.summary or os.path.join(args.output_dir, 'carbon_summary.csv'), args.output_dir,
+               class_densities, percentiles=tuple(args.percentiles))
+
+
+def command_fragmentation(args):
+    """Raster fragmentation metrics of a forest mask, optionally outside road impact zones."""
+    import pandas as pd
+    from infrastructure_analysis import InfrastructureAnalyzer
+    analyzer = InfrastructureAnalyzer(os.path.dirname(args.forest), args.output_dir)
+    distance_path = None
+    if args.roads:
+        distance_path = os.path.join(args.output_dir, 'road_distance.tif')
+        analyzer.calculate_distance_surface(analyzer.load_infrastructure_data(args.roads),
+                                            args.forest, distance_path, args.buffer)
+    metrics = analyzer.analyze_raster_fragmentation(args.forest, distance_path, args.buffer if args.roads else None,
+                                                    min_area_ha=args.min_area_ha)
+    output = args.output or os.path.join(args.output_dir, 'fragmentation_metrics.csv')
+    pd.DataFrame([{key: value for key, value in metrics.items() if not isinstance(value, (list, dict))}]).to_csv(
+        output, index=False)
+
+
+def command_batch(args):
+    """Deforestation, carbon and road statistics for every AOI of a vector file."""
+    from batch_analysis import BatchAnalyzer
+    from vector_io import read_vector
+    analyzer = BatchAnalyzer(os.path.dirname(args.aois), args.output_dir)
+    if args.granules:
+        with open(args.granules) as f:
+            granules = json.load(f)
+    else:
+        granules = [_key_value_pairs(args.layer)]
+    class_densities = None
+    if args.densities:
+        with open(args.densities) as f:
+            class_densities = {int(code): density for code, density in json.load(f).items()}
+    aois = analyzer.load_aois(args.aois, args.aoi_field)
+    # Only the roads within the bounding box of the AOIs are read
+    roads = read_vector(args.roads, aoi=aois) if args.roads else None
+    results = analyzer.analyze(aois, granules, roads=roads,
+                               buffer_distance=args.buffer, class_densities=class_densities,
+                               treecover_threshold=args.treecover_threshold, base_year=args.base_year,
+                               num_years=args.num_years, tile_size=args.tile_size, max_workers=args.workers)
+    analyzer.save_results(results, args.prefix)
+
+
+def command_figures(args):
+    """Standard report figures from the annual loss and GLAD statistics tables."""
+    import pandas as pd
+    from visualization_analysis import ForestVisualization, report_figure_specs
+    visualizer = ForestVisualization(os.path.dirname(args.annual_loss), args.output_dir)
+    specs = report_figure_specs(pd.read_csv(args.annual_loss), pd.read_csv(args.glad_statistics), args.initial_forest)
+    visualizer.render_figures(specs, max_workers=args.workers, force=args.force)
+
+
+def command_tiles(args):
+    """XYZ tile pyramids and a folium map for raster and vector layers."""
+    from web_tiles import WebTileExporter
+    from vector_io import read_vector
+    exporter = WebTileExporter(os.path.join(args.output_dir, 'tiles'), max_workers=args.workers)
+    layers = [exporter.export_raster(path, name, args.min_zoom, args.max_zoom)
+              for name, path in _key_value_pairs(args.raster).items()]
+    layers += [exporter.export_vector(read_vector(path), name, args.min_zoom, args.max_zoom)
+               for name, path in _key_value_pairs(args.vector).items()]
+    exporter.create_map(layers, os.path.join(args.output_dir, args.map_name))
+
+
+def command_pipeline(args):
+    """Run the incremental pipeline (arguments are passed to pipeline.py)."""
+    from pipeline import main as pipeline_main
+    pipeline_main(args.arguments)
+
+
+def command_benchmark(args):
+    """Run the benchmark suite (arguments are passed to benchmarks.py)."""
+    from benchmarks import main as benchmark_main
+    benchmark_main(args.arguments)
+
+
+def _time_command(command):
+    """Wall time of a command in a fresh process, in seconds."""
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def measure_startup(commands=None, repeat=3):
+    """
+    Measure the startup cost of the CLI and of each subcommand's imports.
+
+    Every measurement runs in a fresh interpreter and the best of repeat runs is kept,
+    so the result reflects import cost rather than filesystem cache misses.
+
+    Args:
+        commands (list, optional): Subcommands to measure (default: all)
+        repeat (int): Runs per measurement
+
+    Returns:
+        dict: 'cli' and subcommand names to seconds
+    """
+    timings = {'cli': min(_time_command([sys.executable, os.path.abspath(__file__), '--help'])
+                          for _ in range(repeat))}
+    for command in commands or COMMAND_MODULES:
+        code = (f"import sys; sys.path[:0] = {MODULE_DIRS!r}; "
+                + "; ".join(f"import {module}" for module in COMMAND_MODULES[command]))
+        timings[command] = min(_time_command([sys.executable, '-c', code]) for _ in range(repeat))
+    return timings
+
+
+def command_startup(args):
+    """Check the startup time of the CLI and its subcommands against the budget."""
+    unknown = [command for command in args.commands if command not in COMMAND_MODULES]
+    if unknown:
+        raise SystemExit(f"Unknown commands: {', '.join(unknown)}")
+    timings = measure_startup(args.commands, repeat=args.repeat)
+    over_budget = []
+    print(f"{'command':<16}{'seconds':>10}{'budget':>10}")
+    for name, seconds in timings.items():
+        budget = STARTUP_BUDGET_S[name] * args.budget_scale
+        flag = '' if seconds <= budget else '  over budget'
+        if flag:
+            over_budget.append(name)
+        print(f"{name:<16}{seconds:>10.3f}{budget:>10.3f}{flag}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(timings, f, indent=2)
+    if over_budget:
+        raise SystemExit(f"Startup budget exceeded: {', '.join(over_budget)}")
+
+
+def build_parser():
+    """
+    Build the argument parser with one subparser per analysis.
+
+    Returns:
+        argparse.ArgumentParser: Parser whose subcommands set a 'handler' default
+    """
+    parser = argparse.ArgumentParser(prog='wildlands', description="Wildlands League forest analyses.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add(name, handler, help_text, output_dir=True):
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        subparser.set_defaults(handler=handler)
+        if output_dir:
+            subparser.add_argument('--output-dir', default='results', help="Directory for outputs")
+        return subparser
+
+    sub = add('rate', command_rate, "Deforestation rate between two forest cover rasters")
+    sub.add_argument('start', help="Forest cover raster at the start (1 = forest)")
+    sub.add_argument('end', help="Forest cover raster at the end")
+    sub.add_argument('--years', type=float, required=True, help="Years between the two rasters")
+    sub.add_argument('--map', help="Output deforestation raster")
+    sub.add_argument('--output', help="Output results CSV")
+
+    sub = add('annual-loss', command_annual_loss, "Annual forest loss from a Hansen lossyear raster")
+    sub.add_argument('lossyear', help="Hansen lossyear raster")
+    sub.add_argument('--base-year', type=int, default=2000, help="Year of lossyear value 0")
+    sub.add_argument('--num-years', type=int, default=23, help="Number of loss years")
+    sub.add_argument('--output', help="Output CSV")
+
+    sub = add('hotspots', command_hotspots, "Deforestation hotspots from a deforestation raster")
+    sub.add_argument('deforestation_map', help="Binary deforestation raster")
+    sub.add_argument('--threshold', type=float, default=0.1, help="Smoothed density threshold")
+    sub.add_argument('--sigma', type=float, default=2, help="Gaussian sigma in pixels")
+    sub.add_argument('--workers', type=int, default=None, help="Worker processes")
+    sub.add_argument('--output', help="Output hotspot raster")
+    sub.add_argument('--plot', help="Also save a hotspot map PNG")
+
+    sub = add('baseline', command_baseline, "Baseline statistics from local Hansen and GLAD rasters")
+    sub.add_argument('--layer', action='append', required=True, help="Layer as name=path (repeatable)")
+    sub.add_argument('--aoi', help="AOI vector file")
+    sub.add_argument('--treecover-threshold', type=float, default=25, help="Tree cover threshold (%%)")
+    sub.add_argument('--height-threshold', type=float, default=5, help="Canopy height threshold (m)")
+
+    sub = add('agreement', command_agreement, "Hansen vs GLAD forest agreement from local rasters")
+    sub.add_argument('--layer', action='append', required=True, help="Layer as name=path (repeatable)")
+    sub.add_argument('--aoi', help="AOI vector file")
+    sub.add_argument('--treecover-threshold', type=float, default=25, help="Tree cover threshold (%%)")
+    sub.add_argument('--height-threshold', type=float, default=5, help="Canopy height threshold (m)")
+    sub.add_argument('--no-rasters', action='store_true', help="Skip the disagreement rasters")
+
+    sub = add('carbon', command_carbon, "Carbon stocks from a forest class raster")
+    sub.add_argument('forest_classes', help="Forest class raster (e.g. GLAD forest types)")
+    sub.add_argument('--densities', required=True, help="JSON file mapping class code to tC/ha")
+    sub.add_argument('--percentiles', type=float, nargs='*', default=[], help="Percentiles to report")
+    sub.add_argument('--output', help="Output carbon stock raster")
+    sub.add_argument('--summary', help="Output summary CSV")
+
+    sub = add('fragmentation', command_fragmentation, "Forest fragmentation, optionally around roads")
+    sub.add_argument('forest', help="Binary forest raster")
+    sub.add_argument('--roads', help="Road vector file")
+    sub.add_argument('--buffer', type=float, default=100, help="Road impact distance (m)")
+    sub.add_argument('--min-area-ha', type=float, default=1.0, help="Minimum fragment area (ha)")
+    sub.add_argument('--output', help="Output metrics CSV")
+
+    sub = add('batch', command_batch, "Statistics for many AOIs sharing the same granules")
+    sub.add_argument('aois', help="AOI vector file")
+    sub.add_argument('--aoi-field', help="Column identifying each AOI (default: row number)")
+    granules = sub.add_mutually_exclusive_group(required=True)
+    granules.add_argument('--granules', help="JSON list of granules, each mapping layer name to path")
+    granules.add_argument('--layer', action='append', help="Layer of a single granule as name=path (repeatable)")
+    sub.add_argument('--roads', help="Road vector file")
+    sub.add_argument('--buffer', type=float, default=1000, help="Road impact distance (m)")
+    sub.add_argument('--densities', help="JSON file mapping forest_classes code to tC/ha")
+    sub.add_argument('--treecover-threshold', type=float, default=25, help="Tree cover threshold (%%)")
+    sub.add_argument('--base-year', type=int, default=2000, help="Year of lossyear value 0")
+    sub.add_argument('--num-years', type=int, default=23, help="Number of loss years")
+    sub.add_argument('--tile-size', type=int, default=2048, help="Window edge length in pixels")
+    sub.add_argument('--workers', type=int, default=None, help="Worker processes")
+    sub.add_argument('--prefix', default='batch', help="Prefix of the output CSVs")
+
+    sub = add('figures', command_figures, "Standard report figures")
+    sub.add_argument('annual_loss', help="Annual loss CSV")
+    sub.add_argument('glad_statistics', help="GLAD forest type statistics CSV")
+    sub.add_argument('--initial-forest', type=float, required=True, help="Forest area in 2000 (ha)")
+    sub.add_argument('--workers', type=int, default=None, help="Worker processes")
+    sub.add_argument('--force', action='store_true', help="Re-render up-to-date figures")
+
+    sub = add('tiles', command_tiles, "Tile pyramids and a folium map")
+    sub.add_argument('--raster', action='append', help="Raster layer as name=path (repeatable)")
+    sub.add_argument('--vector', action='append', help="Vector layer as name=path (repeatable)")
+    sub.add_argument('--min-zoom', type=int, default=8, help="First zoom level")
+    sub.add_argument('--max-zoom', type=int, default=14, help="Last zoom level")
+    sub.add_argument('--workers', type=int, default=None, help="Worker processes")
+    sub.add_argument('--map-name', default='interactive_map.html', help="HTML map file name")
+
+    sub = add('pipeline', command_pipeline, "Incremental analysis pipeline", output_dir=False)
+    sub.add_argument('arguments', nargs=argparse.REMAINDER, help="Arguments for pipeline.py")
+
+    sub = add('benchmark', command_benchmark, "Benchmark suite on synthetic inputs", output_dir=False)
+    sub.add_argument('arguments', nargs=argparse.REMAINDER, help="Arguments for benchmarks.py")
+
+    sub = add('startup', command_startup, "Check startup time against the budget", output_dir=False)
+    sub.add_argument('commands', nargs='*', metavar='command',
+                     help=f"Subcommands to measure (default: all of {', '.join(COMMAND_MODULES)})")
+    sub.add_argument('--repeat', type=int, default=3, help="Runs per measurement")
+    sub.add_argument('--budget-scale', type=float, default=1.0, help="Multiplier for slower machines")
+    sub.add_argument('--json', help="Also write the timings to a JSON file")
+    return parser
+
+
+def main(argv=None):
+    """
+    Main execution function.
+
+    Args:
+        argv (list, optional): Command-line arguments (defaults to sys.argv)
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = build_parser()
+    if argv and argv[0] in PASSTHROUGH_COMMANDS:
+        # Options belong to the other script, so they are not parsed here
+        args = parser.parse_args(argv[:1])
+        args.arguments = argv[1:]
+    else:
+        args = parser.parse_args(argv)
+    args.handler(args)
+
+    # Stage profile of the analyzers used by this command, next to its outputs
+    if getattr(args, 'output_dir', None) and 'profiling' in sys.modules:
+        from profiling import get_profile
+        if get_profile().records:
+            get_profile().save(os.path.join(args.output_dir, f"{args.command.replace('-', '_')}_profile"))
+
+
+if __name__ == "__main__":
+    main()